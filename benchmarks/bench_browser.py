@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark page-load time and peak browser memory with and without the lean Chrome profile
+Needs Chrome and network access to the store
+Usage: python benchmarks/bench_browser.py [--loads 5] [--url URL]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from browser_profile import BrowserProfile
+from driver_pool import driver_rss_mb
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor
+
+
+class PeakSampler:
+    """Samples a driver's process-tree RSS in the background and keeps the maximum"""
+
+    def __init__(self, driver, interval=0.1):
+        self.driver = driver
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stop.is_set():
+            self.peak_mb = max(self.peak_mb, driver_rss_mb(self.driver))
+            self.stop.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+
+def bench_profile(name, profile, url, loads):
+    monitor = GitHubCostcoPokemonMonitor()
+    monitor.browser_profile = profile
+    monitor.fetch_cache.is_unchanged = lambda key, fingerprint: False
+    start = time.perf_counter()
+    driver = monitor.setup_driver()
+    if not driver:
+        print(f"{name:<6} could not start Chrome")
+        return
+    startup = time.perf_counter() - start
+    samples = []
+    found = 0
+    try:
+        with PeakSampler(driver) as sampler:
+            for _ in range(loads):
+                products = monitor.scrape_with_driver(driver, url)
+                timings = monitor.last_scrape_timings
+                samples.append(timings.get('navigate', 0) + timings.get('ready', 0))
+                found = len(products)
+    finally:
+        driver.quit()
+    print(f"{name:<6} {startup:>9.2f} {statistics.median(samples):>9.2f} {max(samples):>9.2f} "
+          f"{sampler.peak_mb:>9.0f} {found:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loads', type=int, default=5, help="page loads per profile")
+    parser.add_argument('--url', help="page to load (default: the monitor's search URL)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    url = args.url or GitHubCostcoPokemonMonitor().search_url
+    print(f"{'mode':<6} {'start s':>9} {'load p50':>9} {'load max':>9} {'peak MB':>9} {'products':>9}")
+    bench_profile('full', BrowserProfile(lean=False), url, args.loads)
+    lean = BrowserProfile.from_env()
+    lean.lean = True
+    bench_profile('lean', lean, url, args.loads)
+
+
+if __name__ == "__main__":
+    main()
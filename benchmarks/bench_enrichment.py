@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark detail page enrichment as the catalogue grows
+Each run changes a few products; the detail page fetch is simulated with a fixed latency
+Usage: python benchmarks/bench_enrichment.py [--sizes 100,1000,10000] [--changes 5] [--latency 0.2]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from enrichment import DetailCache, DetailEnricher
+from product_store import ProductStore
+
+DETAIL_PAGE = """<script type="application/ld+json">{{"@type": "Product", "sku": "{code}",
+"offers": {{"price": "49.99", "priceCurrency": "AUD", "availability": "https://schema.org/InStock"}}}}</script>"""
+
+
+def catalogue(size, run, changes):
+    """Grid products for one run; the first `changes` products get a new price every run"""
+    products = []
+    for i in range(size):
+        price = f"${40 + run}.99" if i < changes else "$49.99"
+        products.append({'title': f"Pokemon TCG Booster Bundle Series {i}",
+                         'url': f"https://www.costco.com.au/Pokemon-TCG-Booster-Bundle-{i}/p/{100000 + i}",
+                         'price': price, 'availability': 'Unknown', 'found_at': ''})
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--changes', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds per simulated detail page")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    fetched = []
+    warming = [True]
+
+    def fetch(url):
+        fetched.append(url)
+        if not warming[0]:
+            time.sleep(args.latency)
+        return DETAIL_PAGE.format(code=url.rsplit('/', 1)[-1])
+
+    print(f"{'products':>9} {'first run':>10} {'fetches/run':>12} {'seconds/run':>12}")
+    for size in [int(n) for n in args.sizes.split(',')]:
+        store = ProductStore()
+        enricher = DetailEnricher(fetch, DetailCache(None, max_entries=size * 2), workers=args.workers)
+        # The first run reads every page once; it is not timed
+        fetched.clear()
+        warming[0] = True
+        products = catalogue(size, 0, args.changes)
+        enricher.enrich(products, store)
+        store.diff(products)
+        first = len(fetched)
+        warming[0] = False
+
+        seconds = []
+        for run in range(1, args.runs + 1):
+            fetched.clear()
+            products = catalogue(size, run, args.changes)
+            began = time.perf_counter()
+            enricher.enrich(products, store)
+            seconds.append(time.perf_counter() - began)
+            store.diff(products)
+        print(f"{size:>9} {first:>10} {len(fetched):>12} {sum(seconds) / len(seconds):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass extractor against the original selector-based one
+Usage: python benchmarks/bench_extractor.py [--repeat N] [--scale N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor
+from product_extractor import extract_products, resolve_parser
+
+FIXTURES = os.path.join(ROOT, 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def parse_products_legacy(page_source, base_url):
+    """The monitor's original multi-selector extractor, frozen here as the baseline"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    products = []
+    
+    # Try multiple strategies to find products
+    product_selectors = [
+        '[data-testid*="product"]',
+        '.product-item',
+        '.product-card', 
+        '.product-list-item',
+        '.product-tile',
+        '[class*="product"][class*="item"]',
+        'a[href*="/p/"]',  # Product page links
+        'article',
+        '.search-result',
+    ]
+    
+    all_potential_products = []
+    
+    for selector in product_selectors:
+        elements = soup.select(selector)
+        if elements:
+            logging.info(f"Found {len(elements)} elements with selector: {selector}")
+            all_potential_products.extend(elements)
+    
+    # Also search in text content for Pokemon mentions
+    text_content = soup.get_text().lower()
+    if 'pokemon' in text_content:
+        logging.info("✅ Found 'pokemon' in page text content")
+        
+        # Look for any links that might be products
+        all_links = soup.find_all('a', href=True)
+        for link in all_links:
+            link_text = link.get_text().lower()
+            if 'pokemon' in link_text or 'tcg' in link_text or 'trading' in link_text:
+                all_potential_products.append(link)
+    
+    # Process potential products
+    seen_urls = set()
+    
+    for element in all_potential_products:
+        try:
+            # Get URL first for deduplication
+            url = ""
+            if element.name == 'a' and element.get('href'):
+                url = element['href']
+            else:
+                link_elem = element.find('a')
+                if link_elem and link_elem.get('href'):
+                    url = link_elem['href']
+            
+            if url and not url.startswith('http'):
+                url = base_url + url
+            
+            # Skip duplicates by URL
+            if url and url in seen_urls:
+                continue
+            if url:
+                seen_urls.add(url)
+            
+            # Extract title/product name
+            title = None
+            title_selectors = ['h1', 'h2', 'h3', 'h4', '.product-title', '.product-name', '[data-testid*="title"]']
+            
+            for selector in title_selectors:
+                title_elem = element.select_one(selector)
+                if title_elem:
+                    title = title_elem.get_text().strip()
+                    break
+            
+            if not title:
+                title = element.get_text().strip()
+            
+            # Clean up title
+            if title:
+                import re
+                title = re.sub(r'\s+', ' ', title)
+                lines = title.split('\n')
+                for line in lines:
+                    line = line.strip()
+                    if line and ('pokemon' in line.lower() or 'tcg' in line.lower()):
+                        if len(line) > 10 and len(line) < 200:
+                            title = line
+                            break
+            
+            # Skip if no title or title doesn't contain Pokemon-related terms
+            if not title or not any(term in title.lower() for term in ['pokemon', 'pokémon', 'tcg', 'trading card']):
+                continue
+            
+            # Get price
+            price = "Price not found"
+            price_selectors = ['.price', '[class*="price"]', '[data-testid*="price"]', '.cost']
+            
+            for selector in price_selectors:
+                price_elem = element.select_one(selector)
+                if price_elem:
+                    price_text = price_elem.get_text().strip()
+                    if '$' in price_text or 'aud' in price_text.lower():
+                        price = price_text
+                        break
+            
+            # Get availability
+            availability = "Unknown"
+            availability_selectors = ['.stock', '.availability', '[class*="stock"]', '[class*="availability"]']
+            
+            for selector in availability_selectors:
+                avail_elem = element.select_one(selector)
+                if avail_elem:
+                    availability = avail_elem.get_text().strip()
+                    break
+            
+            product = {
+                'title': title,
+                'url': url,
+                'price': price,
+                'availability': availability,
+                'found_at': datetime.now().isoformat()
+            }
+            products.append(product)
+            
+            logging.info(f"Found Pokemon product: {title[:50]}...")
+            
+        except Exception as e:
+            logging.error(f"Error parsing product element: {e}")
+            continue
+    
+    if not products:
+        logging.info("No Pokemon products found")
+        logging.info(f"Page title: {soup.find('title').get_text() if soup.find('title') else 'No title'}")
+        logging.info(f"Page contains 'pokemon': {'pokemon' in text_content}")
+        logging.info(f"Total links on page: {len(soup.find_all('a'))}")
+    
+    return products
+
+
+def scale_page(html, factor):
+    """Repeat the product grid so the page holds factor times as many cards"""
+    start = html.index('<sip-product-list-item')
+    end = html.rindex('</sip-product-list-item>') + len('</sip-product-list-item>')
+    grid = html[start:end]
+    copies = [re.sub(r'/p/(\d+)', lambda m, i=i: f'/p/{m.group(1)}{i:03d}', grid) for i in range(factor)]
+    return html[:start] + ''.join(copies) + html[end:]
+
+
+def accuracy(products, expected):
+    """Fraction of expected products found with the exact title, price and availability"""
+    found = {(p['title'], p['url'], p['price'], p['availability']) for p in products}
+    wanted = {(p['title'], p['url'], p['price'], p['availability']) for p in expected}
+    precision = len(found & wanted) / len(found) if found else float(not wanted)
+    recall = len(found & wanted) / len(wanted) if wanted else 1.0
+    return precision, recall
+
+
+def time_it(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scale', type=int, default=10, help="grid multiplier for the large page")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    monitor = GitHubCostcoPokemonMonitor()
+    html = load_fixture('costco_search_pokemon.html')
+    with open(os.path.join(FIXTURES, 'costco_search_pokemon.expected.json'), 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+
+    pages = [
+        ('search page', html, expected),
+        (f'search page x{args.scale}', scale_page(html, args.scale), None),
+        ('no results', load_fixture('costco_search_no_results.html'), []),
+    ]
+    extractors = [('legacy', lambda page: parse_products_legacy(page, monitor.base_url))]
+    for name in ['html.parser', 'lxml']:
+        if resolve_parser(name) == name:
+            extractors.append((f'single-pass/{name}',
+                               lambda page, name=name: extract_products(page, monitor.base_url, '', parser=name)))
+
+    print(f"{'page':<20} {'extractor':<24} {'median ms':>10} {'products':>9} {'precision':>10} {'recall':>7}")
+    for page_name, page, page_expected in pages:
+        for extractor_name, extractor in extractors:
+            ms, products = time_it(lambda: extractor(page), args.repeat)
+            if page_expected is None:
+                precision = recall = '-'
+            else:
+                p, r = accuracy(products, page_expected)
+                precision, recall = f"{p:.2f}", f"{r:.2f}"
+            print(f"{page_name:<20} {extractor_name:<24} {ms:>10.2f} {len(products):>9} {precision:>10} {recall:>7}")
+
+
+if __name__ == "__main__":
+    main()
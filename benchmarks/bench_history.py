@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark the product history database over years of hourly runs
+Writes one batched run per simulated hour, then times the CLI queries
+Usage: python benchmarks/bench_history.py [--products 100] [--years 2]
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from history_db import HistoryDB, describe
+
+
+def simulate(db, products, hours, seed=0):
+    """Hourly runs where each product restocks, sells out and changes price now and then"""
+    rng = random.Random(seed)
+    state = [{'key': str(100000 + i), 'title': f"Pokemon TCG Booster Bundle Series {i}",
+              'url': f"https://www.costco.com.au/Pokemon-TCG-Booster-Bundle-{i}/p/{100000 + i}",
+              'price': f"${50 + i % 200}.99", 'stock': 'in_stock'} for i in range(products)]
+    start = datetime(2024, 1, 1)
+    write_times = []
+    for hour in range(hours):
+        for product in state:
+            if rng.random() < 0.02:
+                product['stock'] = 'out_of_stock' if product['stock'] == 'in_stock' else 'in_stock'
+            if rng.random() < 0.002:
+                product['price'] = f"${rng.randint(30, 250)}.99"
+        began = time.perf_counter()
+        db.record_run('costco-au', state, seen_at=start + timedelta(hours=hour))
+        write_times.append(time.perf_counter() - began)
+    return write_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    hours = int(args.years * 365 * 24)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        db = HistoryDB(path)
+        began = time.perf_counter()
+        write_times = simulate(db, args.products, hours)
+        total = time.perf_counter() - began
+        db.close()
+
+        rows = args.products * hours
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"{hours} hourly runs x {args.products} products = {rows} observations in {total:.1f}s")
+        print(f"run write p50 {statistics.median(write_times) * 1000:.2f}ms, "
+              f"max {max(write_times) * 1000:.2f}ms, file {size_mb:.1f}MB ({size_mb * 1024 * 1024 / rows:.1f} bytes/row)")
+
+        db = HistoryDB(path)
+        rng = random.Random(1)
+        samples = []
+        for _ in range(args.queries):
+            item = str(100000 + rng.randrange(args.products))
+            began = time.perf_counter()
+            describe(db, db.find(item)[0])
+            samples.append(time.perf_counter() - began)
+        print(f"lookup (last in stock, price history, restocks) p50 {statistics.median(samples) * 1000:.2f}ms, "
+              f"max {max(samples) * 1000:.2f}ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
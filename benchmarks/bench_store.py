@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark load and save time of the known-products state file
+Compares the old whole-file JSON rewrite with the append-only JSON Lines log
+Usage: python benchmarks/bench_store.py [--sizes 10000 100000] [--new 20]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from product_store import ProductStore
+
+
+def make_product(i):
+    return {
+        'title': f"Pokemon TCG Booster Bundle Series {i}",
+        'url': f"https://www.costco.com.au/Pokemon-TCG-Booster-Bundle-{i}/p/{100000 + i}",
+        'price': f"${50 + i % 200}.99",
+        'found_at': '2025-08-01T00:00:00'
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def bench_json(path, store, new_products):
+    """Old format: one JSON document rewritten in full on every run"""
+    def save():
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 2, 'products': store.products}, f, indent=2, ensure_ascii=False)
+
+    def load():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    save()
+    load_ms, _ = timed(load)
+    for product in new_products:
+        store.add(product)
+    save_ms, _ = timed(save)
+    return load_ms, save_ms, os.path.getsize(path)
+
+
+def bench_jsonl(path, store, new_products):
+    """New format: append-only log, only new records written per run"""
+    store.save(path)
+    load_ms, loaded = timed(lambda: ProductStore.load(path))
+    for product in new_products:
+        loaded.add(product)
+    save_ms, _ = timed(lambda: loaded.save(path))
+    return load_ms, save_ms, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--new', type=int, default=20, help="new products added per simulated run")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'records':>8} {'format':<8} {'load ms':>9} {'save ms':>9} {'file KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            new_products = [make_product(size + i) for i in range(args.new)]
+            for name, bench in [('json', bench_json), ('jsonl', bench_jsonl)]:
+                store = ProductStore()
+                for i in range(size):
+                    store.add(make_product(i))
+                store.dirty = set(store.products)
+                path = os.path.join(tmp, f"state-{size}.{name}")
+                load_ms, save_ms, size_bytes = bench(path, store, new_products)
+                print(f"{size:>8} {name:<8} {load_ms:>9.1f} {save_ms:>9.1f} {size_bytes / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
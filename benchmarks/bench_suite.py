@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: replayed fetches, parsing, dedup, title matching and notification fan-out
+Every case runs against recorded fixtures and a loopback webhook server, so no
+network access is needed. Use --json to save results and --compare to diff
+them against a run from another commit.
+Usage: python benchmarks/bench_suite.py [--repeat N] [--json results.json] [--compare old.json]
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_extractor import load_fixture, scale_page
+from notifications import DiscordChannel, NotificationDispatcher, NtfyChannel, TelegramChannel
+from product_extractor import extract_products
+from product_store import ProductStore, stock_state
+from replay import Recording, replay_monitor
+from title_match import clean_title, group_variants, normalize_title, title_tokens
+
+RECORDINGS = os.path.join(ROOT, 'fixtures', 'recordings')
+BASE_URL = 'https://www.costco.com.au'
+
+
+def time_it(fn, repeat):
+    """Median wall time in ms over repeat calls, and the last result"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def accuracy(products, expected):
+    """Precision and recall on title, url, price and stock state
+
+    Stock is compared as a state because the API and the page word it differently.
+    """
+    def keys(items):
+        return {(p['title'], p['url'], p['price'], stock_state(p['availability'])) for p in items}
+    found, wanted = keys(products), keys(expected)
+    precision = len(found & wanted) / len(found) if found else float(not wanted)
+    recall = len(found & wanted) / len(wanted) if wanted else 1.0
+    return round(precision, 3), round(recall, 3)
+
+
+def bench_replay(repeat):
+    """Replay each recording through fetch_pokemon_products with the browser stubbed"""
+    results = {}
+    for path in sorted(glob.glob(os.path.join(RECORDINGS, '*.json'))):
+        recording = Recording.load(path)
+        monitor = replay_monitor(recording)
+        ms, products = time_it(monitor.fetch_pokemon_products, repeat)
+        result = {'median_ms': round(ms, 2), 'path': monitor.last_fetch['path'], 'products': len(products)}
+        if 'expected' in recording.meta:
+            result['precision'], result['recall'] = accuracy(products, recording.meta['expected'])
+        results[f"replay/{os.path.splitext(os.path.basename(path))[0]}"] = result
+    return results
+
+
+def bench_parse(repeat, scale):
+    """Extraction time on the rendered search page at normal and scaled grid sizes"""
+    html = load_fixture('costco_search_pokemon.html')
+    results = {}
+    for name, page in [('search_page', html), (f'search_page_x{scale}', scale_page(html, scale))]:
+        ms, products = time_it(lambda: extract_products(page, BASE_URL, ''), repeat)
+        results[f"parse/{name}"] = {'median_ms': round(ms, 2), 'products': len(products),
+                                    'kb': round(len(page) / 1024, 1)}
+    return results
+
+
+def make_product(i, price=None):
+    return {
+        'title': f"Pokemon TCG Booster Bundle Series {i}",
+        'url': f"{BASE_URL}/Pokemon-TCG-Booster-Bundle-{i}/p/{100000 + i}",
+        'price': price or f"${50 + i % 200}.99",
+        'availability': 'Out of stock' if i % 7 == 0 else 'In stock',
+        'found_at': '2025-08-01T00:00:00'
+    }
+
+
+def bench_dedup(repeat, size):
+    """Diff throughput for a first sighting and for a repeat run with 5% of prices changed"""
+    first = [make_product(i) for i in range(size)]
+    second = [make_product(i, price='$1.00' if i % 20 == 0 else None) for i in range(size)]
+    results = {}
+
+    def first_run():
+        return ProductStore().diff(first)
+
+    ms, events = time_it(first_run, repeat)
+    results['dedup/first_run'] = {'median_ms': round(ms, 2), 'products': size, 'events': len(events),
+                                  'products_per_second': round(size / (ms / 1000))}
+
+    def repeat_run():
+        store = ProductStore()
+        store.diff(first)
+        start = time.perf_counter()
+        events = store.diff(second)
+        return time.perf_counter() - start, events
+
+    samples = [repeat_run() for _ in range(repeat)]
+    ms = statistics.median(seconds for seconds, _ in samples) * 1000
+    results['dedup/repeat_run'] = {'median_ms': round(ms, 2), 'products': size, 'events': len(samples[-1][1]),
+                                   'products_per_second': round(size / (ms / 1000))}
+    return results
+
+
+def bench_titles(repeat, size):
+    """Title cleanup of noisy card text, uncached, and variant grouping of the cleaned titles"""
+    rng = random.Random(0)
+    syllables = ['char', 'iz', 'ard', 'pika', 'chu', 'mew', 'two', 'eev', 'ee', 'sur', 'ging', 'spar', 'ks', 'pal',
+                 'dean', 'fa', 'tes', 'pris', 'ma', 'tic', 'obsi', 'dian', 'stel', 'lar', 'crown', 'tem', 'pest']
+    kinds = ['Booster Bundle', 'Elite Trainer Box', 'Booster Display', 'Collection Box', 'Tin', 'Plush',
+             'Premium Collection', 'Battle Deck']
+    noisy = []
+    for i in range(size // 2):
+        name = ' '.join(''.join(rng.sample(syllables, 3)).capitalize() for _ in range(2))
+        kind = rng.choice(kinds)
+        # Each product also appears as a reworded second listing
+        noisy.append(f"${50 + i % 200}.99Price includes deliveryPokemon TCG {name} {kind}"
+                     f"★★★★★{i % 5}.{i % 10} ({i})AddCompare Product")
+        noisy.append(f"{name} {kind} - Pokemon Trading Card Game Compare Product")
+
+    def normalize():
+        for cache in (clean_title, normalize_title, title_tokens):
+            cache.cache_clear()
+        return [normalize_title(title) for title in noisy]
+
+    results = {}
+    ms, _ = time_it(normalize, repeat)
+    results['titles/normalize'] = {'median_ms': round(ms, 2), 'titles': size,
+                                   'titles_per_second': round(size / (ms / 1000))}
+    products = [{'title': clean_title(title)} for title in noisy]
+    ms, groups = time_it(lambda: group_variants(products), repeat)
+    results['titles/group_variants'] = {'median_ms': round(ms, 2), 'titles': size, 'groups': len(groups)}
+    return results
+
+
+class WebhookServer:
+    """Loopback server that accepts every POST after a fixed delay"""
+
+    def __init__(self, delay):
+        self.count = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                server.count += 1
+                time.sleep(delay)
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_fanout(repeat, products, latency_ms):
+    """Dispatch alerts to Discord, Telegram and ntfy stand-ins with simulated webhook latency"""
+    alerts = [dict(make_product(i), event='new_listing') for i in range(products)]
+    server = WebhookServer(latency_ms / 1000)
+    try:
+        channels = [DiscordChannel(f"{server.url}/discord"),
+                    TelegramChannel('token', 'chat', api_base=server.url),
+                    NtfyChannel(f"{server.url}/ntfy")]
+        dispatcher = NotificationDispatcher(channels)
+        ms, stats = time_it(lambda: dispatcher.dispatch(alerts), repeat)
+    finally:
+        server.close()
+    return {'fanout/three_channels': {
+        'median_ms': round(ms, 2),
+        'alerts': products,
+        'messages': sum(channel['sent'] for channel in stats.values()),
+        'failed': sum(channel['failed'] for channel in stats.values()),
+        'webhook_latency_ms': latency_ms
+    }}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline):
+    """Print median time changes against a saved run"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    print(f"{'case':<36} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline['results'].get(name, {}).get('median_ms')
+        if before is None:
+            print(f"{name:<36} {'-':>10} {result['median_ms']:>10.2f} {'new':>8}")
+            continue
+        change = (result['median_ms'] - before) / before * 100 if before else 0.0
+        print(f"{name:<36} {before:>10.2f} {result['median_ms']:>10.2f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--scale', type=int, default=10, help="grid multiplier for the large parse case")
+    parser.add_argument('--products', type=int, default=10000, help="products per dedup run")
+    parser.add_argument('--titles', type=int, default=2000, help="titles per normalization and grouping run")
+    parser.add_argument('--alerts', type=int, default=50, help="alerts per fan-out run")
+    parser.add_argument('--latency', type=float, default=20, help="simulated webhook latency in ms")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', help="results file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = {}
+    results.update(bench_replay(args.repeat))
+    results.update(bench_parse(args.repeat, args.scale))
+    results.update(bench_dedup(args.repeat, args.products))
+    results.update(bench_titles(args.repeat, args.titles))
+    results.update(bench_fanout(max(1, args.repeat // 5), args.alerts, args.latency))
+
+    print(f"{'case':<36} {'median ms':>10}  details")
+    for name, result in results.items():
+        details = ', '.join(f"{key}={value}" for key, value in result.items() if key != 'median_ms')
+        print(f"{name:<36} {result['median_ms']:>10.2f}  {details}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'args': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
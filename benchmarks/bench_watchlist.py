@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark watchlist matching as the number of terms grows
+Compares the single compiled pattern with checking each term in turn
+Usage: python benchmarks/bench_watchlist.py [--titles 20000] [--terms 10,100,1000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from title_match import normalize_title
+from watchlist import Watchlist
+
+SYLLABLES = ['char', 'iz', 'ard', 'pik', 'a', 'chu', 'mew', 'two', 'eev', 'ee', 'gar', 'dev', 'oir', 'lu', 'gia',
+             'ray', 'quaz', 'blast', 'oise', 'gen', 'gar', 'drag', 'on', 'ite', 'umb', 're', 'on', 'sylv', 'eon']
+
+
+def words(rng, count):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def make_titles(rng, count):
+    kinds = ['Booster Box', 'Elite Trainer Box', 'Premium Collection', 'Tin', 'Plush', 'Figure', 'Binder']
+    return [f"Pokemon {' '.join(words(rng, 2)).title()} {rng.choice(kinds)} {rng.randint(1, 999)}"
+            for _ in range(count)]
+
+
+def per_term_patterns(terms):
+    """One pattern per term, the way a naive watchlist would check them"""
+    return [re.compile(r'\b' + re.escape(normalize_title(term)) + r's?\b') for term in terms]
+
+
+def time_per_title(match, texts):
+    began = time.perf_counter()
+    for text in texts:
+        match(text)
+    return (time.perf_counter() - began) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--titles', type=int, default=20000)
+    parser.add_argument('--terms', default='10,100,1000')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = make_titles(rng, args.titles)
+    texts = [normalize_title(title) for title in titles]
+    print(f"{'terms':>6} {'compile ms':>11} {'combined us':>12} {'per-term us':>12} {'matched':>8}")
+    for count in [int(n) for n in args.terms.split(',')]:
+        terms = sorted(set(words(rng, count)))
+        began = time.perf_counter()
+        watchlist = Watchlist(include=terms[: len(terms) // 2], exclude=['plush'],
+                              alerts={term: {'priority': 'urgent'} for term in terms[len(terms) // 2:]})
+        compile_ms = (time.perf_counter() - began) * 1000
+        patterns = per_term_patterns(terms + ['plush'])
+
+        combined = time_per_title(watchlist.is_relevant, titles)
+        naive = time_per_title(lambda text: [p for p in patterns if p.search(text)], texts)
+        matched = sum(1 for title in titles if watchlist.is_relevant(title))
+        print(f"{len(watchlist):>6} {compile_ms:>11.1f} {combined:>12.2f} {naive:>12.2f} {matched:>8}")
+
+
+if __name__ == "__main__":
+    main()
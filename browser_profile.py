@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Lean Chrome profile for small runners
+Only the search page's HTML and scripts are needed to find products, so
+images, fonts, media, stylesheets and analytics/tracker requests are blocked
+through the DevTools protocol before they leave the browser. Chrome's own
+background services are switched off, and renderer processes and the JS heap
+are capped, so several monitors fit on one small VM.
+"""
+
+import logging
+import os
+
+from selenium.webdriver.chrome.options import Options
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# URL patterns per resource type; Network.setBlockedURLs matches wildcards, not resource types
+RESOURCE_PATTERNS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'media': ['mp4', 'webm', 'mp3', 'm3u8'],
+    'stylesheet': ['css'],
+}
+DEFAULT_BLOCKED_TYPES = 'image,font,media,stylesheet'
+
+# Third-party analytics, tag managers, ads and session recorders seen on retail storefronts
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'doubleclick.net',
+    'googlesyndication.com', 'facebook.net', 'facebook.com', 'bing.com',
+    'clarity.ms', 'hotjar.com', 'quantummetric.com', 'omtrdc.net', 'demdex.net', 'adobedtm.com',
+    'everesttech.net', 'criteo.com', 'criteo.net', 'tiktok.com', 'pinterest.com', 'snapchat.com',
+    'newrelic.com', 'nr-data.net', 'optimizely.com', 'medallia.com', 'kampyle.com', 'yotpo.com',
+    'bazaarvoice.com', 'livechatinc.com', 'zendesk.com',
+]
+
+# Chrome services a headless scraper never needs
+BACKGROUND_SWITCHES = [
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+]
+
+
+def blocked_url_patterns(block_types, block_domains):
+    """Wildcard patterns for Network.setBlockedURLs"""
+    patterns = []
+    for resource_type in block_types:
+        for extension in RESOURCE_PATTERNS.get(resource_type, []):
+            patterns.extend([f"*.{extension}", f"*.{extension}?*"])
+    for domain in block_domains:
+        patterns.extend([f"*://{domain}/*", f"*://*.{domain}/*"])
+    return patterns
+
+
+class BrowserProfile:
+    def __init__(self, lean=True, block_types=None, block_domains=None, js_heap_mb=256, renderer_limit=2,
+                 window_size='1920,1080', user_agent=USER_AGENT):
+        self.lean = lean
+        self.block_types = [t for t in (block_types if block_types is not None else DEFAULT_BLOCKED_TYPES.split(','))
+                            if t]
+        self.block_domains = block_domains if block_domains is not None else list(TRACKER_DOMAINS)
+        self.js_heap_mb = js_heap_mb
+        self.renderer_limit = renderer_limit
+        self.window_size = window_size
+        self.user_agent = user_agent
+
+        unknown = [t for t in self.block_types if t not in RESOURCE_PATTERNS]
+        if unknown:
+            raise ValueError(f"Unknown resource type(s) {', '.join(unknown)}, expected: {', '.join(RESOURCE_PATTERNS)}")
+
+    @classmethod
+    def from_env(cls):
+        extra_domains = [d.strip() for d in os.environ.get('BLOCK_DOMAINS', '').split(',') if d.strip()]
+        return cls(
+            lean=os.environ.get('LEAN_BROWSER', '1') != '0',
+            block_types=[t.strip() for t in os.environ.get('BLOCK_RESOURCES', DEFAULT_BLOCKED_TYPES).split(',')
+                         if t.strip()],
+            block_domains=TRACKER_DOMAINS + extra_domains,
+            js_heap_mb=int(os.environ.get('BROWSER_JS_HEAP_MB', '256')),
+            renderer_limit=int(os.environ.get('BROWSER_RENDERER_LIMIT', '2'))
+        )
+
+    def chrome_options(self):
+        """Chrome options for this profile"""
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument(f'--window-size={self.window_size}')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-plugins')
+        chrome_options.add_argument(f'--user-agent={self.user_agent}')
+        if not self.lean:
+            return chrome_options
+
+        for switch in BACKGROUND_SWITCHES:
+            chrome_options.add_argument(switch)
+        if self.renderer_limit:
+            chrome_options.add_argument(f'--renderer-process-limit={self.renderer_limit}')
+        if self.js_heap_mb:
+            chrome_options.add_argument(f'--js-flags=--max-old-space-size={self.js_heap_mb}')
+        chrome_options.add_argument('--disk-cache-size=1')
+
+        # The real way to turn images off; there is no --disable-images switch
+        prefs = {'profile.default_content_setting_values.notifications': 2}
+        if 'image' in self.block_types:
+            prefs['profile.managed_default_content_settings.images'] = 2
+        chrome_options.add_experimental_option('prefs', prefs)
+        return chrome_options
+
+    def apply(self, driver):
+        """Install request blocking on a started driver; returns False if the driver has no DevTools access"""
+        if not self.lean:
+            return False
+        patterns = blocked_url_patterns(self.block_types, self.block_domains)
+        if not patterns:
+            return False
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            return True
+        except Exception as e:
+            logging.warning(f"Could not enable request blocking: {e}")
+            return False
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Concurrent crawl planner for several search queries, category pages and result pages
+All pages are fetched at once through a worker pool, so a run takes about as
+long as its slowest page rather than the sum of every page
+"""
+
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from driver_pool import DriverPool
+
+
+class HostRateLimiter:
+    """Space out requests to the same host by at least min_interval seconds"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.intervals = {}
+        self.next_allowed = {}
+        self.lock = threading.Lock()
+
+    def set_interval(self, url, min_interval):
+        """Use a different spacing for url's host, e.g. a store that needs gentler crawling"""
+        self.intervals[urllib.parse.urlparse(url).netloc] = min_interval
+
+    def wait(self, url):
+        """Block until a request to url's host is allowed"""
+        host = urllib.parse.urlparse(url).netloc
+        interval = self.intervals.get(host, self.min_interval)
+        if interval <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_allowed.get(host, 0.0))
+            self.next_allowed[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def plan_targets(monitor, queries, category_paths, max_pages):
+    """Build the list of pages to fetch: every query and category, pages 0..max_pages-1
+
+    Pages past a source's last page are skipped when fetched, see fetch_pages.
+    """
+    targets = []
+    for query in queries:
+        for page in range(max_pages):
+            targets.append({'url': monitor.site.search_url(query, page), 'query': query, 'page': page, 'source': query})
+
+    for path in category_paths:
+        for page in range(max_pages):
+            targets.append({'url': monitor.site.category_url(path, page), 'query': None, 'page': page, 'source': path})
+
+    return targets or [monitor.default_target()]
+
+
+def merge_products(product_lists):
+    """Merge results from several pages into one list with one entry per product URL"""
+    merged = {}
+    for products in product_lists:
+        for product in products:
+            key = product.get('url') or product['title']
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(product)
+                continue
+            if existing['price'] == "Price not found":
+                existing['price'] = product['price']
+            if existing['availability'] == "Unknown":
+                existing['availability'] = product['availability']
+    return list(merged.values())
+
+
+def _fetch_wave(executor, jobs):
+    futures = [executor.submit(monitor.fetch_target, target) for monitor, target in jobs]
+    results = []
+    for (monitor, target), future in zip(jobs, futures):
+        try:
+            results.append(((monitor, target), future.result()))
+        except Exception as e:
+            logging.error(f"Error fetching {target['url']}: {e}")
+            results.append(((monitor, target), failed_page(target)))
+    return results
+
+
+def fetch_pages(jobs, monitors, workers):
+    """Fetch [(monitor, target)] jobs concurrently and return [((monitor, target), (products, stats))]
+
+    Every source's first page is fetched first. Later pages are then only
+    fetched up to the page count the search API reported, and not at all
+    after an empty first page, so a short result list costs no extra requests.
+    The monitors share one driver pool; if none of them has one, it is started
+    for these jobs and closed afterwards.
+    """
+    own_pool = False
+    if monitors[0].driver_pool is None and any(monitor.fetch_mode != 'http' for monitor in monitors):
+        # Drivers are only started if a page needs the Selenium fallback
+        pool = DriverPool(monitors[0].setup_driver, size=workers)
+        for monitor in monitors:
+            monitor.driver_pool = pool
+        own_pool = True
+
+    for monitor in monitors:
+        monitor.page_counts = {}
+    first = [job for job in jobs if job[1].get('page', 0) == 0]
+    later = [job for job in jobs if job[1].get('page', 0) > 0]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = _fetch_wave(executor, first)
+            for (monitor, target), (products, stats) in results:
+                if not products and not stats.get('unchanged'):
+                    monitor.page_counts[target.get('source')] = 0
+            later = [(monitor, target) for monitor, target in later
+                     if target['page'] < monitor.page_counts.get(target.get('source'), target['page'] + 1)]
+            if later:
+                results += _fetch_wave(executor, later)
+    finally:
+        if own_pool:
+            monitors[0].driver_pool.close()
+            for monitor in monitors:
+                monitor.driver_pool = None
+    return results
+
+
+def crawl(monitor, targets, workers):
+    """Fetch all targets concurrently and return the merged, deduplicated products"""
+    workers = max(1, min(workers, len(targets)))
+    logging.info(f"🕸️ Crawling {len(targets)} page(s) with {workers} worker(s)")
+    start = time.perf_counter()
+    results = [page for job, page in fetch_pages([(monitor, target) for target in targets], [monitor], workers)]
+
+    products = merge_products(products for products, stats in results)
+    monitor.last_fetch = crawl_stats([stats for products, stats in results], products, time.perf_counter() - start)
+    logging.info(f"⏱️ Crawl finished in {monitor.last_fetch['seconds']:.2f}s "
+                 f"(slowest page {monitor.last_fetch['slowest_page_seconds']:.2f}s), {len(products)} unique products")
+    return products
+
+
+def failed_page(target):
+    """Result for a page whose fetch raised"""
+    return [], {'url': target['url'], 'path': None, 'seconds': 0.0, 'products': 0, 'attempts': []}
+
+
+def crawl_stats(pages, products, elapsed):
+    """Fetch stats for a crawl of several pages"""
+    return {
+        'path': 'crawl',
+        'seconds': round(elapsed, 3),
+        'products': len(products),
+        'slowest_page_seconds': max((stats['seconds'] for stats in pages), default=0.0),
+        'unchanged': bool(pages) and all(stats.get('unchanged') for stats in pages),
+        'pages': pages
+    }
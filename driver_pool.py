@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Warm WebDriver pool for the long-running monitor
+Keeps Chrome instances alive between polls and recycles crashed,
+worn-out or memory-hungry drivers automatically
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def process_tree_rss_mb(root_pid):
+    """Resident memory of a process and all its descendants in MB (Linux /proc only)"""
+    children = {}
+    rss_pages = {}
+    try:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # The command name may contain spaces, so split after the closing paren
+            fields = stat[stat.rindex(')') + 2:].split()
+            pid = int(entry)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss_pages[pid] = int(fields[21])
+    except (OSError, ValueError):
+        return 0.0
+
+    total_pages = 0
+    stack = [root_pid]
+    seen = set()
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total_pages += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+
+    return total_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def driver_rss_mb(driver):
+    """Memory used by a WebDriver's chromedriver and browser processes in MB"""
+    try:
+        return process_tree_rss_mb(driver.service.process.pid)
+    except Exception:
+        return 0.0
+
+
+class DriverPool:
+    def __init__(self, factory, size=1, max_uses=50, max_memory_mb=1024):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.idle = deque()
+        self.uses = {}
+        self.starting = 0
+        self.lock = threading.Lock()
+        # Notified whenever a driver is returned or a slot frees up, so waiting borrowers re-check
+        self.available = threading.Condition(self.lock)
+        self.closed = False
+
+    def _has_room(self):
+        """True if another driver may be started; call with the lock held"""
+        return len(self.uses) + self.starting < self.size
+
+    def warm(self):
+        """Start drivers until the pool is full"""
+        while True:
+            with self.lock:
+                if self.closed or not self._has_room():
+                    return
+                self.starting += 1
+            driver = self._create()
+            if not driver:
+                return
+            with self.available:
+                self.idle.append(driver)
+                self.available.notify()
+
+    def _create(self):
+        """Create a new driver in a reserved slot and start tracking it"""
+        driver = None
+        try:
+            driver = self.factory()
+        finally:
+            with self.available:
+                self.starting -= 1
+                if driver:
+                    self.uses[driver] = 0
+                else:
+                    self.available.notify()
+        if driver:
+            logging.info(f"Started warm driver ({len(self.uses)}/{self.size})")
+        return driver
+
+    def _retire(self, driver, reason):
+        """Quit a driver and stop tracking it"""
+        logging.info(f"Recycling driver: {reason}")
+        with self.available:
+            self.uses.pop(driver, None)
+            self.available.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _is_alive(self, driver):
+        """Cheap health check: a crashed browser raises on any command"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self, timeout):
+        """An idle driver, or a newly started one if the pool has room; waits up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        with self.available:
+            while not self.idle and not self._has_room():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"No WebDriver became free within {timeout}s")
+                self.available.wait(remaining)
+            if self.idle:
+                return self.idle.popleft()
+            self.starting += 1
+        candidate = self._create()
+        if candidate is None:
+            raise RuntimeError("Could not start a WebDriver")
+        return candidate
+
+    @contextmanager
+    def driver(self, timeout=60):
+        """Borrow a healthy driver, returning or recycling it afterwards"""
+        driver = None
+        while driver is None:
+            candidate = self._acquire(timeout)
+            if self._is_alive(candidate):
+                driver = candidate
+            else:
+                self._retire(candidate, "driver stopped responding")
+
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(driver, failed)
+
+    def _release(self, driver, failed):
+        """Return a driver to the pool unless it crashed, wore out or grew too large"""
+        with self.lock:
+            self.uses[driver] = self.uses.get(driver, 0) + 1
+            uses = self.uses[driver]
+
+        memory_mb = driver_rss_mb(driver)
+        if self.closed:
+            self._retire(driver, "pool closed")
+        elif failed:
+            self._retire(driver, "error during use")
+        elif uses >= self.max_uses:
+            self._retire(driver, f"reached {uses} uses")
+        elif self.max_memory_mb and memory_mb > self.max_memory_mb:
+            self._retire(driver, f"using {memory_mb:.0f}MB (limit {self.max_memory_mb}MB)")
+        else:
+            with self.available:
+                self.idle.append(driver)
+                self.available.notify()
+
+    def memory_mb(self):
+        """Total memory used by every driver the pool is tracking"""
+        with self.lock:
+            drivers = list(self.uses)
+        return sum(driver_rss_mb(driver) for driver in drivers)
+
+    def close(self):
+        """Quit every driver, including any that were never returned"""
+        with self.lock:
+            self.closed = True
+            drivers = list(self.uses)
+        for driver in drivers:
+            self._retire(driver, "pool closed")
+        with self.lock:
+            self.idle.clear()
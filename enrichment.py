@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Product detail page enrichment
+The search grid often shows no stock status and sometimes no price. When
+enabled, the detail pages of new or changed products are fetched in parallel
+(capped at a few workers) and their structured data (schema.org JSON-LD, or
+microdata as a fallback) supplies the authoritative price, stock status and
+item number.
+
+Results are kept in a bounded LRU cache together with what the grid showed
+when the page was read. A product whose grid entry still looks the same is
+filled in from the cache until the result reaches its time-to-live, which is
+much shorter for products the page showed as sold out, so a restock the grid
+does not show is still noticed. A run's extra requests therefore grow with the
+number of changes, not the catalogue size.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from product_store import CURRENCY_SYMBOLS, SOLD_OUT, UNKNOWN, has_price, normalize_price, product_id, stock_state
+
+DETAIL_CACHE_SIZE = 2000
+DETAIL_CACHE_TTL_HOURS = 168
+SOLD_OUT_TTL_HOURS = 6
+
+JSON_LD_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+META_PRICE_RE = re.compile(r'itemprop=["\']price["\'][^>]*content=["\']([\d.,]+)["\']'
+                           r'|property=["\'](?:product|og):price:amount["\'][^>]*content=["\']([\d.,]+)["\']', re.IGNORECASE)
+META_CURRENCY_RE = re.compile(r'itemprop=["\']priceCurrency["\'][^>]*content=["\'](\w{3})["\']'
+                              r'|property=["\'](?:product|og):price:currency["\'][^>]*content=["\'](\w{3})["\']', re.IGNORECASE)
+META_AVAILABILITY_RE = re.compile(r'itemprop=["\']availability["\'][^>]*(?:content|href)=["\']([^"\']+)["\']', re.IGNORECASE)
+ITEM_NUMBER_RE = re.compile(r'\bItem\s*(?:#|No\.?|Number)?\s*:?\s*(\d{4,})', re.IGNORECASE)
+
+# schema.org ItemAvailability values, compared without their URL prefix
+AVAILABILITY_LABELS = {
+    'instock': 'In Stock',
+    'limitedavailability': 'Low Stock',
+    'onlineonly': 'In Stock',
+    'instoreonly': 'In Stock',
+    'outofstock': 'Out of Stock',
+    'soldout': 'Out of Stock',
+    'discontinued': 'Out of Stock',
+}
+
+
+def format_price(amount, currency=None):
+    """'$119.99' from a structured-data amount and currency code, or None"""
+    try:
+        value = float(str(amount).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+    return f"{CURRENCY_SYMBOLS.get((currency or '').upper(), '$')}{value:,.2f}"
+
+
+def availability_label(value):
+    """Stock text the store understands from a schema.org availability URL or name"""
+    name = (value or '').rstrip('/').rsplit('/', 1)[-1].lower()
+    return AVAILABILITY_LABELS.get(name)
+
+
+def _json_ld_products(page_source):
+    """Every schema.org Product object in the page's JSON-LD blocks"""
+    for block in JSON_LD_RE.findall(page_source):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                types = item.get('@type')
+                if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+                    yield item
+                stack.extend(item.get('@graph') or [])
+
+
+def parse_detail_page(page_source):
+    """Price, availability and item number from a product page; each is None if the page does not say"""
+    detail = {'price': None, 'availability': None, 'item_number': None}
+    page_source = page_source or ''
+
+    for product in _json_ld_products(page_source):
+        offers = product.get('offers') or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        detail['price'] = detail['price'] or format_price(offers.get('price') or offers.get('lowPrice'),
+                                                          offers.get('priceCurrency'))
+        detail['availability'] = detail['availability'] or availability_label(offers.get('availability'))
+        item = product.get('sku') or product.get('productID') or product.get('mpn')
+        detail['item_number'] = detail['item_number'] or (str(item) if item else None)
+
+    if not detail['price']:
+        price = META_PRICE_RE.search(page_source)
+        currency = META_CURRENCY_RE.search(page_source)
+        if price:
+            detail['price'] = format_price(price.group(1) or price.group(2),
+                                           (currency.group(1) or currency.group(2)) if currency else None)
+    if not detail['availability']:
+        availability = META_AVAILABILITY_RE.search(page_source)
+        detail['availability'] = availability_label(availability.group(1)) if availability else None
+    if not detail['item_number']:
+        item = ITEM_NUMBER_RE.search(page_source)
+        detail['item_number'] = item.group(1) if item else None
+    return detail
+
+
+def grid_signature(product):
+    """What the search grid showed for a product; a different signature means the product changed"""
+    return f"{product.get('title', '')}|{product.get('price', '')}|{product.get('availability', '')}"
+
+
+def needs_detail(store, product):
+    """For products without a cache entry: True if new, or if the grid price or stock differs from the snapshot"""
+    record = store.lookup(product)
+    if record is None:
+        return True
+    price = normalize_price(product.get('price'))
+    if has_price(price) and price != record.get('price'):
+        return True
+    stock = stock_state(product.get('availability'))
+    return stock != UNKNOWN and stock != record.get('stock', UNKNOWN)
+
+
+class DetailCache:
+    """Detail page results and the grid they were read for, in least-recently-used order
+
+    A result is stale ttl_hours after its page was read, or sold_out_ttl_hours
+    if the page showed the product sold out. Lookups only reorder entries, so
+    an unchanged run does not rewrite the file.
+    """
+
+    def __init__(self, path, max_entries=DETAIL_CACHE_SIZE, ttl_hours=DETAIL_CACHE_TTL_HOURS,
+                 sold_out_ttl_hours=SOLD_OUT_TTL_HOURS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = timedelta(hours=ttl_hours)
+        self.sold_out_ttl = timedelta(hours=sold_out_ttl_hours)
+        self.entries = OrderedDict()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, max_entries=DETAIL_CACHE_SIZE, ttl_hours=DETAIL_CACHE_TTL_HOURS,
+             sold_out_ttl_hours=SOLD_OUT_TTL_HOURS):
+        cache = cls(path, max_entries, ttl_hours, sold_out_ttl_hours)
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    cache.entries = OrderedDict(json.load(f).get('products', []))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable detail cache {path}: {e}")
+        return cache
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """The cached entry for a product ({'grid', 'detail', 'fetched_at'}), fresh or not, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry, now=None):
+        """True until the entry's page is due to be read again"""
+        now = now or datetime.now()
+        sold_out = stock_state(entry['detail'].get('availability')) == SOLD_OUT
+        return now - datetime.fromisoformat(entry['fetched_at']) <= (self.sold_out_ttl if sold_out else self.ttl)
+
+    def put(self, key, signature, detail, now=None):
+        now = (now or datetime.now()).isoformat()
+        with self.lock:
+            self.entries[key] = {'grid': signature, 'detail': detail, 'fetched_at': now}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        """Write the cache, oldest entry first, if anything changed"""
+        with self.lock:
+            if not self.dirty or not self.path:
+                return False
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'products': list(self.entries.items())}, f, ensure_ascii=False)
+                f.write('\n')
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            return True
+
+
+def apply_detail(product, detail):
+    """Overwrite a product's grid values with whatever the detail page knew"""
+    if has_price(normalize_price(detail.get('price'))):
+        product['price'] = detail['price']
+    if stock_state(detail.get('availability')) != UNKNOWN:
+        product['availability'] = detail['availability']
+    if detail.get('item_number'):
+        product['item_number'] = detail['item_number']
+
+
+def keep_stored(product, entry, record):
+    """After a failed read, fall back to the stored snapshot so the grid's values raise no events"""
+    if entry and entry['detail'].get('item_number'):
+        product['item_number'] = entry['detail']['item_number']
+    if record is None:
+        return
+    if has_price(record.get('price')):
+        product['price'] = record['price']
+    product['availability'] = "Unknown"
+
+
+class DetailEnricher:
+    """Fills in products from their detail pages, fetching only new or changed ones"""
+
+    def __init__(self, fetch, cache, workers=4):
+        self.fetch = fetch
+        self.cache = cache
+        self.workers = workers
+
+    def enrich(self, products, store):
+        """Enrich products in place and return counts of cached, fetched and failed lookups"""
+        stats = {'cached': 0, 'fetched': 0, 'failed': 0}
+        to_fetch = []
+        for product in products:
+            if not product.get('url'):
+                continue
+            key = product_id(product)
+            signature = grid_signature(product)
+            entry = self.cache.get(key)
+            if entry is not None and entry['grid'] == signature and self.cache.is_fresh(entry):
+                apply_detail(product, entry['detail'])
+                stats['cached'] += 1
+            elif entry is not None or needs_detail(store, product):
+                to_fetch.append((product, key, signature, entry))
+
+        if to_fetch:
+            workers = max(1, min(self.workers, len(to_fetch)))
+            logging.info(f"🔎 Reading {len(to_fetch)} product detail page(s) with {workers} worker(s)")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self.fetch, product['url']) for product, key, signature, entry in to_fetch]
+                for (product, key, signature, entry), future in zip(to_fetch, futures):
+                    try:
+                        detail = parse_detail_page(future.result())
+                    except Exception as e:
+                        # The cache keeps the old grid, so the product is read again next run
+                        logging.warning(f"Could not read detail page {product['url']}: {e}")
+                        keep_stored(product, entry, store.lookup(product))
+                        stats['failed'] += 1
+                        continue
+                    self.cache.put(key, signature, detail)
+                    apply_detail(product, detail)
+                    stats['fetched'] += 1
+
+        try:
+            self.cache.save()
+        except OSError as e:
+            logging.error(f"Error saving detail cache: {e}")
+        return stats
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Conditional fetching: remember what each result page looked like last run
+For every fetched page we keep its ETag/Last-Modified validators and a
+fingerprint of the product grid (item codes, prices and stock text, in page
+order). If the server answers 304, or the fingerprint matches, the page is
+reported as unchanged and extraction, dedup and the state write are skipped.
+
+New fingerprints are only written after the run's state has been saved, so
+a crashed run never hides its changes from the next one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from product_store import PRODUCT_CODE_RE, PRICE_RE, OUT_OF_STOCK_RE, IN_STOCK_RE
+
+FULL_REFRESH_HOURS = 24
+
+# Everything on a page that can cause a change event
+GRID_TOKEN_RE = re.compile(
+    '|'.join(f'(?:{pattern.pattern})' for pattern in [PRODUCT_CODE_RE, PRICE_RE, OUT_OF_STOCK_RE, IN_STOCK_RE]),
+    re.IGNORECASE
+)
+
+
+class Unchanged(list):
+    """An empty fetch result meaning the page is the same as last run"""
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def grid_fingerprint(page_source):
+    """Hash of the product grid's item codes, prices and stock text, or None if there are no products"""
+    tokens = [match.group(0).lower() for match in GRID_TOKEN_RE.finditer(page_source or '')]
+    if not any('/p/' in token for token in tokens):
+        return None
+    return _digest('\n'.join(tokens))
+
+
+def api_fingerprint(data):
+    """Hash of the products in a JSON search response, or None if there are none"""
+    products = (data or {}).get('products')
+    if not products:
+        return None
+    return _digest(json.dumps(products, sort_keys=True, ensure_ascii=False))
+
+
+class FetchCache:
+    def __init__(self, path, max_age_hours=FULL_REFRESH_HOURS):
+        self.path = path
+        self.max_age = timedelta(hours=max_age_hours)
+        self.entries = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, max_age_hours=FULL_REFRESH_HOURS):
+        cache = cls(path, max_age_hours)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    cache.entries = json.load(f).get('pages', {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable fetch cache {path}: {e}")
+        return cache
+
+    def _fresh(self, key):
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        if datetime.now() - datetime.fromisoformat(entry['checked_at']) > self.max_age:
+            return None
+        return entry
+
+    def conditional_headers(self, key):
+        """If-None-Match / If-Modified-Since headers for a page seen on an earlier run"""
+        entry = self._fresh(key)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, key, fingerprint):
+        """True if the page has the same product fingerprint as the last fully processed run"""
+        entry = self._fresh(key)
+        return bool(fingerprint) and entry is not None and entry['fingerprint'] == fingerprint
+
+    def remember(self, key, fingerprint, response=None):
+        """Stage a page's fingerprint and validators until commit()"""
+        if not fingerprint:
+            return
+        headers = response.headers if response is not None else {}
+        with self.lock:
+            self.pending[key] = {
+                'fingerprint': fingerprint,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'checked_at': datetime.now().isoformat()
+            }
+
+    def discard(self):
+        with self.lock:
+            self.pending.clear()
+
+    def commit(self):
+        """Write staged fingerprints once the run's state is safely saved"""
+        with self.lock:
+            if not self.pending:
+                return False
+            self.entries.update(self.pending)
+            self.pending.clear()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pages': self.entries}, f, indent=2, sort_keys=True)
+                f.write('\n')
+            os.replace(tmp_path, self.path)
+            return True
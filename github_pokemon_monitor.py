@@ -1,28 +1,45 @@
 #!/usr/bin/env python3
 """
 Costco Australia Pokemon Set Monitor - GitHub Actions Version
-Runs once per execution (GitHub Actions will schedule it)
+Runs once per execution (GitHub Actions will schedule it),
+or continuously with --daemon using warm browsers
 """
 
 import requests
-from bs4 import BeautifulSoup
 import time
 import json
 import os
+import signal
+import threading
+import argparse
 from datetime import datetime
 import logging
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import urllib.parse
+
+from browser_profile import BrowserProfile
+from enrichment import DetailCache, DetailEnricher
+from driver_pool import DriverPool, driver_rss_mb
+from product_extractor import extract_products
+from crawler import HostRateLimiter, plan_targets, crawl
+from product_store import ProductStore, NEW_LISTING, PRICE_CHANGE, BACK_IN_STOCK
+from notifications import (NotificationDispatcher, DiscordChannel, TelegramChannel, NtfyChannel, build_channels,
+                           build_named_channels)
+from outbox import Outbox, OutboxDrainer, notification_key
+from fetch_cache import FetchCache, Unchanged, api_fingerprint, grid_fingerprint
+from sites import DEFAULT_SITE, get_site, load_sites
+from history_db import HistoryDB, product_observations
+from scheduler import AdaptivePoller, DropHistory, SiteScheduler
+from run_metrics import RunMetrics, MetricsRegistry, MetricsServer, append_run_record
+from watchlist import Watchlist
 
 class GitHubCostcoPokemonMonitor:
-    def __init__(self):
-        self.base_url = "https://www.costco.com.au"
-        self.search_url = f"{self.base_url}/search?text=pokemon"
+    def __init__(self, site=None):
+        # The store being watched: URLs, card markup and price format come from its adapter
+        self.site = site or get_site(DEFAULT_SITE)
+        self.site_label = None
+        self.base_url = self.site.base_url
+        self.search_query = "pokemon"
+        self.search_url = self.site.search_url(self.search_query)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -30,7 +47,60 @@ class GitHubCostcoPokemonMonitor:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         }
-        self.known_products = set()
+        self.known_products = ProductStore()
+        self.last_events = []
+        self.notify_events = [e.strip() for e in os.environ.get('NOTIFY_EVENTS', f"{NEW_LISTING},{BACK_IN_STOCK},{PRICE_CHANGE}").split(',') if e.strip()]
+        # Which titles count, which are skipped, and which alerts get a higher priority or extra channels
+        self.watchlist = Watchlist.from_env()
+        self.state_path = self.site.state_file(os.environ.get('STATE_FILE', 'known_products.jsonl'))
+        self.outbox_path = os.environ.get('OUTBOX_FILE', 'notification_outbox.jsonl')
+        self.run_log_path = os.environ.get('RUN_LOG_FILE', 'run_metrics.jsonl')
+        self.fetch_cache = FetchCache.load(self.site.state_file(os.environ.get('FETCH_CACHE_FILE', 'fetch_cache.json')),
+                                           float(os.environ.get('FULL_REFRESH_HOURS', '24')))
+        self.metrics = RunMetrics()
+        
+        # Fast path: plain HTTP with a pooled session, Selenium only as fallback
+        self.fetch_mode = os.environ.get('FETCH_MODE', 'auto').lower()
+        self.http_timeout = float(os.environ.get('HTTP_TIMEOUT', '10'))
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.last_fetch = {}
+        self.html_parser = os.environ.get('HTML_PARSER', 'html.parser')
+        self.driver_pool = None
+        
+        # Crawl plan: extra queries, category pages and pagination, fetched concurrently
+        self.search_queries = [q.strip() for q in os.environ.get('SEARCH_QUERIES', self.search_query).split(',') if q.strip()]
+        self.category_paths = [c.strip() for c in os.environ.get('CATEGORY_PATHS', '').split(',') if c.strip()]
+        self.max_pages = int(os.environ.get('MAX_PAGES', '1'))
+        # Result pages per query as reported by the search API this run
+        self.page_counts = {}
+        self.crawl_workers = int(os.environ.get('CRAWL_WORKERS', '4'))
+        self.rate_limiter = HostRateLimiter(float(os.environ.get('HOST_MIN_INTERVAL', '0.25')))
+        
+        # Readiness detection: wait for the product grid to stop changing
+        self.grid_selector = self.site.grid_selector
+        self.no_results_selector = self.site.no_results_selector
+        self.ready_script = (
+            "return [document.querySelectorAll(arguments[0]).length, "
+            "document.readyState, !!document.querySelector(arguments[1])];"
+        )
+        self.ready_timeout = float(os.environ.get('READY_TIMEOUT', '20'))
+        self.ready_settle = float(os.environ.get('READY_SETTLE', '1.0'))
+        self.ready_poll_interval = 0.25
+        self.last_scrape_timings = {}
+        
+        # Lean browser: no images, fonts, CSS or trackers, capped renderer processes and JS heap
+        self.browser_profile = BrowserProfile.from_env()
+        
+        # Optional detail page reads for new or changed products, cached per product
+        self.enricher = None
+        if os.environ.get('ENRICH_DETAILS', '') == '1':
+            detail_cache = DetailCache.load(self.site.state_file(os.environ.get('DETAIL_CACHE_FILE', 'detail_cache.json')),
+                                            int(os.environ.get('DETAIL_CACHE_SIZE', '2000')),
+                                            float(os.environ.get('DETAIL_CACHE_TTL_HOURS', '168')),
+                                            float(os.environ.get('DETAIL_SOLD_OUT_TTL_HOURS', '6')))
+            self.enricher = DetailEnricher(self.fetch_detail_page, detail_cache,
+                                           int(os.environ.get('ENRICH_WORKERS', '4')))
         
         # Setup logging
         logging.basicConfig(
@@ -38,223 +108,214 @@ class GitHubCostcoPokemonMonitor:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
-        # Load existing products from previous runs
+        # Load existing products and undelivered notifications from previous runs
         self.load_known_products_from_github()
+        self.outbox = Outbox.load(self.outbox_path)
+        history_path = os.environ.get('HISTORY_DB', 'product_history.db')
+        self.history = HistoryDB(history_path) if history_path else None
+        self.drop_history = DropHistory.load(os.environ.get('DROP_HISTORY_FILE', 'drop_history.jsonl'),
+                                             store=self.known_products)
     
     def load_known_products_from_github(self):
-        """Load previously found products from JSON file"""
+        """Load previously found products from the append-only state file"""
         try:
-            if os.path.exists('known_products.json'):
-                with open('known_products.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.known_products = set(data.get('products', []))
-                    logging.info(f"Loaded {len(self.known_products)} known products from file")
-            else:
-                logging.info("No previous products file found, starting fresh")
+            legacy_path = 'known_products.json' if self.site.name == DEFAULT_SITE else None
+            self.known_products = ProductStore.load(self.state_path, legacy_path=legacy_path)
         except Exception as e:
             logging.error(f"Error loading products from file: {e}")
-            self.known_products = set()
+            self.known_products = ProductStore()
     
     def save_known_products_to_github(self):
-        """Save known products to JSON file for next run"""
+        """Append new and changed products to the state file for next run"""
         try:
-            data = {
-                'products': list(self.known_products),
-                'last_updated': datetime.now().isoformat()
-            }
-            with open('known_products.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logging.info(f"Saved {len(self.known_products)} known products to file")
+            with self.metrics.phase('save_state'):
+                written = self.known_products.save(self.state_path)
+            logging.info(f"Saved {written} new or changed records ({len(self.known_products)} known products)")
+            return True
         except Exception as e:
             logging.error(f"Error saving products to file: {e}")
+            return False
     
     def setup_driver(self):
         """Setup Chrome WebDriver with appropriate options for GitHub Actions"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-images')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
         try:
-            driver = webdriver.Chrome(options=chrome_options)
+            with self.metrics.phase('driver_start'):
+                driver = webdriver.Chrome(options=self.browser_profile.chrome_options())
             driver.set_page_load_timeout(30)
+            self.browser_profile.apply(driver)
             return driver
         except Exception as e:
             logging.error(f"Error setting up WebDriver: {e}")
             return None
     
-    def fetch_pokemon_products(self):
-        """Fetch Pokemon products from Costco Australia using Selenium"""
-        driver = None
+    def fetch_all_products(self):
+        """Fetch every query, category and page in the crawl plan and merge the results"""
+        targets = plan_targets(self, self.search_queries, self.category_paths, self.max_pages)
+        if len(targets) == 1:
+            return self.fetch_pokemon_products(targets[0])
+        return crawl(self, targets, self.crawl_workers)
+    
+    def default_target(self):
+        """The single search page checked when no crawl plan is configured"""
+        return {'url': self.search_url, 'query': self.search_query, 'page': 0, 'source': self.search_query}
+    
+    def fetch_pokemon_products(self, target=None):
+        """Fetch Pokemon products, trying the browserless HTTP path before Selenium"""
+        products, self.last_fetch = self.fetch_target(target or self.default_target())
+        return products
+    
+    def fetch_target(self, target):
+        """Fetch one page of results and return (products, fetch stats)"""
+        start = time.perf_counter()
+        attempts = []
+        products = []
+        path = None
+        self.metrics.count('pages')
+        
+        if self.fetch_mode in ('auto', 'http'):
+            products = self._timed_attempt('http', self.fetch_products_http, target, attempts)
+            path = 'http'
+            if products and not self._is_usable(products):
+                logging.info("HTTP fetch returned no product-page links, discarding result")
+                products = []
+        
+        # An empty later page is past the last page, not a script-rendered shell, so no browser for it
+        past_end = self.fetch_mode == 'auto' and target.get('page', 0) > 0
+        if not products and not isinstance(products, Unchanged) and self.fetch_mode in ('auto', 'selenium') and not past_end:
+            products = self._timed_attempt('selenium', self.fetch_products_selenium, target, attempts)
+            path = 'selenium'
+        
+        elapsed = time.perf_counter() - start
+        unchanged = isinstance(products, Unchanged)
+        stats = {
+            'url': target['url'],
+            'path': path,
+            'seconds': round(elapsed, 3),
+            'products': len(products),
+            'unchanged': unchanged,
+            'attempts': attempts
+        }
+        if unchanged:
+            self.metrics.count('unchanged_pages')
+            logging.info(f"⏱️ {target['url']} unchanged since last run ({path} path, {elapsed:.2f}s)")
+        else:
+            logging.info(f"⏱️ Fetch of {target['url']} finished via {path} path in {elapsed:.2f}s ({len(products)} products)")
+        return products, stats
+    
+    def _timed_attempt(self, path, fetch, target, attempts):
+        """Run one fetch strategy and record how long it took"""
+        start = time.perf_counter()
+        products = fetch(target)
+        elapsed = time.perf_counter() - start
+        self.metrics.add_time(f"fetch_{path}", elapsed)
+        attempts.append({'path': path, 'seconds': round(elapsed, 3), 'products': len(products),
+                         'unchanged': isinstance(products, Unchanged)})
+        logging.info(f"{path} fetch took {elapsed:.2f}s and returned {len(products)} products")
+        return products
+    
+    def _is_usable(self, products):
+        """A result is usable if at least one product links to a product page"""
+        return any(self.site.is_product_url(product.get('url', '')) for product in products)
+    
+    def fetch_products_http(self, target):
+        """Fetch products without a browser: JSON search API first, then the HTML search page"""
+        if target.get('query'):
+            products = self.fetch_products_from_api(target['query'], target.get('page', 0))
+            if products or isinstance(products, Unchanged):
+                return products
+        
         try:
-            logging.info("Starting browser to fetch Pokemon products from Costco Australia...")
-            driver = self.setup_driver()
-            if not driver:
+            key = f"page:{target['url']}"
+            self.rate_limiter.wait(target['url'])
+            with self.metrics.phase('page_request'):
+                response = self.session.get(target['url'], headers=self.fetch_cache.conditional_headers(key),
+                                            timeout=self.http_timeout)
+            if response.status_code == 304:
+                return Unchanged()
+            if response.status_code != 200:
+                logging.warning(f"HTTP search page returned {response.status_code}")
                 return []
-            
-            # Navigate to search page
-            driver.get(self.search_url)
-            
-            # Wait for page to load and check for content
-            wait = WebDriverWait(driver, 20)
-            
-            products = []
-            
-            try:
-                # Wait for the page to load
-                wait.until(lambda d: 
-                    d.find_elements(By.CSS_SELECTOR, '[data-testid*="product"], .product, [class*="product"], .no-results, .search-results') or 
-                    "no results" in d.page_source.lower() or
-                    len(d.find_elements(By.TAG_NAME, "a")) > 10
+            fingerprint = grid_fingerprint(response.text)
+            if fingerprint is None:
+                # No product-page links at all (e.g. a script-rendered shell), so nothing usable to parse
+                logging.info("HTTP search page has no product links")
+                return []
+            if self.fetch_cache.is_unchanged(key, fingerprint):
+                return Unchanged()
+            products = self.parse_products(response.text)
+            if self._is_usable(products):
+                self.fetch_cache.remember(key, fingerprint, response)
+            return products
+        except Exception as e:
+            logging.error(f"Error fetching search page over HTTP: {e}")
+            return []
+    
+    def fetch_detail_page(self, url):
+        """HTML of one product page; raises if the store does not return it"""
+        self.rate_limiter.wait(url)
+        response = self.session.get(url, timeout=self.http_timeout)
+        response.raise_for_status()
+        return response.text
+    
+    def fetch_products_from_api(self, query, page=0):
+        """Fetch products from the site's JSON search endpoint"""
+        request = self.site.api_request(query, page)
+        if request is None:
+            return []
+        api_url, params = request
+        key = f"api:{query}:{page}"
+        try:
+            self.rate_limiter.wait(api_url)
+            with self.metrics.phase('api_request'):
+                response = self.session.get(
+                    api_url,
+                    params=params,
+                    headers={'Accept': 'application/json', **self.fetch_cache.conditional_headers(key)},
+                    timeout=self.http_timeout
                 )
-                
-                # Give extra time for dynamic content to load
-                time.sleep(5)
-                
-                # Get page source and parse with BeautifulSoup
-                page_source = driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
-                
-                # Try multiple strategies to find products
-                product_selectors = [
-                    '[data-testid*="product"]',
-                    '.product-item',
-                    '.product-card', 
-                    '.product-list-item',
-                    '.product-tile',
-                    '[class*="product"][class*="item"]',
-                    'a[href*="/p/"]',  # Product page links
-                    'article',
-                    '.search-result',
-                ]
-                
-                all_potential_products = []
-                
-                for selector in product_selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        logging.info(f"Found {len(elements)} elements with selector: {selector}")
-                        all_potential_products.extend(elements)
-                
-                # Also search in text content for Pokemon mentions
-                text_content = soup.get_text().lower()
-                if 'pokemon' in text_content:
-                    logging.info("✅ Found 'pokemon' in page text content")
-                    
-                    # Look for any links that might be products
-                    all_links = soup.find_all('a', href=True)
-                    for link in all_links:
-                        link_text = link.get_text().lower()
-                        if 'pokemon' in link_text or 'tcg' in link_text or 'trading' in link_text:
-                            all_potential_products.append(link)
-                
-                # Process potential products
-                seen_urls = set()
-                
-                for element in all_potential_products:
-                    try:
-                        # Get URL first for deduplication
-                        url = ""
-                        if element.name == 'a' and element.get('href'):
-                            url = element['href']
-                        else:
-                            link_elem = element.find('a')
-                            if link_elem and link_elem.get('href'):
-                                url = link_elem['href']
-                        
-                        if url and not url.startswith('http'):
-                            url = self.base_url + url
-                        
-                        # Skip duplicates by URL
-                        if url and url in seen_urls:
-                            continue
-                        if url:
-                            seen_urls.add(url)
-                        
-                        # Extract title/product name
-                        title = None
-                        title_selectors = ['h1', 'h2', 'h3', 'h4', '.product-title', '.product-name', '[data-testid*="title"]']
-                        
-                        for selector in title_selectors:
-                            title_elem = element.select_one(selector)
-                            if title_elem:
-                                title = title_elem.get_text().strip()
-                                break
-                        
-                        if not title:
-                            title = element.get_text().strip()
-                        
-                        # Clean up title
-                        if title:
-                            import re
-                            title = re.sub(r'\s+', ' ', title)
-                            lines = title.split('\n')
-                            for line in lines:
-                                line = line.strip()
-                                if line and ('pokemon' in line.lower() or 'tcg' in line.lower()):
-                                    if len(line) > 10 and len(line) < 200:
-                                        title = line
-                                        break
-                        
-                        # Skip if no title or title doesn't contain Pokemon-related terms
-                        if not title or not any(term in title.lower() for term in ['pokemon', 'pokémon', 'tcg', 'trading card']):
-                            continue
-                        
-                        # Get price
-                        price = "Price not found"
-                        price_selectors = ['.price', '[class*="price"]', '[data-testid*="price"]', '.cost']
-                        
-                        for selector in price_selectors:
-                            price_elem = element.select_one(selector)
-                            if price_elem:
-                                price_text = price_elem.get_text().strip()
-                                if '$' in price_text or 'aud' in price_text.lower():
-                                    price = price_text
-                                    break
-                        
-                        # Get availability
-                        availability = "Unknown"
-                        availability_selectors = ['.stock', '.availability', '[class*="stock"]', '[class*="availability"]']
-                        
-                        for selector in availability_selectors:
-                            avail_elem = element.select_one(selector)
-                            if avail_elem:
-                                availability = avail_elem.get_text().strip()
-                                break
-                        
-                        product = {
-                            'title': title,
-                            'url': url,
-                            'price': price,
-                            'availability': availability,
-                            'found_at': datetime.now().isoformat()
-                        }
-                        products.append(product)
-                        
-                        logging.info(f"Found Pokemon product: {title[:50]}...")
-                        
-                    except Exception as e:
-                        logging.error(f"Error parsing product element: {e}")
-                        continue
-                
-                if not products:
-                    logging.info("No Pokemon products found")
-                    logging.info(f"Page title: {soup.find('title').get_text() if soup.find('title') else 'No title'}")
-                    logging.info(f"Page contains 'pokemon': {'pokemon' in text_content}")
-                    logging.info(f"Total links on page: {len(soup.find_all('a'))}")
-                
-            except TimeoutException:
-                logging.warning("Timeout waiting for page to load")
+            if response.status_code == 304:
+                return Unchanged()
+            if response.status_code != 200:
+                logging.info(f"JSON search endpoint returned {response.status_code}")
                 return []
-            
-            logging.info(f"Found {len(products)} Pokemon products")
+            data = response.json()
+            total_pages = (data.get('pagination') or {}).get('totalPages')
+            if isinstance(total_pages, int):
+                self.page_counts[query] = total_pages
+            fingerprint = api_fingerprint(data)
+            if self.fetch_cache.is_unchanged(key, fingerprint):
+                return Unchanged()
+            products = self.parse_api_products(data)
+            if products:
+                self.fetch_cache.remember(key, fingerprint, response)
             return products
+        except Exception as e:
+            logging.info(f"JSON search endpoint unavailable: {e}")
+            return []
+    
+    def parse_api_products(self, data):
+        """Convert a JSON search response into product dicts"""
+        self.metrics.count('candidates', len(data.get('products', [])))
+        return self.site.parse_api_products(data, datetime.now().isoformat(), watchlist=self.watchlist)
+    
+    def fetch_products_selenium(self, target=None):
+        """Fetch Pokemon products from the site's search page using Selenium"""
+        url = (target or self.default_target())['url']
+        if self.driver_pool:
+            try:
+                with self.driver_pool.driver() as driver:
+                    return self.scrape_with_driver(driver, url)
+            except Exception as e:
+                logging.error(f"Error fetching products with pooled driver: {e}")
+                return []
+        
+        driver = None
+        try:
+            logging.info(f"Starting browser to fetch Pokemon products from {self.site.label}...")
+            driver = self.setup_driver()
+            if not driver:
+                return []
+            return self.scrape_with_driver(driver, url)
             
         except Exception as e:
             logging.error(f"Error fetching products with Selenium: {e}")
@@ -266,155 +327,416 @@ class GitHubCostcoPokemonMonitor:
                 except:
                     pass
     
-    def check_for_new_products(self, products):
-        """Check if there are any new products"""
-        new_products = []
+    def scrape_with_driver(self, driver, url=None):
+        """Load the search page in an existing driver and parse the products"""
+        url = url or self.search_url
+        timings = {}
+        self.last_scrape_timings = timings
         
-        for product in products:
-            product_key = f"{product['title']}|{product['price']}"
-            if product_key not in self.known_products:
-                new_products.append(product)
-                self.known_products.add(product_key)
+        # Navigate to search page
+        self.rate_limiter.wait(url)
+        start = time.perf_counter()
+        driver.get(url)
+        timings['navigate'] = round(time.perf_counter() - start, 3)
+        self.metrics.add_time('navigate', timings['navigate'])
+        self.metrics.gauge_max('driver_rss_mb', driver_rss_mb(driver))
+        
+        # Wait until the product grid stops changing
+        start = time.perf_counter()
+        ready, node_count = self.wait_for_grid_ready(driver)
+        timings['ready'] = round(time.perf_counter() - start, 3)
+        self.metrics.add_time('ready_wait', timings['ready'])
+        self.metrics.gauge_max('driver_rss_mb', driver_rss_mb(driver))
+        
+        if not ready and node_count == 0:
+            logging.warning("Timeout waiting for page to load")
+            self._log_timings(timings)
+            return []
         
-        return new_products
+        # Skip parsing entirely if the grid matches the last processed run
+        page_source = driver.page_source
+        key = f"rendered:{url}"
+        fingerprint = grid_fingerprint(page_source)
+        if self.fetch_cache.is_unchanged(key, fingerprint):
+            self._log_timings(timings)
+            logging.info("Product grid unchanged since last run")
+            return Unchanged()
+        
+        # Parse with BeautifulSoup
+        start = time.perf_counter()
+        products = self.parse_products(page_source)
+        timings['parse'] = round(time.perf_counter() - start, 3)
+        if products:
+            self.fetch_cache.remember(key, fingerprint)
+        
+        self._log_timings(timings)
+        logging.info(f"Found {len(products)} Pokemon products")
+        return products
+    
+    def wait_for_grid_ready(self, driver):
+        """Poll the product node count until it stops changing or the timeout is hit
+        
+        Returns (ready, node_count). Only the count is sent back from the browser,
+        so each poll is cheap compared to serializing the page source.
+        """
+        deadline = time.monotonic() + self.ready_timeout
+        last_count = None
+        stable_since = time.monotonic()
+        
+        while True:
+            now = time.monotonic()
+            try:
+                count, state, no_results = driver.execute_script(self.ready_script, self.grid_selector, self.no_results_selector)
+            except Exception as e:
+                logging.debug(f"Readiness probe failed: {e}")
+                count, state, no_results = 0, 'loading', False
+            
+            if no_results and state == 'complete':
+                return True, count
+            
+            if count != last_count:
+                last_count = count
+                stable_since = now
+            elif count > 0 and state == 'complete' and now - stable_since >= self.ready_settle:
+                return True, count
+            
+            if now >= deadline:
+                logging.info(f"Page did not settle within {self.ready_timeout}s ({count} product nodes)")
+                return False, count
+            
+            time.sleep(self.ready_poll_interval)
+    
+    def _log_timings(self, timings):
+        """Log per-phase timings for one page load"""
+        phases = ', '.join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items())
+        logging.info(f"⏱️ Page phases: {phases}")
+    
+    def parse_products(self, page_source):
+        """Extract Pokemon products from a rendered search page in a single tree walk"""
+        stats = {}
+        with self.metrics.phase('parse'):
+            products = extract_products(page_source, self.base_url, datetime.now().isoformat(),
+                                        parser=self.html_parser, watchlist=self.watchlist, stats=stats,
+                                        markup=self.site.markup)
+        self.metrics.count('candidates', stats.get('candidates', 0))
+        for product in products:
+            logging.info(f"Found Pokemon product: {product['title'][:50]}...")
+        return products
+    
+    def check_for_changes(self, products):
+        """Diff this run's products against the stored snapshot and return change events"""
+        with self.metrics.phase('dedup'):
+            events = self.known_products.diff(products)
+        self.last_events = events
+        return events
+    
+    def check_for_new_products(self, products):
+        """Check if there are any new products"""
+        events = self.check_for_changes(products)
+        return [event['product'] for event in events if event['type'] == NEW_LISTING]
+    
+    def alert_products(self, events):
+        """Products to notify about, tagged with the event that triggered them"""
+        alerts = []
+        for event in events:
+            if event['type'] not in self.notify_events:
+                continue
+            product = dict(event['product'])
+            product['event'] = event['type']
+            product['key'] = notification_key(event)
+            if self.site.name != DEFAULT_SITE:
+                # Item codes are only unique within one store
+                product['key'] = f"{self.site.name}:{product['key']}"
+            if self.site_label:
+                product['site'] = self.site_label
+            if event.get('variant_of'):
+                product['variant_of'] = event['variant_of']['title']
+            watch = self.watchlist.match(product['title'])
+            product['priority'] = watch['priority']
+            if watch['watching']:
+                product['watching'] = watch['watching']
+            if watch['channels']:
+                product['channels'] = watch['channels']
+            if event['previous_price']:
+                product['price'] = f"{event['previous_price']} → {product['price']}"
+            alerts.append(product)
+        return alerts
     
     def send_discord_notification(self, new_products, webhook_url):
         """Send Discord webhook notification to #new_products channel"""
         if not new_products or not webhook_url:
             return
-            
-        try:
-            for product in new_products:
-                embed = {
-                    "title": "🎉 NEW POKEMON PRODUCT FOUND!",
-                    "description": f"**{product['title']}**",
-                    "color": 0x00ff00,
-                    "fields": [
-                        {"name": "💰 Price", "value": product['price'], "inline": True},
-                        {"name": "📊 Availability", "value": product['availability'], "inline": True},
-                        {"name": "🔗 URL", "value": f"[View Product]({product['url']})", "inline": False}
-                    ],
-                    "timestamp": product['found_at']
-                }
-                
-                data = {
-                    "content": "@everyone New Pokemon drop detected! 🚨",
-                    "embeds": [embed]
-                }
-                
-                response = requests.post(webhook_url, json=data)
-                if response.status_code == 204:
-                    logging.info("Discord notification sent successfully to #new_products")
-                else:
-                    logging.error(f"Discord notification failed: {response.status_code}")
-                    
-        except Exception as e:
-            logging.error(f"Error sending Discord notification: {e}")
+        NotificationDispatcher([DiscordChannel(webhook_url)]).dispatch(new_products)
     
     def send_telegram_notification(self, new_products, bot_token, chat_id):
         """Send Telegram bot notification"""
         if not new_products or not bot_token or not chat_id:
             return
-            
-        try:
-            for product in new_products:
-                message = (
-                    f"🎉 *NEW POKEMON PRODUCT FOUND!*\\n\\n"
-                    f"📦 *Product:* {product['title']}\\n"
-                    f"💰 *Price:* {product['price']}\\n"
-                    f"📊 *Availability:* {product['availability']}\\n"
-                    f"🔗 [View Product]({product['url']})\\n"
-                    f"⏰ *Found at:* {product['found_at']}"
-                )
-                
-                url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-                data = {
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "Markdown",
-                    "disable_web_page_preview": False
-                }
-                
-                response = requests.post(url, data=data)
-                if response.status_code == 200:
-                    logging.info("Telegram notification sent successfully")
-                else:
-                    logging.error(f"Telegram notification failed: {response.status_code}")
-                    
-        except Exception as e:
-            logging.error(f"Error sending Telegram notification: {e}")
+        NotificationDispatcher([TelegramChannel(bot_token, chat_id)]).dispatch(new_products)
     
     def send_ntfy_notification(self, new_products, topic_url):
         """Send ntfy.sh notification"""
         if not new_products or not topic_url:
             return
-            
-        try:
-            for product in new_products:
-                title = "🎉 New Pokemon Product Found!"
-                message = (
-                    f"📦 {product['title']}\\n"
-                    f"💰 {product['price']}\\n"
-                    f"📊 {product['availability']}\\n"
-                    f"🔗 {product['url']}"
-                )
-                
-                headers = {
-                    "Title": title,
-                    "Priority": "high",
-                    "Tags": "shopping,pokemon,alert"
-                }
-                
-                response = requests.post(topic_url, data=message.encode('utf-8'), headers=headers)
-                if response.status_code == 200:
-                    logging.info("ntfy notification sent successfully")
-                else:
-                    logging.error(f"ntfy notification failed: {response.status_code}")
-                    
-        except Exception as e:
-            logging.error(f"Error sending ntfy notification: {e}")
+        NotificationDispatcher([NtfyChannel(topic_url)]).dispatch(new_products)
 
-def main():
-    monitor = GitHubCostcoPokemonMonitor()
-    
-    # Get notification config from environment variables
-    discord_webhook = os.environ.get('DISCORD_WEBHOOK')
-    telegram_bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    telegram_chat_id = os.environ.get('TELEGRAM_CHAT_ID')
-    ntfy_topic = os.environ.get('NTFY_TOPIC')
-    
-    logging.info("🔍 Starting Costco Australia Pokemon Monitor (GitHub Actions)")
+def load_notification_config():
+    """Read notification settings from environment variables"""
+    return {
+        'discord_webhook': os.environ.get('DISCORD_WEBHOOK'),
+        'telegram_bot_token': os.environ.get('TELEGRAM_BOT_TOKEN'),
+        'telegram_chat_id': os.environ.get('TELEGRAM_CHAT_ID'),
+        'ntfy_topic': os.environ.get('NTFY_TOPIC'),
+    }
+
+def run_check(monitor, channels, drainer=None, registry=None):
+    """Run one fetch, dedup, notify and save cycle and return its run record"""
+    monitor.metrics = RunMetrics('daemon' if drainer else 'once')
     
     # Fetch current products
-    products = monitor.fetch_pokemon_products()
+    products = monitor.fetch_all_products()
+    return process_products(monitor, products, channels, drainer, registry)
+
+def run_sites_check(scheduler, channels, drainer=None, registry=None):
+    """Check every configured site once through the shared worker pool and return their run records"""
+    if len(scheduler.monitors) == 1:
+        return [run_check(scheduler.monitors[0], channels, drainer, registry)]
     
-    if products:
-        # Check for new products
-        new_products = monitor.check_for_new_products(products)
+    for monitor in scheduler.monitors:
+        monitor.metrics = RunMetrics('daemon' if drainer else 'once')
+    return [process_products(monitor, products, channels, drainer, registry)
+            for monitor, products in scheduler.fetch_all()]
+
+def process_products(monitor, products, channels, drainer=None, registry=None):
+    """Diff, queue, save and record one site's fetched products"""
+    metrics = monitor.metrics
+    metrics.count('products', len(products))
+    status = 'changed'
+    
+    if monitor.last_fetch.get('unchanged'):
+        # Nothing that can cause an event has moved, so there is nothing to diff or save
+        status = 'unchanged'
+        logging.info("✅ Search results unchanged since last run, skipped extraction, dedup and save")
+        if monitor.history:
+            try:
+                monitor.history.touch(monitor.site.name)
+            except Exception as e:
+                logging.error(f"Error updating product history: {e}")
+    elif products:
+        # Fill in price, stock and item number from the detail pages of new or changed products
+        if monitor.enricher:
+            with metrics.phase('enrich'):
+                enriched = monitor.enricher.enrich(products, monitor.known_products)
+            for outcome, count in enriched.items():
+                metrics.count(f"details_{outcome}", count)
         
-        if new_products:
-            logging.info(f"🎉 Found {len(new_products)} new Pokemon product(s)!")
-            
-            for product in new_products:
-                logging.info(f"NEW PRODUCT: {product['title']} - {product['price']} - {product['url']}")
-            
-            # Send notifications
-            if discord_webhook:
-                monitor.send_discord_notification(new_products, discord_webhook)
-            
-            if telegram_bot_token and telegram_chat_id:
-                monitor.send_telegram_notification(new_products, telegram_bot_token, telegram_chat_id)
+        # Diff against the last snapshot: new listings, price changes, restocks and sell-outs
+        events = monitor.check_for_changes(products)
+        metrics.count('events', len(events))
+        metrics.count('new_products', sum(1 for event in events if event['type'] == NEW_LISTING))
+        
+        if events:
+            logging.info(f"🎉 Found {len(events)} Pokemon product change(s)!")
             
-            if ntfy_topic:
-                monitor.send_ntfy_notification(new_products, ntfy_topic)
+            for event in events:
+                product = event['product']
+                logging.info(f"{event['type'].upper()}: {product['title']} - {product['price']} - {product['availability']} - {product['url']}")
+        else:
+            status = 'no_changes'
+            logging.info("No product changes found")
+        
+        # Queue alerts durably before the state is saved, so a crash can never lose them
+        alerts = monitor.alert_products(events)
+        if alerts and channels:
+            with metrics.phase('enqueue'):
+                queued = 0
+                for channel_names, group in monitor.watchlist.route(alerts, [channel.name for channel in channels]):
+                    queued += monitor.outbox.enqueue(group, channel_names)
+            metrics.count('notifications_queued', queued)
+            logging.info(f"Queued {queued} notification(s)")
+        
+        # Save known products for next run, then remember the pages so an identical next run can be skipped
+        if monitor.save_known_products_to_github():
+            monitor.fetch_cache.commit()
+            metrics.count('drops', monitor.drop_history.record(events, monitor.site.name))
         else:
-            logging.info("No new products found")
+            monitor.fetch_cache.discard()
         
-        # Save known products for next run
-        monitor.save_known_products_to_github()
+        # Every observation goes into the history database in one transaction
+        if monitor.history:
+            try:
+                with metrics.phase('history'):
+                    observations = product_observations(monitor.known_products, products)
+                    metrics.count('history_changes', monitor.history.record_run(monitor.site.name, observations))
+            except Exception as e:
+                logging.error(f"Error writing product history: {e}")
         
     else:
+        status = 'empty'
+        monitor.fetch_cache.discard()
         logging.warning("No products found - website might be down or structure changed")
+    
+    # Deliver anything queued, including alerts left over from earlier runs
+    if drainer:
+        drainer.wake()
+    elif monitor.outbox.pending:
+        with metrics.phase('notify'):
+            metrics.add_delivery(monitor.outbox.drain(channels))
+        logging.info(f"Outbox: {monitor.outbox.stats()}")
+    
+    if monitor.driver_pool:
+        metrics.gauge('driver_pool_memory_mb', monitor.driver_pool.memory_mb())
+    
+    # Write a machine-readable record of the run
+    record = metrics.record(site=monitor.site.name, status=status, fetch=monitor.last_fetch, outbox=monitor.outbox.stats())
+    logging.info(f"📈 Run metrics for {monitor.site.label} ({status}): {metrics.summary()}")
+    try:
+        append_run_record(monitor.run_log_path, record)
+    except Exception as e:
+        logging.error(f"Error writing run record: {e}")
+    if registry:
+        registry.observe_run(record)
+    return record
+
+def run_daemon(scheduler, channels, interval, pool_size, max_driver_memory_mb, max_driver_uses,
+               metrics_port=0, metrics_host='127.0.0.1', poller=None):
+    """Poll every site forever, sharing one set of warm Chrome instances between them
+
+    With a poller the wait between polls comes from the learned drop schedule
+    instead of the fixed interval.
+    """
+    monitor = scheduler.monitors[0]
+    driver_pool = DriverPool(
+        monitor.setup_driver,
+        size=pool_size,
+        max_uses=max_driver_uses,
+        max_memory_mb=max_driver_memory_mb
+    )
+    scheduler.share_driver_pool(driver_pool)
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        logging.info("Stop requested, finishing current poll...")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    # Runs are aggregated for the Prometheus endpoint
+    registry = MetricsRegistry()
+    registry.add_gauge('outbox_depth', "Notifications waiting to be delivered",
+                       lambda: monitor.outbox.stats()['depth'])
+    registry.add_gauge('outbox_oldest_pending_seconds', "Age of the oldest undelivered notification",
+                       lambda: monitor.outbox.stats()['oldest_pending_seconds'])
+    if poller:
+        registry.add_gauge('next_poll_seconds', "Seconds until the next adaptive poll",
+                           lambda: poller.next_interval())
+        registry.add_gauge('expected_detection_latency_seconds', "Average time from a drop to its detection",
+                           lambda: poller.expected_latency())
+    metrics_server = None
+    if metrics_port:
+        try:
+            metrics_server = MetricsServer(registry, metrics_port, metrics_host)
+        except OSError as e:
+            logging.error(f"Could not start metrics server on {metrics_host}:{metrics_port}: {e}")
+    
+    # Notifications are delivered in the background so a slow webhook never delays a poll
+    drainer = OutboxDrainer(monitor.outbox, channels, interval=interval, on_drained=registry.observe_delivery)
+    drainer.start()
+    
+    if poller:
+        logging.info(f"🔁 Daemon mode: adaptive polling every {poller.min_interval:g}-{poller.max_interval:g}s "
+                     f"within {poller.daily_budget} requests/day, up to {pool_size} warm driver(s)")
+    else:
+        logging.info(f"🔁 Daemon mode: polling every {interval}s with up to {pool_size} warm driver(s)")
+    try:
+        if any(site_monitor.fetch_mode != 'http' for site_monitor in scheduler.monitors):
+            driver_pool.warm()
+        
+        while not stop.is_set():
+            started = time.monotonic()
+            drops = 0
+            try:
+                records = run_sites_check(scheduler, channels, drainer, registry)
+                drops = sum(record['counters'].get('drops', 0) for record in records)
+            except Exception as e:
+                logging.error(f"Error during poll: {e}")
+            logging.info(f"Driver pool memory: {driver_pool.memory_mb():.0f}MB")
+            wait = interval
+            if poller:
+                poller.observe_poll(drops=drops)
+                report = poller.report()
+                wait = report['next_interval_seconds']
+                logging.info(f"🗓️ Next poll in {wait:.0f}s ({report['window']}), expected detection latency "
+                             f"{report['window_latency_seconds']:.0f}s now, {report['expected_latency_seconds']:.0f}s on average")
+            stop.wait(max(0.0, wait - (time.monotonic() - started)))
+    finally:
+        drainer.stop()
+        if metrics_server:
+            metrics_server.close()
+        driver_pool.close()
+        scheduler.share_driver_pool(None)
+        if monitor.history:
+            monitor.history.close()
+        logging.info("Daemon stopped")
+
+def parse_args(argv=None):
+    """Parse command-line options, falling back to environment variables"""
+    parser = argparse.ArgumentParser(description="Costco Pokemon monitor")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and re-poll instead of checking once")
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('POLL_INTERVAL', '45')),
+                        help="seconds between polls in daemon mode (default 45)")
+    parser.add_argument('--drivers', type=int, default=int(os.environ.get('DRIVER_POOL_SIZE', '1')),
+                        help="number of warm Chrome instances to keep (default 1)")
+    parser.add_argument('--max-driver-memory', type=int, default=int(os.environ.get('MAX_DRIVER_MEMORY_MB', '1024')),
+                        help="recycle a driver once its processes use more than this many MB (default 1024)")
+    parser.add_argument('--max-driver-uses', type=int, default=int(os.environ.get('MAX_DRIVER_USES', '100')),
+                        help="recycle a driver after this many page loads (default 100)")
+    parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('METRICS_PORT', '9108')),
+                        help="serve Prometheus metrics on this port in daemon mode, 0 to disable (default 9108)")
+    parser.add_argument('--metrics-host', default=os.environ.get('METRICS_HOST', '127.0.0.1'),
+                        help="address for the metrics endpoint (default 127.0.0.1)")
+    parser.add_argument('--sites', default=os.environ.get('SITES', DEFAULT_SITE),
+                        help=f"comma-separated stores to watch, e.g. costco-au,costco-nz (default {DEFAULT_SITE})")
+    parser.add_argument('--adaptive', action='store_true', default=os.environ.get('ADAPTIVE_POLLING', '') == '1',
+                        help="in daemon mode, learn when drops happen and poll between --interval and --max-interval")
+    parser.add_argument('--max-interval', type=float, default=float(os.environ.get('MAX_POLL_INTERVAL', '900')),
+                        help="longest wait between adaptive polls in seconds (default 900)")
+    parser.add_argument('--request-budget', type=int, default=int(os.environ.get('REQUEST_BUDGET', '2000')),
+                        help="most page requests per day for adaptive polling (default 2000)")
+    parser.add_argument('--schedule', action='store_true',
+                        help="print the learned adaptive polling schedule and exit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    monitors = [GitHubCostcoPokemonMonitor(site) for site in load_sites(args.sites)]
+    scheduler = SiteScheduler(monitors, workers=monitors[0].crawl_workers)
+    stores = ', '.join(monitor.site.label for monitor in monitors)
+    
+    # Get notification config from environment variables
+    channels = build_channels(load_notification_config())
+    channels += build_named_channels(monitors[0].watchlist.channel_specs())
+    
+    poller = None
+    if args.adaptive or args.schedule:
+        poller = AdaptivePoller(monitors[0].drop_history, min_interval=args.interval, max_interval=args.max_interval,
+                                daily_budget=args.request_budget, requests_per_poll=scheduler.requests_per_poll)
+    
+    if args.schedule:
+        print(json.dumps(poller.report(), indent=2))
+    elif args.daemon:
+        logging.info(f"🔍 Starting Pokemon Monitor for {stores} (daemon)")
+        run_daemon(scheduler, channels, args.interval, args.drivers, args.max_driver_memory, args.max_driver_uses,
+                   args.metrics_port, args.metrics_host, poller)
+    else:
+        logging.info(f"🔍 Starting Pokemon Monitor for {stores} (GitHub Actions)")
+        try:
+            run_sites_check(scheduler, channels)
+        finally:
+            if monitors[0].history:
+                monitors[0].history.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Product history database
+Every run's observations (price and stock of each product seen) are written
+to SQLite in one transaction. Rows are compact: integer product ids, epoch
+seconds and prices in cents. A separate table holds only the rows where
+something changed, so price and restock history never scan the full
+observation log.
+
+Usage:
+    python history_db.py products [SEARCH]
+    python history_db.py last-in-stock ITEM
+    python history_db.py prices ITEM
+    python history_db.py restocks ITEM
+ITEM is an item code or part of a title.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from product_store import IN_STOCK, SOLD_OUT, UNKNOWN, PRICE_RE, normalize_price, stock_state
+
+STOCK_CODES = {UNKNOWN: 0, IN_STOCK: 1, SOLD_OUT: 2}
+STOCK_NAMES = {code: name for name, code in STOCK_CODES.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT,
+    currency TEXT,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    price_cents INTEGER,
+    stock INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (site, key)
+);
+CREATE TABLE IF NOT EXISTS observations (
+    product INTEGER NOT NULL,
+    at INTEGER NOT NULL,
+    price_cents INTEGER,
+    stock INTEGER NOT NULL,
+    PRIMARY KEY (product, at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    product INTEGER NOT NULL,
+    at INTEGER NOT NULL,
+    price_cents INTEGER,
+    stock INTEGER NOT NULL,
+    PRIMARY KEY (product, at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sites (
+    site TEXT PRIMARY KEY,
+    last_checked INTEGER NOT NULL
+);
+"""
+
+
+def price_cents(price):
+    """(cents, currency symbol) from price text, or (None, None)"""
+    match = PRICE_RE.search(normalize_price(price))
+    if not match:
+        return None, None
+    text = match.group(0)
+    amount = text[1:].replace(',', '').strip()
+    try:
+        return round(float(amount) * 100), text[0]
+    except ValueError:
+        return None, None
+
+
+def format_price(cents, currency):
+    return f"{currency or '$'}{cents / 100:.2f}" if cents is not None else "-"
+
+
+def epoch(moment):
+    """Epoch seconds from an ISO timestamp, datetime or number"""
+    if moment is None:
+        return int(time.time())
+    if isinstance(moment, (int, float)):
+        return int(moment)
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    return int(moment.timestamp())
+
+
+def iso(seconds):
+    return datetime.fromtimestamp(seconds).isoformat(timespec='minutes') if seconds is not None else None
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    days, hours = divmod(hours, 24)
+    minutes = rest // 60
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+class HistoryDB:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        """The connection, opened (and the file created) on first use"""
+        with self.lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.executescript(SCHEMA)
+            return self._conn
+
+    def close(self):
+        """Close the connection, which also folds the write-ahead log back into the file"""
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record_run(self, site, observations, seen_at=None):
+        """Write one run's observations in a single transaction
+
+        observations are dicts with key, title, url, price and stock. Returns the
+        number of products whose price or stock changed.
+        """
+        at = epoch(seen_at)
+        changed = 0
+        with self.lock, self.conn:
+            known = {key: (product, cents, stock) for product, key, cents, stock in self.conn.execute(
+                'SELECT id, key, price_cents, stock FROM products WHERE site = ?', (site,))}
+            rows = []
+            change_rows = []
+            updates = []
+            for observation in observations:
+                cents, currency = price_cents(observation.get('price'))
+                stock = STOCK_CODES.get(observation.get('stock'), 0)
+                previous = known.get(observation['key'])
+                if previous is None:
+                    product = self.conn.execute(
+                        'INSERT INTO products (site, key, title, url, currency, first_seen, last_seen, price_cents, stock) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (site, observation['key'], observation['title'], observation.get('url'), currency,
+                         at, at, cents, stock)).lastrowid
+                    known[observation['key']] = (product, cents, stock)
+                    change_rows.append((product, at, cents, stock))
+                    changed += 1
+                else:
+                    product, old_cents, old_stock = previous
+                    # A missing price or unknown stock keeps the last known value
+                    cents = cents if cents is not None else old_cents
+                    stock = stock or old_stock
+                    if (cents, stock) != (old_cents, old_stock):
+                        change_rows.append((product, at, cents, stock))
+                        changed += 1
+                    updates.append((observation['title'], observation.get('url'), at, cents, stock,
+                                    currency, product))
+                rows.append((product, at, cents, stock))
+
+            self.conn.executemany(
+                'UPDATE products SET title = ?, url = COALESCE(NULLIF(?, \'\'), url), last_seen = ?, '
+                'price_cents = ?, stock = ?, currency = COALESCE(?, currency) WHERE id = ?', updates)
+            self.conn.executemany('INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?)', rows)
+            self.conn.executemany('INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)', change_rows)
+            self.conn.execute('INSERT OR REPLACE INTO sites VALUES (?, ?)', (site, at))
+        return changed
+
+    def touch(self, site, seen_at=None):
+        """Note a run that found the site's results unchanged"""
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO sites VALUES (?, ?)', (site, epoch(seen_at)))
+
+    def find(self, item, site=None):
+        """Products matching an item code exactly, or else a title fragment"""
+        site_clause = ' AND site = ?' if site else ''
+        extra = (site,) if site else ()
+        rows = self.conn.execute(f'SELECT * FROM products WHERE key = ?{site_clause}', (item,) + extra).fetchall()
+        if not rows:
+            rows = self.conn.execute(f'SELECT * FROM products WHERE title LIKE ?{site_clause} ORDER BY title',
+                                     (f'%{item}%',) + extra).fetchall()
+        columns = ['id', 'site', 'key', 'title', 'url', 'currency', 'first_seen', 'last_seen', 'price_cents', 'stock']
+        return [dict(zip(columns, row)) for row in rows]
+
+    def last_checked(self, site):
+        row = self.conn.execute('SELECT last_checked FROM sites WHERE site = ?', (site,)).fetchone()
+        return row[0] if row else None
+
+    def last_in_stock(self, product):
+        """Epoch seconds of the last observation that saw the product in stock, or None"""
+        if product['stock'] == STOCK_CODES[IN_STOCK]:
+            # Unchanged runs only touch the site, so its last check is newer than the last observation
+            return max(product['last_seen'], self.last_checked(product['site']) or 0)
+        # The change that ended the last in-stock period bounds a backwards seek on the primary key
+        sold_out_at = None
+        for at, cents, stock in reversed(self.changes(product)):
+            if stock == STOCK_CODES[IN_STOCK]:
+                break
+            sold_out_at = at
+        else:
+            return None
+        row = self.conn.execute('SELECT max(at) FROM observations WHERE product = ? AND at < ?',
+                                (product['id'], sold_out_at)).fetchone()
+        return row[0]
+
+    def changes(self, product):
+        return self.conn.execute('SELECT at, price_cents, stock FROM changes WHERE product = ? ORDER BY at',
+                                 (product['id'],)).fetchall()
+
+    def price_history(self, product):
+        """[(at, cents)] for every price the product has had"""
+        history = []
+        for at, cents, stock in self.changes(product):
+            if cents is not None and (not history or history[-1][1] != cents):
+                history.append((at, cents))
+        return history
+
+    def restocks(self, product):
+        """[(start, end or None)] for every in-stock period, oldest first"""
+        periods = []
+        start = None
+        for at, cents, stock in self.changes(product):
+            if stock == STOCK_CODES[IN_STOCK] and start is None:
+                start = at
+            elif stock == STOCK_CODES[SOLD_OUT] and start is not None:
+                periods.append((start, at))
+                start = None
+        if start is not None:
+            periods.append((start, None))
+        return periods
+
+
+def product_observations(store, products):
+    """History rows for a run's scraped products, keyed by their store identity"""
+    observations = []
+    for product in products:
+        record = store.lookup(product)
+        if not record:
+            continue
+        observations.append({
+            'key': record['id'],
+            'title': record['title'],
+            'url': product.get('url') or record.get('url'),
+            'price': normalize_price(product.get('price')),
+            'stock': stock_state(product.get('availability'))
+        })
+    return observations
+
+
+def describe(db, product):
+    """Answers for one product, as a dict"""
+    checked = db.last_checked(product['site'])
+    last_in_stock = db.last_in_stock(product)
+    periods = db.restocks(product)
+    last_period = periods[-1] if periods else None
+    return {
+        'site': product['site'],
+        'item': product['key'],
+        'title': product['title'],
+        'price': format_price(product['price_cents'], product['currency']),
+        'stock': STOCK_NAMES.get(product['stock'], UNKNOWN),
+        'first_seen': iso(product['first_seen']),
+        'last_seen': iso(product['last_seen']),
+        'last_checked': iso(checked),
+        'last_in_stock': iso(last_in_stock),
+        'price_history': [(iso(at), format_price(cents, product['currency'])) for at, cents in db.price_history(product)],
+        'restocks': [(iso(start), iso(end)) for start, end in periods],
+        'last_restock_seconds': ((last_period[1] or checked or product['last_seen']) - last_period[0]
+                                 if last_period else None)
+    }
+
+
+def print_answer(command, info):
+    print(f"{info['title']} [{info['site']} {info['item']}]")
+    if command == 'last-in-stock':
+        if info['stock'] == IN_STOCK:
+            print(f"  In stock now (last checked {info['last_checked'] or info['last_seen']})")
+        elif info['last_in_stock']:
+            print(f"  Last seen in stock {info['last_in_stock']}, now {info['stock']}")
+        else:
+            print("  Never seen in stock")
+    elif command == 'prices':
+        for at, price in info['price_history']:
+            print(f"  {at}  {price}")
+    elif command == 'restocks':
+        for start, end in info['restocks']:
+            print(f"  {start} → {end or 'still in stock'}")
+        if info['last_restock_seconds'] is not None:
+            ongoing = ' so far' if info['restocks'][-1][1] is None else ''
+            print(f"  Last restock lasted {format_duration(info['last_restock_seconds'])}{ongoing}")
+        if not info['restocks']:
+            print("  No in-stock periods recorded")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the product history database")
+    parser.add_argument('--db', default=os.environ.get('HISTORY_DB', 'product_history.db'))
+    parser.add_argument('--site', help="only look at this store")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of text")
+    parser.add_argument('command', choices=['products', 'last-in-stock', 'prices', 'restocks'])
+    parser.add_argument('item', nargs='?', default='', help="item code or part of a title")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No history database at {args.db}", file=sys.stderr)
+        return 1
+    logging.disable(logging.CRITICAL)
+    db = HistoryDB(args.db)
+    start = time.perf_counter()
+    products = db.find(args.item, args.site)
+
+    if args.command == 'products':
+        listing = [{'site': p['site'], 'item': p['key'], 'title': p['title'], 'stock': STOCK_NAMES.get(p['stock']),
+                    'price': format_price(p['price_cents'], p['currency']), 'last_seen': iso(p['last_seen'])}
+                   for p in products]
+        if args.json:
+            print(json.dumps(listing, indent=2, ensure_ascii=False))
+        else:
+            for p in listing:
+                print(f"{p['site']:<10} {p['item']:<12} {p['price']:>9} {p['stock']:<13} {p['title']}")
+    elif not products:
+        print(f"No product matches '{args.item}'", file=sys.stderr)
+        return 1
+    else:
+        answers = [describe(db, product) for product in products]
+        if args.json:
+            print(json.dumps(answers, indent=2, ensure_ascii=False))
+        else:
+            for info in answers:
+                print_answer(args.command, info)
+    if not args.json:
+        print(f"({(time.perf_counter() - start) * 1000:.1f}ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Async batched notification dispatcher for Discord, Telegram and ntfy
+All channels are sent to at the same time, each over its own pooled HTTP
+session. Products are batched into as few messages as each channel allows,
+and rate limits (429 / Retry-After) and server errors are retried with backoff.
+"""
+
+import asyncio
+import base64
+import logging
+import time
+
+import requests
+
+from product_store import NEW_LISTING, PRICE_CHANGE, BACK_IN_STOCK, OUT_OF_STOCK
+from watchlist import DEFAULT_PRIORITY, PRIORITIES
+
+EVENT_HEADLINES = {
+    NEW_LISTING: "🎉 NEW POKEMON PRODUCT FOUND!",
+    BACK_IN_STOCK: "🔄 POKEMON PRODUCT BACK IN STOCK!",
+    PRICE_CHANGE: "💸 POKEMON PRODUCT PRICE CHANGE!",
+    OUT_OF_STOCK: "❌ POKEMON PRODUCT SOLD OUT",
+}
+
+
+# Outcomes of posting one message
+DELIVERED = 'delivered'
+FAILED = 'failed'  # worth retrying later
+REJECTED = 'rejected'  # the channel will never accept this message as it is
+
+
+def headline(product):
+    return EVENT_HEADLINES[product.get('event', NEW_LISTING)]
+
+
+def priority(products):
+    """Highest priority of a batch of products"""
+    return max((product.get('priority', DEFAULT_PRIORITY) for product in products), key=PRIORITIES.index)
+
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Channel:
+    """One notification destination: knows how to batch and format products"""
+    name = 'channel'
+    max_batch = 1
+    success_codes = (200,)
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def messages(self, products):
+        """Yield (batch, keyword arguments for session.post) for each message"""
+        raise NotImplementedError
+
+    def post(self, request):
+        return self.session.post(timeout=self.timeout, **request)
+
+
+class DiscordChannel(Channel):
+    name = 'discord'
+    max_batch = 10  # Discord accepts up to 10 embeds per message
+    success_codes = (200, 204)
+
+    def __init__(self, webhook_url, timeout=10):
+        super().__init__(timeout)
+        self.webhook_url = webhook_url
+
+    def embed(self, product):
+        fields = [
+            {"name": "💰 Price", "value": product['price'], "inline": True},
+            {"name": "📊 Availability", "value": product['availability'], "inline": True},
+            {"name": "🔗 URL", "value": f"[View Product]({product['url']})", "inline": False}
+        ]
+        if product.get('site'):
+            fields.insert(0, {"name": "🏬 Store", "value": product['site'], "inline": True})
+        if product.get('item_number'):
+            fields.insert(-1, {"name": "🔢 Item", "value": product['item_number'], "inline": True})
+        if product.get('variant_of'):
+            fields.append({"name": "🔁 Variant of", "value": product['variant_of'], "inline": False})
+        if product.get('watching'):
+            fields.append({"name": "⭐ Watching", "value": ', '.join(product['watching']), "inline": False})
+        return {
+            "title": headline(product),
+            "description": f"**{product['title']}**",
+            "color": 0x00ff00,
+            "fields": fields,
+            "timestamp": product['found_at']
+        }
+
+    def messages(self, products):
+        for batch in batches(products, self.max_batch):
+            yield batch, {
+                'url': self.webhook_url,
+                'json': {
+                    # Only high and urgent alerts ping everyone
+                    "content": ("@everyone New Pokemon drop detected! 🚨"
+                                if PRIORITIES.index(priority(batch)) >= PRIORITIES.index('high')
+                                else "New Pokemon drop detected"),
+                    "embeds": [self.embed(product) for product in batch]
+                }
+            }
+
+
+class TelegramChannel(Channel):
+    name = 'telegram'
+    max_batch = 5  # keeps each message well under Telegram's 4096 character limit
+
+    def __init__(self, bot_token, chat_id, api_base="https://api.telegram.org", timeout=10):
+        super().__init__(timeout)
+        self.url = f"{api_base}/bot{bot_token}/sendMessage"
+        self.chat_id = chat_id
+
+    def section(self, product):
+        store = f"🏬 *Store:* {product['site']}\n" if product.get('site') else ""
+        variant = f"🔁 *Variant of:* {product['variant_of']}\n" if product.get('variant_of') else ""
+        watching = f"⭐ *Watching:* {', '.join(product['watching'])}\n" if product.get('watching') else ""
+        item = f"🔢 *Item:* {product['item_number']}\n" if product.get('item_number') else ""
+        return (
+            f"*{headline(product)}*\n"
+            f"📦 *Product:* {product['title']}\n"
+            f"{variant}"
+            f"{watching}"
+            f"{store}"
+            f"💰 *Price:* {product['price']}\n"
+            f"📊 *Availability:* {product['availability']}\n"
+            f"{item}"
+            f"🔗 [View Product]({product['url']})\n"
+            f"⏰ *Found at:* {product['found_at']}"
+        )
+
+    def messages(self, products):
+        for batch in batches(products, self.max_batch):
+            yield batch, {
+                'url': self.url,
+                'data': {
+                    "chat_id": self.chat_id,
+                    "text": "\n\n".join(self.section(product) for product in batch),
+                    "parse_mode": "Markdown",
+                    "disable_web_page_preview": len(batch) > 1
+                }
+            }
+
+
+class NtfyChannel(Channel):
+    name = 'ntfy'
+    max_batch = 5  # ntfy truncates message bodies over 4096 bytes
+
+    def __init__(self, topic_url, timeout=10):
+        super().__init__(timeout)
+        self.topic_url = topic_url
+
+    def section(self, product):
+        store = f"🏬 {product['site']}\n" if product.get('site') else ""
+        variant = f"🔁 Variant of {product['variant_of']}\n" if product.get('variant_of') else ""
+        watching = f"⭐ Watching {', '.join(product['watching'])}\n" if product.get('watching') else ""
+        item = f"🔢 Item {product['item_number']}\n" if product.get('item_number') else ""
+        return (
+            f"📦 {product['title']}\n"
+            f"{variant}"
+            f"{watching}"
+            f"{store}"
+            f"💰 {product['price']}\n"
+            f"📊 {product['availability']}\n"
+            f"{item}"
+            f"🔗 {product['url']}"
+        )
+
+    def messages(self, products):
+        for batch in batches(products, self.max_batch):
+            title = headline(batch[0]) if len(batch) == 1 else f"🎉 {len(batch)} Pokemon product updates!"
+            yield batch, {
+                'url': self.topic_url,
+                'data': "\n\n".join(self.section(product) for product in batch).encode('utf-8'),
+                'headers': {
+                    # HTTP headers must be latin-1, so the emoji title goes through ntfy's RFC 2047 support
+                    "Title": f"=?UTF-8?B?{base64.b64encode(title.encode('utf-8')).decode('ascii')}?=",
+                    "Priority": priority(batch),
+                    "Tags": "shopping,pokemon,alert"
+                }
+            }
+
+
+def retry_after(response):
+    """Seconds a rate-limited response asks us to wait, if it says"""
+    for header in ('Retry-After', 'X-RateLimit-Reset-After'):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    try:
+        # Discord and Telegram also put the delay in the JSON body
+        body = response.json()
+        return float(body.get('retry_after') or body.get('parameters', {}).get('retry_after'))
+    except Exception:
+        return None
+
+
+class NotificationDispatcher:
+    def __init__(self, channels, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.channels = channels
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def send_message(self, channel, request):
+        """Post one message, retrying rate limits and server errors with backoff; returns its outcome"""
+        for attempt in range(self.max_retries + 1):
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            try:
+                response = await asyncio.to_thread(channel.post, request)
+            except requests.RequestException as e:
+                logging.warning(f"{channel.name} notification error (attempt {attempt + 1}): {e}")
+            else:
+                if response.status_code in channel.success_codes:
+                    # Discord announces an exhausted bucket before we hit it
+                    if response.headers.get('X-RateLimit-Remaining') == '0':
+                        await asyncio.sleep(min(self.max_delay, retry_after(response) or 0))
+                    return DELIVERED
+                if response.status_code == 429:
+                    delay = min(self.max_delay, retry_after(response) or delay)
+                    logging.warning(f"{channel.name} rate limited, retrying in {delay:.1f}s")
+                elif response.status_code < 500 and response.status_code != 408:
+                    logging.error(f"{channel.name} notification rejected: {response.status_code}")
+                    return REJECTED
+                else:
+                    logging.warning(f"{channel.name} notification failed: {response.status_code}, retrying")
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+        logging.error(f"{channel.name} notification gave up after {self.max_retries + 1} attempts")
+        return FAILED
+
+    async def send_channel(self, channel, products, on_delivered=None, on_rejected=None):
+        """Send every batch to one channel in order and return its delivery stats
+
+        Rejected messages count as failed, and also as rejected.
+        """
+        start = time.perf_counter()
+        sent = failed = rejected = 0
+        message_seconds = []
+        messages = list(channel.messages(products))
+        while messages:
+            batch, request = messages.pop(0)
+            message_start = time.perf_counter()
+            outcome = await self.send_message(channel, request)
+            message_seconds.append(round(time.perf_counter() - message_start, 3))
+            if outcome == DELIVERED:
+                sent += 1
+                if on_delivered:
+                    on_delivered(channel, batch)
+            elif outcome == REJECTED and len(batch) > 1:
+                # One bad product must not sink the rest of its batch, so find it by sending them one at a time
+                logging.warning(f"{channel.name} rejected a batch of {len(batch)}, sending them one at a time")
+                messages[:0] = [message for product in batch for message in channel.messages([product])]
+            else:
+                failed += 1
+                if outcome == REJECTED:
+                    rejected += 1
+                    if on_rejected:
+                        on_rejected(channel, batch)
+        stats = {'sent': sent, 'failed': failed, 'rejected': rejected, 'seconds': round(time.perf_counter() - start, 3),
+                 'message_seconds': message_seconds}
+        logging.info(f"{channel.name} notifications: {sent} sent, {failed} failed ({rejected} rejected) "
+                     f"in {stats['seconds']:.2f}s")
+        return stats
+
+    async def deliver_async(self, assignments, on_delivered=None, on_rejected=None):
+        results = await asyncio.gather(*(self.send_channel(channel, products, on_delivered, on_rejected)
+                                         for channel, products in assignments))
+        return {channel.name: stats for (channel, products), stats in zip(assignments, results)}
+
+    def deliver(self, assignments, on_delivered=None, on_rejected=None):
+        """Send each (channel, products) pair concurrently
+
+        on_delivered(channel, batch) is called per accepted message, and
+        on_rejected(channel, batch) per message the channel will never accept.
+        """
+        if not assignments:
+            return {}
+        return asyncio.run(self.deliver_async(assignments, on_delivered, on_rejected))
+
+    def dispatch(self, products):
+        """Fan products out to all channels at once and return per-channel stats"""
+        if not products or not self.channels:
+            return {}
+        return self.deliver([(channel, products) for channel in self.channels])
+
+
+def build_channels(config):
+    """Create a channel for every destination configured in config"""
+    channels = []
+    if config.get('discord_webhook'):
+        channels.append(DiscordChannel(config['discord_webhook']))
+    if config.get('telegram_bot_token') and config.get('telegram_chat_id'):
+        channels.append(TelegramChannel(config['telegram_bot_token'], config['telegram_chat_id']))
+    if config.get('ntfy_topic'):
+        channels.append(NtfyChannel(config['ntfy_topic']))
+    return channels
+
+
+CHANNEL_FACTORIES = {
+    'discord': lambda spec: DiscordChannel(spec['webhook']) if spec.get('webhook') else None,
+    'telegram': lambda spec: (TelegramChannel(spec['bot_token'], spec['chat_id'])
+                              if spec.get('bot_token') and spec.get('chat_id') else None),
+    'ntfy': lambda spec: NtfyChannel(spec['topic']) if spec.get('topic') else None,
+}
+
+
+def build_named_channels(specs):
+    """Create the extra channels a watchlist defines, each under its own name"""
+    channels = []
+    for name, spec in specs.items():
+        channel = CHANNEL_FACTORIES[spec['type']](spec)
+        if channel is None:
+            logging.warning(f"Channel '{name}' is missing its {spec['type']} settings, skipping it")
+            continue
+        # Outbox entries are routed by name, so each extra webhook needs its own
+        channel.name = name
+        channels.append(channel)
+    return channels
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Durable notification outbox
+Alerts are appended to disk before the known-products state is saved and
+are only removed once a channel has accepted them, so a crash between
+detecting a change and posting it can never lose the alert. Every alert
+has an idempotency key derived from the product's revision, so re-detecting
+the same change after a crash does not queue it twice.
+
+An alert the channel rejects outright (a 4xx other than a rate limit), or
+one that has failed max_attempts deliveries, is dead-lettered: acknowledged
+with status 'failed' so it stops being retried, and counted in stats().
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from notifications import NotificationDispatcher
+from product_store import ends_mid_line
+
+COMPACT_MIN_LINES = 200
+MAX_ATTEMPTS = 10
+ACK_RETENTION = timedelta(days=7)
+
+
+def notification_key(event):
+    """Idempotency key for an event: the same change always gets the same key"""
+    return f"{event['id']}:{event.get('rev', 1)}:{event['type']}"
+
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+class Outbox:
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.pending = {}
+        self.delivered = {}
+        self.dead = {}
+        self.log_lines = 0
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, max_attempts=MAX_ATTEMPTS):
+        """Replay the outbox log: queued entries minus acknowledged ones"""
+        outbox = cls(path, max_attempts)
+        if not os.path.exists(path):
+            return outbox
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                outbox.log_lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping unreadable line {outbox.log_lines} in {path}")
+                    continue
+                slot = (record['key'], record['channel'])
+                if 'ack' in record:
+                    outbox.pending.pop(slot, None)
+                    outbox.delivered[slot] = record['ack']
+                    if record.get('status') == 'failed':
+                        outbox.dead[slot] = record['ack']
+                elif 'product' not in record:
+                    # A failed delivery attempt
+                    if slot in outbox.pending:
+                        outbox.pending[slot]['attempts'] = record['attempts']
+                elif slot not in outbox.delivered:
+                    outbox.pending[slot] = record
+
+        if outbox.pending:
+            logging.info(f"Outbox has {len(outbox.pending)} undelivered notification(s) from a previous run")
+        return outbox
+
+    def _append(self, records):
+        """Append records and force them to disk before returning"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if ends_mid_line(self.path):
+                f.write('\n')
+            for record in records:
+                f.write(_dump(record))
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_lines += len(records)
+
+    def enqueue(self, alerts, channel_names):
+        """Queue each alert for each channel, skipping keys that are already queued or delivered"""
+        created = datetime.now().isoformat()
+        records = []
+        with self.lock:
+            for product in alerts:
+                for channel in channel_names:
+                    slot = (product['key'], channel)
+                    if slot in self.pending or slot in self.delivered:
+                        continue
+                    record = {'key': product['key'], 'channel': channel, 'product': product, 'created': created}
+                    self.pending[slot] = record
+                    records.append(record)
+            if records:
+                self._append(records)
+        return len(records)
+
+    def ack(self, channel, keys, status='delivered'):
+        """Mark keys as handled for a channel"""
+        now = datetime.now()
+        records = []
+        with self.lock:
+            for key in keys:
+                entry = self.pending.pop((key, channel), None)
+                if entry is None:
+                    continue
+                self.delivered[(key, channel)] = now.isoformat()
+                if status == 'failed':
+                    self.dead[(key, channel)] = now.isoformat()
+                if status == 'delivered':
+                    self.latencies.append((now - datetime.fromisoformat(entry['created'])).total_seconds())
+                records.append({'key': key, 'channel': channel, 'ack': now.isoformat(), 'status': status})
+            if records:
+                self._append(records)
+
+    def pending_by_channel(self):
+        """Undelivered products grouped by channel, oldest first"""
+        grouped = {}
+        with self.lock:
+            for (key, channel), record in sorted(self.pending.items(), key=lambda item: item[1]['created']):
+                grouped.setdefault(channel, []).append(record['product'])
+        return grouped
+
+    def stats(self):
+        """Queue depth, age of the oldest entry and recent delivery latency"""
+        with self.lock:
+            depth = {}
+            oldest = None
+            for (key, channel), record in self.pending.items():
+                depth[channel] = depth.get(channel, 0) + 1
+                created = datetime.fromisoformat(record['created'])
+                oldest = created if oldest is None or created < oldest else oldest
+            latencies = list(self.latencies)
+            dead = len(self.dead)
+        return {
+            'depth': sum(depth.values()),
+            'depth_by_channel': depth,
+            'oldest_pending_seconds': round((datetime.now() - oldest).total_seconds(), 3) if oldest else 0.0,
+            'delivered': len(latencies),
+            'failed': dead,
+            'max_delivery_latency_seconds': round(max(latencies), 3) if latencies else 0.0,
+            'avg_delivery_latency_seconds': round(sum(latencies) / len(latencies), 3) if latencies else 0.0
+        }
+
+    def drain(self, channels, dispatcher=None):
+        """Deliver everything pending to the given channels (at least once)"""
+        by_name = {channel.name: channel for channel in channels}
+        assignments = []
+        for name, products in self.pending_by_channel().items():
+            channel = by_name.get(name)
+            if channel is None:
+                logging.warning(f"Dropping {len(products)} queued {name} notification(s): channel is no longer configured")
+                self.ack(name, [product['key'] for product in products], status='dropped')
+                continue
+            assignments.append((channel, products))
+
+        if not assignments:
+            return {}
+
+        def delivered(channel, batch):
+            self.ack(channel.name, [product['key'] for product in batch])
+
+        def rejected(channel, batch):
+            logging.error(f"Dead-lettering {len(batch)} {channel.name} notification(s) the channel rejected")
+            self.ack(channel.name, [product['key'] for product in batch], status='failed')
+
+        dispatcher = dispatcher or NotificationDispatcher(channels)
+        results = dispatcher.deliver(assignments, on_delivered=delivered, on_rejected=rejected)
+        self.record_attempts([(channel.name, products) for channel, products in assignments])
+        self.compact_if_needed()
+        return results
+
+    def record_attempts(self, assignments):
+        """Count a failed attempt for every entry still pending, dead-lettering those out of attempts"""
+        records = []
+        exhausted = {}
+        with self.lock:
+            for channel, products in assignments:
+                for product in products:
+                    entry = self.pending.get((product['key'], channel))
+                    if entry is None:
+                        continue
+                    entry['attempts'] = entry.get('attempts', 0) + 1
+                    if entry['attempts'] >= self.max_attempts:
+                        exhausted.setdefault(channel, []).append(product['key'])
+                    else:
+                        records.append({'key': product['key'], 'channel': channel, 'attempts': entry['attempts']})
+            if records:
+                self._append(records)
+        for channel, keys in exhausted.items():
+            logging.error(f"Dead-lettering {len(keys)} {channel} notification(s) after {self.max_attempts} attempts")
+            self.ack(channel, keys, status='failed')
+
+    def compact_if_needed(self):
+        """Rewrite the log once it is mostly superseded lines, keeping pending entries and recent acks"""
+        with self.lock:
+            if self.log_lines < COMPACT_MIN_LINES:
+                return
+            cutoff = datetime.now() - ACK_RETENTION
+            delivered = {slot: at for slot, at in self.delivered.items() if datetime.fromisoformat(at) >= cutoff}
+            live = len(delivered) + len(self.pending)
+            if self.log_lines < 2 * live:
+                return
+            self.delivered = delivered
+            self.dead = {slot: at for slot, at in self.dead.items() if slot in delivered}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for (key, channel), at in self.delivered.items():
+                    status = 'failed' if (key, channel) in self.dead else 'delivered'
+                    f.write(_dump({'key': key, 'channel': channel, 'ack': at, 'status': status}))
+                for record in self.pending.values():
+                    f.write(_dump(record))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.log_lines = live
+
+
+class OutboxDrainer(threading.Thread):
+    """Background thread that drains the outbox so slow webhooks never delay the next scrape"""
+
+    def __init__(self, outbox, channels, interval=30, on_drained=None):
+        super().__init__(daemon=True, name='outbox-drainer')
+        self.outbox = outbox
+        self.channels = channels
+        self.interval = interval
+        self.on_drained = on_drained
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+
+    def wake(self):
+        self.wakeup.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                if self.outbox.pending:
+                    results = self.outbox.drain(self.channels)
+                    if self.on_drained:
+                        self.on_drained(results)
+                    logging.info(f"Outbox: {self.outbox.stats()}")
+            except Exception as e:
+                logging.error(f"Error draining outbox: {e}")
+
+    def stop(self, timeout=30):
+        """Finish the current drain and stop"""
+        self.stopping.set()
+        self.wakeup.set()
+        self.join(timeout)
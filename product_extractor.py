@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Single-pass product extractor for rendered search pages
+Walks the document once, finds each product card exactly once and pulls
+title, URL, price and availability in the same pass
+"""
+
+import logging
+import re
+
+from bs4 import BeautifulSoup, FeatureNotFound
+from bs4.element import Tag
+
+from title_match import clean_title
+from watchlist import DEFAULT_WATCHLIST
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4'}
+TITLE_CLASS_RE = re.compile(r'product-title|product-name|lister-name')
+PRICE_CLASS_RE = re.compile(r'price|\bcost\b')
+STOCK_CLASS_RE = re.compile(r'stock|availability')
+PRICE_TEXT_RE = re.compile(r'\$\s?[\d,]+(?:\.\d{2})?|AUD\s?[\d,]+(?:\.\d{2})?', re.IGNORECASE)
+PRODUCT_LINK_RE = re.compile(r'/p/')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class Markup:
+    """Patterns that pick out product cards and their fields on one site's pages"""
+
+    def __init__(self, product_link=PRODUCT_LINK_RE, title_class=TITLE_CLASS_RE, price_class=PRICE_CLASS_RE,
+                 stock_class=STOCK_CLASS_RE, price_text=PRICE_TEXT_RE):
+        self.product_link = product_link
+        self.title_class = title_class
+        self.price_class = price_class
+        self.stock_class = stock_class
+        self.price_text = price_text
+
+
+COSTCO_MARKUP = Markup()
+
+
+def resolve_parser(parser):
+    """Return the requested BeautifulSoup parser, falling back to html.parser if it is not installed"""
+    if parser == 'html.parser':
+        return parser
+    try:
+        BeautifulSoup('', parser)
+        return parser
+    except FeatureNotFound:
+        logging.warning(f"Parser '{parser}' is not installed, using html.parser")
+        return 'html.parser'
+
+
+def _text(tag):
+    """Collapsed visible text of a tag"""
+    return WHITESPACE_RE.sub(' ', tag.get_text(' ')).strip()
+
+
+class _Card:
+    """Facts collected for one subtree while walking the document"""
+    __slots__ = ('url', 'anchor', 'multi', 'title', 'link_text', 'price', 'availability', 'pending', 'outside')
+
+    def __init__(self):
+        self.url = None
+        self.anchor = False
+        self.multi = False
+        self.title = None
+        self.link_text = None
+        self.price = None
+        self.availability = None
+        self.pending = []
+        self.outside = None
+
+    def fill(self, other):
+        """Copy any field this card is still missing from a child subtree"""
+        if self.title is None:
+            self.title = other.title
+        if self.link_text is None:
+            self.link_text = other.link_text
+        if self.price is None:
+            self.price = other.price
+        if self.availability is None:
+            self.availability = other.availability
+
+
+def _visit(tag, markup):
+    """Classify a tag on the way down and record anything it contributes itself"""
+    card = _Card()
+    attrs = tag.attrs
+    classes = attrs.get('class')
+    cls = ' '.join(classes).lower() if classes else ''
+    testid = attrs.get('data-testid', '').lower()
+
+    if tag.name == 'a':
+        href = attrs.get('href', '')
+        if markup.product_link.search(href):
+            card.url = href
+            card.anchor = True
+            card.link_text = _text(tag) or None
+
+    if tag.name in HEADING_TAGS or markup.title_class.search(cls) or 'title' in testid:
+        card.title = _text(tag) or None
+    elif markup.price_class.search(cls) or 'price' in testid:
+        match = markup.price_text.search(tag.get_text())
+        if match:
+            card.price = match.group(0).replace(' ', '')
+    elif markup.stock_class.search(cls):
+        card.availability = _text(tag) or None
+
+    return card
+
+
+def _merge(parent, child, cards):
+    """Fold a finished child subtree into its parent
+
+    A card is the largest subtree that links to exactly one product page, so
+    as soon as a parent sees a second distinct URL its single-URL children
+    are emitted and the parent stops collecting fields.
+
+    Fields from subtrees before the product link are held back until the link
+    arrives. They fill in a bare link (a heading above a "View" link), but a
+    subtree that is already a card around its link keeps only its own fields,
+    so a page header never names the only result on a page.
+    """
+    if parent.multi:
+        if child.url and not child.multi:
+            cards.append(child)
+        return
+
+    if child.multi:
+        parent.multi = True
+        cards.extend(parent.pending)
+        parent.pending = []
+        return
+
+    if child.url is None:
+        if child.outside is not None:
+            child.fill(child.outside)
+        if parent.url is not None:
+            parent.fill(child)
+        elif child.title or child.price or child.availability:
+            if parent.outside is None:
+                parent.outside = _Card()
+            parent.outside.fill(child)
+        return
+
+    if parent.url is None:
+        parent.url = child.url
+        parent.fill(child)
+        if child.anchor and parent.outside is not None:
+            parent.fill(parent.outside)
+        parent.outside = None
+        parent.pending.append(child)
+        return
+
+    if parent.url == child.url:
+        parent.fill(child)
+        parent.pending.append(child)
+        return
+
+    parent.multi = True
+    cards.extend(parent.pending)
+    cards.append(child)
+    parent.pending = []
+
+
+def find_cards(soup, markup=COSTCO_MARKUP):
+    """Walk the tree once and return one _Card per product subtree"""
+    cards = []
+    root = _Card()
+    stack = [(root, iter(soup.contents))]
+
+    while stack:
+        card, children = stack[-1]
+        for child in children:
+            if isinstance(child, Tag):
+                stack.append((_visit(child, markup), iter(child.contents)))
+                break
+        else:
+            stack.pop()
+            if stack:
+                _merge(stack[-1][0], card, cards)
+
+    if root.url and not root.multi:
+        cards.append(root)
+    return cards
+
+
+def extract_products(page_source, base_url, found_at, parser='html.parser', watchlist=DEFAULT_WATCHLIST, stats=None,
+                     markup=COSTCO_MARKUP):
+    """Extract matching products from a search page in a single tree walk
+
+    If a stats dict is given, the number of product cards seen before the
+    watchlist filter is stored in it as 'candidates'.
+    """
+    soup = BeautifulSoup(page_source, resolve_parser(parser))
+    products = []
+    by_url = {}
+
+    for card in find_cards(soup, markup):
+        url = card.url
+        if not url.startswith('http'):
+            url = base_url + url
+
+        existing = by_url.get(url)
+        if existing:
+            existing.fill(card)
+            continue
+        by_url[url] = card
+
+    if stats is not None:
+        stats['candidates'] = len(by_url)
+
+    for url, card in by_url.items():
+        # Link text can run the price, rating and buttons into the name
+        title = clean_title(card.title or card.link_text or '')
+        if not title:
+            continue
+        if not watchlist.is_relevant(title):
+            continue
+
+        products.append({
+            'title': title,
+            'url': url,
+            'price': card.price or "Price not found",
+            'availability': card.availability or "Unknown",
+            'found_at': found_at
+        })
+
+    return products
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Known-products store keyed by a stable product identity
+Products are identified by the Costco item code from their /p/ URL, falling
+back to a normalized title when no code is available.
+
+State is kept in an append-only JSON Lines file: each save appends only new
+or changed records, a later line for the same id replaces an earlier one,
+and the file is compacted once it holds mostly superseded lines.
+
+Each record also remembers the last seen price and stock state, so a run is
+diffed against that snapshot to emit typed change events.
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from title_match import FuzzyIndex, clean_title, normalize_title
+from watchlist import DEFAULT_WATCHLIST
+
+COMPACT_MIN_LINES = 1000
+
+# Change events
+NEW_LISTING = 'new_listing'
+PRICE_CHANGE = 'price_change'
+BACK_IN_STOCK = 'back_in_stock'
+OUT_OF_STOCK = 'out_of_stock'
+EVENT_TYPES = [NEW_LISTING, PRICE_CHANGE, BACK_IN_STOCK, OUT_OF_STOCK]
+
+# Stock states
+IN_STOCK = 'in_stock'
+SOLD_OUT = 'out_of_stock'
+UNKNOWN = 'unknown'
+
+PRODUCT_CODE_RE = re.compile(r'/p/(\d+)')
+# Prices written with a currency code ("NZD 12.00") are stored with its symbol
+CURRENCY_SYMBOLS = {'AUD': '$', 'NZD': '$', 'USD': '$', 'CAD': '$', 'GBP': '£', 'EUR': '€'}
+PRICE_RE = re.compile(r'(?:[$£€]|\b(?:' + '|'.join(CURRENCY_SYMBOLS) + r')(?![a-z]))\s?[\d,]+(?:\.\d{2})?', re.IGNORECASE)
+
+# Code-less records are matched by title this strictly; variants of a listing more loosely
+IDENTITY_THRESHOLD = 0.9
+# Checked before IN_STOCK_RE, so negated or future availability never reads as in stock
+OUT_OF_STOCK_RE = re.compile(
+    r'out\s*of\s*stock|sold\s*out|unavailable|outofstock'
+    r'|not\s+(?:currently\s+|yet\s+)?(?:in\s*stock|available)|no\s+longer\s+available'
+    r'|(?:available|coming)\s+soon',
+    re.IGNORECASE
+)
+IN_STOCK_RE = re.compile(r'in\s*stock|low\s*stock|\bavailable\b|add to cart|instock|lowstock', re.IGNORECASE)
+
+
+def normalize_price(price):
+    """Just the amount and currency symbol from scraped price text, if there is one"""
+    match = PRICE_RE.search(price or '')
+    if not match:
+        return price or "Price not found"
+    text = match.group(0).replace(' ', '')
+    symbol = CURRENCY_SYMBOLS.get(text[:3].upper())
+    return symbol + text[3:] if symbol else text
+
+
+def stock_state(availability):
+    """Map scraped availability text to in_stock, out_of_stock or unknown"""
+    if not availability:
+        return UNKNOWN
+    if OUT_OF_STOCK_RE.search(availability):
+        return SOLD_OUT
+    if IN_STOCK_RE.search(availability):
+        return IN_STOCK
+    return UNKNOWN
+
+
+def has_price(price):
+    """True if price is an actual amount rather than a placeholder"""
+    return bool(price) and PRICE_RE.fullmatch(price) is not None
+
+
+def product_code(product):
+    """Costco item code from the product URL, or None"""
+    match = PRODUCT_CODE_RE.search(product.get('url') or '')
+    return match.group(1) if match else None
+
+
+def product_id(product):
+    """Stable identity for a product: its item code, or its normalized title"""
+    return product_code(product) or f"title:{normalize_title(product['title'])}"
+
+
+class ProductStore:
+    def __init__(self):
+        self.products = {}
+        self.title_index = {}
+        self.title_fuzzy = FuzzyIndex(IDENTITY_THRESHOLD)
+        self.variants = None
+        self.dirty = set()
+        self.removed = set()
+        self.log_lines = 0
+        self.migrated_from = None
+
+    def __len__(self):
+        return len(self.products)
+
+    def __contains__(self, product):
+        return self.lookup(product) is not None
+
+    def lookup(self, product):
+        """Find the stored record for a product in O(1), or None"""
+        record = self.products.get(product_id(product))
+        if record:
+            return record
+        # Records without an item code (migrated or URL-less) can still match by title
+        if not self.title_index:
+            return None
+        title_id = self.title_index.get(normalize_title(product['title']))
+        if not title_id:
+            # Tolerate reordered words and leftover card text around the same name
+            match = self.title_fuzzy.best(product['title'])
+            title_id = match[0] if match else None
+        return self.products.get(title_id) if title_id else None
+
+    def variant_of(self, record):
+        """Another stored listing of the same product (a different item code or wording), or None"""
+        if self.variants is None:
+            # Built on first use, as only runs with new listings need it
+            self.variants = FuzzyIndex()
+            for record_id, stored in self.products.items():
+                self.variants.add(record_id, stored['title'])
+        match = self.variants.best(record['title'], exclude=record['id'])
+        return self.products.get(match[0]) if match else None
+
+    def add(self, product, seen_at=None):
+        """Store a product, upgrading a title-only record once its item code is known"""
+        record = self.lookup(product)
+        new_id = product_id(product)
+
+        if record and record['id'] != new_id and not new_id.startswith('title:'):
+            old_id = record['id']
+            del self.products[old_id]
+            self.dirty.discard(old_id)
+            self.removed.add(old_id)
+            record['id'] = new_id
+            record['url'] = product.get('url') or record['url']
+            self.products[new_id] = record
+            self.title_index.pop(normalize_title(record['title']), None)
+            self.title_fuzzy.remove(old_id)
+            if self.variants is not None:
+                self.variants.remove(old_id)
+                self.variants.add(new_id, record['title'])
+            self.dirty.add(new_id)
+            return record
+
+        if record:
+            return record
+
+        record = {
+            'id': new_id,
+            'title': clean_title(product['title']),
+            'url': product.get('url', ''),
+            'price': normalize_price(product.get('price')),
+            'stock': stock_state(product.get('availability')),
+            'rev': 1,
+            'first_seen': seen_at or product.get('found_at') or datetime.now().isoformat()
+        }
+        self._insert(record)
+        self.dirty.add(record['id'])
+        return record
+
+    def observe(self, product, seen_at=None):
+        """Record one scraped product and return the change events it causes
+
+        Only the product's own previous snapshot is consulted, so a run costs
+        one lookup per scraped product and one write per changed product.
+        """
+        seen_at = seen_at or product.get('found_at') or datetime.now().isoformat()
+        if self.lookup(product) is None:
+            record = self.add(product, seen_at=seen_at)
+            return [_event(NEW_LISTING, record, product, seen_at)]
+
+        record = self.add(product)
+        events = []
+
+        price = normalize_price(product.get('price'))
+        old_price = record.get('price')
+        if has_price(price) and price != old_price:
+            if has_price(old_price):
+                events.append(_event(PRICE_CHANGE, record, product, seen_at, previous_price=old_price))
+            record['price'] = price
+            self.dirty.add(record['id'])
+
+        stock = stock_state(product.get('availability'))
+        old_stock = record.get('stock', UNKNOWN)
+        if stock != UNKNOWN and stock != old_stock:
+            if old_stock == SOLD_OUT and stock == IN_STOCK:
+                events.append(_event(BACK_IN_STOCK, record, product, seen_at))
+            elif old_stock == IN_STOCK and stock == SOLD_OUT:
+                events.append(_event(OUT_OF_STOCK, record, product, seen_at))
+            record['stock'] = stock
+            self.dirty.add(record['id'])
+
+        if events:
+            # Each change bumps the revision, which makes event keys unique and repeatable
+            record['rev'] = record.get('rev', 1) + 1
+            for event in events:
+                event['rev'] = record['rev']
+        return events
+
+    def diff(self, products, seen_at=None):
+        """Apply a run's scraped products and return all change events"""
+        known = len(self.products)
+        events = []
+        for product in products:
+            events.extend(self.observe(product, seen_at))
+
+        # A first run has nothing to be a variant of, and skipping it keeps bulk imports linear
+        if known:
+            for event in events:
+                record = self.products.get(event['id'])
+                if event['type'] == NEW_LISTING and record:
+                    variant = self.variant_of(record)
+                    if variant:
+                        event['variant_of'] = {'id': variant['id'], 'title': variant['title']}
+        return events
+
+    def _insert(self, record):
+        self.products[record['id']] = record
+        # Only code-less records are ever matched by title
+        if record['id'].startswith('title:'):
+            self.title_index.setdefault(normalize_title(record['title']), record['id'])
+            self.title_fuzzy.add(record['id'], record['title'])
+        if self.variants is not None:
+            self.variants.add(record['id'], record['title'])
+
+    @classmethod
+    def from_legacy_keys(cls, keys, seen_at, watchlist=DEFAULT_WATCHLIST):
+        """Build a store from the old 'title|price' key list, merging near-duplicates
+
+        Keys the current extractor would never produce, such as a search
+        result count link ("Pokemon (1)") with no price, are dropped.
+        """
+        store = cls()
+        for key in keys:
+            title, _, price = key.rpartition('|')
+            if not title:
+                title, price = key, ''
+            if not has_price(normalize_price(price)) or not watchlist.is_relevant(clean_title(title)):
+                continue
+            store.add({'title': title, 'price': price, 'url': ''}, seen_at=seen_at)
+        return store
+
+    @classmethod
+    def from_json_file(cls, path):
+        """Load the older whole-file JSON formats (key list or id -> record map)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        products = data.get('products', [])
+        if isinstance(products, list):
+            store = cls.from_legacy_keys(products, data.get('last_updated'))
+            logging.info(f"Migrated {len(products)} legacy product keys to {len(store)} products")
+            return store
+
+        store = cls()
+        for record in products.values():
+            store._insert(record)
+            store.dirty.add(record['id'])
+        return store
+
+    @classmethod
+    def load(cls, path, legacy_path=None):
+        """Stream the state log from disk, migrating an older JSON file if that is all there is"""
+        if not os.path.exists(path):
+            if legacy_path and os.path.exists(legacy_path):
+                store = cls.from_json_file(legacy_path)
+                store.migrated_from = legacy_path
+                logging.info(f"Migrating {len(store)} known products from {legacy_path} to {path}")
+                return store
+            logging.info("No previous products file found, starting fresh")
+            return cls()
+
+        store = cls()
+        records, store.log_lines = _read_log(path)
+        for record in records:
+            if record.get('deleted'):
+                store.products.pop(record['id'], None)
+            else:
+                store.products[record['id']] = record
+
+        for record_id, record in store.products.items():
+            if record_id.startswith('title:'):
+                store.title_index.setdefault(normalize_title(record['title']), record_id)
+                store.title_fuzzy.add(record_id, record['title'])
+        logging.info(f"Loaded {len(store)} known products from file")
+        return store
+
+    def needs_compaction(self, pending=0):
+        """True once most lines in the log would be superseded"""
+        return self.log_lines + pending > max(COMPACT_MIN_LINES, 2 * len(self.products))
+
+    def save(self, path):
+        """Append new and changed records to the log, compacting it when needed"""
+        pending = len(self.dirty) + len(self.removed)
+        if self.migrated_from or self.needs_compaction(pending):
+            self.compact(path)
+        elif pending:
+            with open(path, 'a', encoding='utf-8') as f:
+                if ends_mid_line(path):
+                    f.write('\n')
+                for record_id in self.removed:
+                    f.write(_dump({'id': record_id, 'deleted': True}))
+                for record_id in self.dirty:
+                    f.write(_dump(self.products[record_id]))
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_lines += pending
+
+        self.dirty.clear()
+        self.removed.clear()
+        if self.migrated_from:
+            os.remove(self.migrated_from)
+            self.migrated_from = None
+        return pending
+
+    def compact(self, path):
+        """Rewrite the log with one line per live product"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self.products.values():
+                f.write(_dump(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.log_lines = len(self.products)
+        logging.info(f"Compacted {path} to {self.log_lines} records")
+
+
+def _event(event_type, record, product, seen_at, previous_price=None):
+    """A change event for one product"""
+    return {
+        'type': event_type,
+        'id': record['id'],
+        'product': product,
+        'previous_price': previous_price,
+        'rev': record.get('rev', 1),
+        'at': seen_at,
+        'variant_of': None
+    }
+
+
+def _read_log(path):
+    """Parse every line of the log, returning (records, line count)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line for line in f.read().split('\n') if line.strip()]
+
+    try:
+        # Parsing the whole log as one array is much faster than one loads() per line
+        return json.loads('[' + ','.join(lines) + ']'), len(lines)
+    except ValueError:
+        pass
+
+    records = []
+    for number, line in enumerate(lines, 1):
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # A run that died mid-append can leave a partial line
+            logging.warning(f"Skipping unreadable line {number} in {path}")
+    return records, len(lines)
+
+
+def ends_mid_line(path):
+    """True if the last line was left unterminated by an interrupted write"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+
+def _dump(record):
+    """One compact JSON line"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Record/replay harness for offline tests and benchmarks
+Recording wraps the monitor's HTTP session and WebDriver and saves every HTTP
+response and rendered page to a JSON fixture. Replaying serves those back
+through a stub session and a stub browser, so fetch_pokemon_products runs
+fully offline.
+
+Usage:
+    python replay.py record fixtures/recordings/my_run.json
+    python replay.py replay fixtures/recordings/my_run.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+
+RECORDING_VERSION = 1
+
+
+def request_key(method, url, params=None):
+    """Canonical method + URL (with query string) used to match recorded responses"""
+    prepared = requests.Request(method.upper(), url, params=params).prepare()
+    return f"{prepared.method} {prepared.url}"
+
+
+class Recording:
+    """In-memory list of recorded HTTP responses and rendered pages"""
+
+    def __init__(self, entries=None, meta=None):
+        self.entries = entries or []
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['entries'], data.get('meta'))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        data = {'version': RECORDING_VERSION, 'meta': self.meta, 'entries': self.entries}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def add_http(self, key, response):
+        self.entries.append({
+            'kind': 'http',
+            'key': key,
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'body': response.text
+        })
+
+    def add_page(self, url, page_source):
+        self.entries.append({'kind': 'page', 'url': url, 'body': page_source})
+
+    def http_responses(self):
+        """Latest recorded response for each request key"""
+        return {entry['key']: entry for entry in self.entries if entry['kind'] == 'http'}
+
+    def pages(self):
+        """Latest rendered page source for each URL"""
+        return {entry['url']: entry['body'] for entry in self.entries if entry['kind'] == 'page'}
+
+
+class RecordingSession(requests.Session):
+    """requests.Session that saves every response it receives"""
+
+    def __init__(self, recording):
+        super().__init__()
+        self.recording = recording
+
+    def request(self, method, url, params=None, **kwargs):
+        response = super().request(method, url, params=params, **kwargs)
+        self.recording.add_http(request_key(method, url, params), response)
+        return response
+
+
+class RecordingDriver:
+    """WebDriver proxy that saves the page source each time it is read"""
+
+    def __init__(self, driver, recording):
+        self._driver = driver
+        self._recording = recording
+
+    @property
+    def page_source(self):
+        source = self._driver.page_source
+        self._recording.add_page(self._driver.current_url, source)
+        return source
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class ReplaySession(requests.Session):
+    """requests.Session that answers from a recording and never touches the network"""
+
+    def __init__(self, recording):
+        super().__init__()
+        self.responses = recording.http_responses()
+        self.calls = []
+
+    def request(self, method, url, params=None, **kwargs):
+        key = request_key(method, url, params)
+        self.calls.append(key)
+        entry = self.responses.get(key)
+        etag = entry['headers'].get('ETag') if entry else None
+        if etag and (kwargs.get('headers') or {}).get('If-None-Match') == etag:
+            # Answer a matching conditional request the way the server would
+            entry = {'status': 304, 'headers': {'ETag': etag}, 'body': ''}
+        response = requests.Response()
+        response.url = key.split(' ', 1)[1]
+        response.encoding = 'utf-8'
+        if entry is None:
+            response.status_code = 404
+            response._content = b''
+            response.headers = CaseInsensitiveDict()
+        else:
+            response.status_code = entry['status']
+            response._content = entry['body'].encode('utf-8')
+            # Bodies are stored decoded, so drop headers describing the wire encoding
+            headers = {k: v for k, v in entry['headers'].items()
+                       if k.lower() not in ('content-encoding', 'transfer-encoding', 'content-length')}
+            response.headers = CaseInsensitiveDict(headers)
+        return response
+
+
+class ReplayDriver:
+    """Minimal stand-in for a Chrome WebDriver that serves recorded pages"""
+
+    def __init__(self, recording):
+        self.pages = recording.pages()
+        self.current_url = 'about:blank'
+        self.visits = []
+        self.probes = {}
+
+    def get(self, url):
+        self.current_url = url
+        self.visits.append(url)
+
+    @property
+    def page_source(self):
+        return self.pages.get(self.current_url, '<html><head><title>Not recorded</title></head><body></body></html>')
+
+    def execute_script(self, script, grid_selector='a[href*="/p/"]', no_results_selector='.no-results', *args):
+        """Answer the readiness probe from the recorded page, which is already settled"""
+        if self.current_url not in self.probes:
+            soup = BeautifulSoup(self.page_source, 'html.parser')
+            self.probes[self.current_url] = [len(soup.select(grid_selector)), 'complete',
+                                             soup.select_one(no_results_selector) is not None]
+        return self.probes[self.current_url]
+
+    def quit(self):
+        pass
+
+
+def replay_monitor(recording, monitor_class=None, state_dir=None):
+    """A monitor wired to a recording: replayed HTTP, replayed browser, state files in state_dir
+
+    Reusing a state_dir picks up the state a previous replay left behind, like a scheduled run would.
+    """
+    if monitor_class is None:
+        from github_pokemon_monitor import GitHubCostcoPokemonMonitor as monitor_class
+    from fetch_cache import FetchCache
+    from outbox import Outbox
+    from product_store import ProductStore
+    from history_db import HistoryDB
+    from scheduler import DropHistory
+
+    monitor = monitor_class()
+    state_dir = state_dir or tempfile.mkdtemp(prefix='replay-')
+    monitor.state_path = os.path.join(state_dir, 'known_products.jsonl')
+    monitor.outbox_path = os.path.join(state_dir, 'notification_outbox.jsonl')
+    monitor.run_log_path = os.path.join(state_dir, 'run_metrics.jsonl')
+    monitor.fetch_cache = FetchCache.load(os.path.join(state_dir, 'fetch_cache.json'))
+    monitor.known_products = ProductStore.load(monitor.state_path)
+    monitor.outbox = Outbox.load(monitor.outbox_path)
+    monitor.drop_history = DropHistory.load(os.path.join(state_dir, 'drop_history.jsonl'))
+    monitor.history = HistoryDB(os.path.join(state_dir, 'product_history.db'))
+    monitor.session = ReplaySession(recording)
+    monitor.session.headers.update(monitor.headers)
+    monitor.setup_driver = lambda: ReplayDriver(recording)
+    monitor.rate_limiter.min_interval = 0
+    monitor.ready_settle = 0
+    monitor.ready_poll_interval = 0
+    return monitor
+
+
+def record(path):
+    """Run one real fetch and save everything it downloaded"""
+    from github_pokemon_monitor import GitHubCostcoPokemonMonitor
+
+    recording = Recording(meta={'recorded_at': datetime.now().isoformat()})
+    monitor = GitHubCostcoPokemonMonitor()
+    monitor.session = RecordingSession(recording)
+    monitor.session.headers.update(monitor.headers)
+    setup_driver = monitor.setup_driver
+    monitor.setup_driver = lambda: (lambda driver: RecordingDriver(driver, recording) if driver else None)(setup_driver())
+
+    products = monitor.fetch_all_products()
+    recording.meta.update({'fetch': monitor.last_fetch, 'products': len(products)})
+    recording.save(path)
+    logging.info(f"Recorded {len(recording.entries)} responses/pages to {path} ({len(products)} products)")
+
+
+def replay(path):
+    """Fetch from a recording and print what the monitor extracted"""
+    monitor = replay_monitor(Recording.load(path))
+    start = time.perf_counter()
+    products = monitor.fetch_all_products()
+    elapsed = time.perf_counter() - start
+    for product in products:
+        print(f"{product['title']} - {product['price']} - {product['availability']} - {product['url']}")
+    print(f"{len(products)} products via {monitor.last_fetch.get('path')} in {elapsed * 1000:.1f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or replay monitor fetches")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('path', help="recording JSON file")
+    args = parser.parse_args(argv)
+    if args.mode == 'record':
+        record(args.path)
+    else:
+        replay(args.path)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
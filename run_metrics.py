@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Per-run metrics for the monitor
+Each check collects per-phase timings, counters and gauges into a RunMetrics
+object, which is appended to a JSON Lines run log when the check ends. In
+daemon mode the runs are also aggregated into a MetricsRegistry and served
+in the Prometheus text format.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from product_store import ends_mid_line
+
+RUN_LOG_MAX_BYTES = 5 * 1024 * 1024
+METRIC_PREFIX = 'pokemon_monitor'
+NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class RunMetrics:
+    """Timings, counters and gauges for one check (safe to update from crawl workers)"""
+
+    def __init__(self, mode='once'):
+        self.mode = mode
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block and add it to the named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            phase = self.phases.setdefault(name, {'seconds': 0.0, 'count': 0, 'max_seconds': 0.0})
+            phase['seconds'] += seconds
+            phase['count'] += 1
+            phase['max_seconds'] = max(phase['max_seconds'], seconds)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def gauge_max(self, name, value):
+        """Keep the highest value seen this run, e.g. peak driver memory"""
+        with self.lock:
+            self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def add_delivery(self, results):
+        """Count sent/failed/rejected messages and time each POST from dispatcher results"""
+        for channel, stats in (results or {}).items():
+            self.count('notifications_sent', stats['sent'])
+            self.count('notifications_failed', stats['failed'])
+            if stats.get('rejected'):
+                self.count('notifications_rejected', stats['rejected'])
+            for seconds in stats.get('message_seconds', []):
+                self.add_time(f"notify_{channel}", seconds)
+
+    def record(self, **extra):
+        """The run as a JSON-serializable dict"""
+        with self.lock:
+            record = {
+                'run_id': self.started.isoformat(),
+                'mode': self.mode,
+                'seconds': round(time.perf_counter() - self.start, 3),
+                'phases': {name: {'seconds': round(p['seconds'], 3), 'count': p['count'],
+                                  'max_seconds': round(p['max_seconds'], 3)}
+                           for name, p in self.phases.items()},
+                'counters': dict(self.counters),
+                'gauges': {name: round(value, 1) for name, value in self.gauges.items()}
+            }
+        record.update(extra)
+        return record
+
+    def summary(self):
+        """One log line with the slowest phases first"""
+        phases = sorted(self.phases.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        timings = ', '.join(f"{name}={p['seconds']:.2f}s" for name, p in phases)
+        counters = ', '.join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        return f"{time.perf_counter() - self.start:.2f}s total; {timings}; {counters}"
+
+
+def append_run_record(path, record, max_bytes=RUN_LOG_MAX_BYTES):
+    """Append a run to the JSON Lines run log, keeping one rotated file as path.1"""
+    if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+        os.replace(path, f"{path}.1")
+    with open(path, 'a', encoding='utf-8') as f:
+        if ends_mid_line(path):
+            f.write('\n')
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n')
+
+
+def metric_name(*parts):
+    return NAME_RE.sub('_', '_'.join((METRIC_PREFIX,) + parts))
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """Totals across runs plus the last run's values, rendered for Prometheus"""
+
+    def __init__(self):
+        self.runs = 0
+        self.counters = {}
+        self.phase_seconds = {}
+        self.phase_calls = {}
+        self.last_phases = {}
+        self.gauges = {}
+        self.last_run = None
+        self.live_gauges = {}
+        self.lock = threading.Lock()
+
+    def add_gauge(self, name, help_text, read):
+        """A gauge whose value is read when the metrics are scraped"""
+        self.live_gauges[name] = (help_text, read)
+
+    def observe_run(self, record):
+        with self.lock:
+            self.runs += 1
+            self.last_run = record
+            self._add_counters(record['counters'])
+            for name, phase in record['phases'].items():
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + phase['seconds']
+                self.phase_calls[name] = self.phase_calls.get(name, 0) + phase['count']
+            self.last_phases = {name: phase['seconds'] for name, phase in record['phases'].items()}
+            self.gauges.update(record['gauges'])
+
+    def observe_delivery(self, results):
+        """Add notifications delivered outside a run (by the background drainer)"""
+        metrics = RunMetrics()
+        metrics.add_delivery(results)
+        with self.lock:
+            self._add_counters(metrics.counters)
+            for name, phase in metrics.phases.items():
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + phase['seconds']
+                self.phase_calls[name] = self.phase_calls.get(name, 0) + phase['count']
+
+    def _add_counters(self, counters):
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+        with self.lock:
+            metric(metric_name('runs_total'), 'counter', 'Checks completed', [({}, self.runs)])
+            if self.last_run:
+                started = datetime.fromisoformat(self.last_run['run_id']).timestamp()
+                metric(metric_name('last_run_timestamp_seconds'), 'gauge', 'Start time of the last check',
+                       [({}, round(started, 3))])
+                metric(metric_name('last_run_seconds'), 'gauge', 'Duration of the last check',
+                       [({}, self.last_run['seconds'])])
+            metric(metric_name('phase_seconds_total'), 'counter', 'Time spent in each phase across all checks',
+                   [({'phase': name}, round(seconds, 3)) for name, seconds in sorted(self.phase_seconds.items())])
+            metric(metric_name('phase_calls_total'), 'counter', 'Times each phase ran across all checks',
+                   [({'phase': name}, count) for name, count in sorted(self.phase_calls.items())])
+            metric(metric_name('last_run_phase_seconds'), 'gauge', 'Time spent in each phase during the last check',
+                   [({'phase': name}, seconds) for name, seconds in sorted(self.last_phases.items())])
+            for name, value in sorted(self.counters.items()):
+                metric(metric_name(name, 'total'), 'counter', f"Total {name.replace('_', ' ')}", [({}, value)])
+            for name, value in sorted(self.gauges.items()):
+                metric(metric_name(name), 'gauge', f"Last run {name.replace('_', ' ')}", [({}, value)])
+
+        for name, (help_text, read) in sorted(self.live_gauges.items()):
+            try:
+                value = read()
+            except Exception as e:
+                logging.debug(f"Metric {name} unavailable: {e}")
+                continue
+            metric(metric_name(name), 'gauge', help_text, [({}, round(value, 3))])
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves a registry at /metrics from a background thread"""
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_port}/metrics"
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='metrics-server').start()
+        logging.info(f"📈 Serving metrics at {self.url}")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Multi-site and adaptive polling scheduler
+Checks every configured store in one pass: all stores' pages go through one
+worker pool and one warm browser pool, while each store keeps its own
+known-products state, fetch cache and request spacing.
+
+In daemon mode the time between passes can be learned from the history of
+drops (new listings and restocks): short in the hours of the week when drops
+usually happen and right after one, long when things are quiet, and always
+within a daily request budget.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import chain, zip_longest
+
+from crawler import crawl_stats, fetch_pages, merge_products, plan_targets
+from product_store import NEW_LISTING, BACK_IN_STOCK, ends_mid_line
+
+HOURS_PER_WEEK = 7 * 24
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+DROP_EVENTS = (NEW_LISTING, BACK_IN_STOCK)
+
+
+class SiteScheduler:
+    def __init__(self, monitors, workers=4):
+        self.monitors = monitors
+        self.workers = workers
+
+        # One rate limiter and one outbox for everyone; per-site spacing lives in the limiter
+        primary = monitors[0]
+        for monitor in monitors:
+            monitor.rate_limiter = primary.rate_limiter
+            monitor.outbox = primary.outbox
+            monitor.drop_history = primary.drop_history
+            monitor.history = primary.history
+            monitor.watchlist = primary.watchlist
+            if monitor.site.min_interval is not None:
+                primary.rate_limiter.set_interval(monitor.base_url, monitor.site.min_interval)
+            if len(monitors) > 1:
+                monitor.site_label = monitor.site.label
+
+    @property
+    def requests_per_poll(self):
+        """Pages fetched by one pass over every site"""
+        return len(self.plan())
+
+    def share_driver_pool(self, pool):
+        """Point every site at the same browsers"""
+        for monitor in self.monitors:
+            monitor.driver_pool = pool
+
+    def plan(self):
+        """Every site's targets, interleaved so one large store does not hold up the others"""
+        plans = [[(monitor, target) for target in plan_targets(monitor, monitor.search_queries,
+                                                               monitor.category_paths, monitor.max_pages)]
+                 for monitor in self.monitors]
+        return [job for job in chain.from_iterable(zip_longest(*plans)) if job is not None]
+
+    def fetch_all(self):
+        """Fetch every site's pages concurrently and return [(monitor, products)]"""
+        jobs = self.plan()
+        workers = max(1, min(self.workers, len(jobs)))
+        logging.info(f"🕸️ Checking {len(self.monitors)} site(s), {len(jobs)} page(s) with {workers} worker(s)")
+        start = time.perf_counter()
+        results = {monitor: [] for monitor in self.monitors}
+        for (monitor, target), page in fetch_pages(jobs, self.monitors, workers):
+            results[monitor].append(page)
+
+        elapsed = time.perf_counter() - start
+        fetched = []
+        for monitor, pages in results.items():
+            products = merge_products(products for products, stats in pages)
+            if len(pages) == 1:
+                monitor.last_fetch = pages[0][1]
+            else:
+                monitor.last_fetch = crawl_stats([stats for products, stats in pages], products, elapsed)
+            fetched.append((monitor, products))
+        logging.info(f"⏱️ All sites fetched in {elapsed:.2f}s")
+        return fetched
+
+
+def hour_of_week(moment):
+    """0 for Monday 00:00-00:59 up to 167 for Sunday 23:00-23:59"""
+    return moment.weekday() * 24 + moment.hour
+
+
+def window_name(bucket):
+    return f"{WEEKDAYS[bucket // 24]} {bucket % 24:02d}:00"
+
+
+class DropHistory:
+    """Append-only log of new listings and restocks, used to learn when drops happen"""
+
+    def __init__(self, path):
+        self.path = path
+        self.times = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, store=None):
+        """Read the log; with no log yet, seed it from the stored products' first-seen times"""
+        history = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        history.times.append(datetime.fromisoformat(json.loads(line)['at']))
+                    except (ValueError, KeyError):
+                        continue
+        elif store is not None:
+            for record in store.products.values():
+                try:
+                    history.times.append(datetime.fromisoformat(record['first_seen']))
+                except (TypeError, ValueError, KeyError):
+                    continue
+        return history
+
+    def record(self, events, site):
+        """Append the run's drops (new listings and restocks) and return how many there were"""
+        drops = [event for event in events if event['type'] in DROP_EVENTS]
+        if not drops:
+            return 0
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if ends_mid_line(self.path):
+                    f.write('\n')
+                for event in drops:
+                    f.write(json.dumps({'at': event['at'], 'type': event['type'], 'site': site, 'id': event['id']},
+                                       ensure_ascii=False, separators=(',', ':')) + '\n')
+            for event in drops:
+                try:
+                    self.times.append(datetime.fromisoformat(event['at']))
+                except (TypeError, ValueError):
+                    self.times.append(datetime.now())
+        return len(drops)
+
+
+class AdaptivePoller:
+    """Chooses the next poll interval from when drops have happened before
+
+    Each hour of the week gets a drop rate from the history (recent weeks count
+    more). Poll intervals follow the square-root rule, interval ∝ 1/√rate, which
+    minimises the average time to detect a drop for a given number of polls.
+    The scale is chosen so a week of polling fits the request budget. Right after a
+    drop the monitor polls at the minimum interval and then backs off
+    geometrically to the window's normal interval.
+    """
+
+    def __init__(self, history, min_interval=60, max_interval=3600, daily_budget=1000, requests_per_poll=1,
+                 half_life_days=28, burst_window=1800, reserve=0.2, prior=0.01):
+        self.history = history
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.daily_budget = daily_budget
+        self.requests_per_poll = max(1, requests_per_poll)
+        self.half_life_days = half_life_days
+        self.burst_window = burst_window
+        self.reserve = reserve
+        self.prior = prior
+        self.last_drop = None
+        self.quiet_polls = 0
+        self.recent_polls = deque()
+        self.intervals = None
+        self.rates = None
+        self.planned_for = None
+
+    def bucket_rates(self, now):
+        """Decay-weighted drops per hour for each hour of the week, with a small prior so no window is ignored"""
+        counts = [self.prior] * HOURS_PER_WEEK
+        for moment in self.history.times:
+            age_days = max(0.0, (now - moment).total_seconds() / 86400)
+            counts[hour_of_week(moment)] += 0.5 ** (age_days / self.half_life_days)
+        return counts
+
+    def plan(self, now=None):
+        """Poll interval for every hour of the week, sized to the request budget"""
+        now = now or datetime.now()
+        rates = self.bucket_rates(now)
+        polls_per_week = self.daily_budget * 7 * (1 - self.reserve) / self.requests_per_poll
+
+        def intervals_for(scale):
+            return [min(self.max_interval, max(self.min_interval, scale / math.sqrt(rate))) for rate in rates]
+
+        def polls(intervals):
+            return sum(3600 / interval for interval in intervals)
+
+        # Bisect the scale: a larger scale means longer intervals and fewer polls
+        low, high = 1e-3, 1e9
+        for _ in range(100):
+            middle = math.sqrt(low * high)
+            if polls(intervals_for(middle)) > polls_per_week:
+                low = middle
+            else:
+                high = middle
+        self.rates = rates
+        self.intervals = intervals_for(high)
+        self.planned_for = (now, len(self.history.times))
+        return self.intervals
+
+    def _ensure_plan(self, now):
+        if (self.intervals is None or len(self.history.times) != self.planned_for[1]
+                or now - self.planned_for[0] > timedelta(hours=1)):
+            self.plan(now)
+
+    def observe_poll(self, now=None, drops=0):
+        """Record a finished poll and whether it found any drops"""
+        now = now or datetime.now()
+        self.recent_polls.append(now)
+        while self.recent_polls and now - self.recent_polls[0] > timedelta(days=1):
+            self.recent_polls.popleft()
+        if drops:
+            self.last_drop = now
+            self.quiet_polls = 0
+        else:
+            self.quiet_polls += 1
+
+    def next_interval(self, now=None):
+        """Seconds to wait before the next poll"""
+        now = now or datetime.now()
+        self._ensure_plan(now)
+        interval = self.intervals[hour_of_week(now)]
+
+        if self.last_drop and (now - self.last_drop).total_seconds() < self.burst_window:
+            # Restocks come in waves: start fast after a drop and back off while nothing else turns up
+            interval = min(interval, self.min_interval * 2 ** self.quiet_polls)
+
+        if len(self.recent_polls) * self.requests_per_poll >= self.daily_budget:
+            interval = self.max_interval
+        return interval
+
+    def expected_latency(self, now=None):
+        """Average seconds from a drop to its detection under the current plan (half a poll interval)"""
+        now = now or datetime.now()
+        self._ensure_plan(now)
+        total = sum(self.rates)
+        return sum(rate * interval / 2 for rate, interval in zip(self.rates, self.intervals)) / total
+
+    def report(self, now=None):
+        now = now or datetime.now()
+        interval = self.next_interval(now)
+        hot = sorted(range(HOURS_PER_WEEK), key=lambda bucket: self.rates[bucket], reverse=True)[:3]
+        polls_per_day = sum(3600 / interval for interval in self.intervals) / 7
+        return {
+            'next_interval_seconds': round(interval, 1),
+            'window': window_name(hour_of_week(now)),
+            'window_latency_seconds': round(interval / 2, 1),
+            'expected_latency_seconds': round(self.expected_latency(now), 1),
+            'polls_per_day': round(polls_per_day, 1),
+            'requests_per_day': round(polls_per_day * self.requests_per_poll, 1),
+            'requests_last_24h': len(self.recent_polls) * self.requests_per_poll,
+            'hot_windows': [window_name(bucket) for bucket in hot]
+        }
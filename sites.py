@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Site adapters: everything the monitor needs to know about one store
+An adapter supplies the store's URLs, the markup patterns used to find
+product cards and how prices are written. Watching another region or
+retailer means adding an adapter here, not running another copy of the
+monitor or another browser.
+"""
+
+import os
+import re
+import urllib.parse
+
+from product_extractor import COSTCO_MARKUP, Markup
+from watchlist import DEFAULT_WATCHLIST
+
+DEFAULT_SITE = 'costco-au'
+
+
+def _with_page(url, page):
+    """Add the results page parameter to a URL (page 0 is the plain URL)"""
+    if not page:
+        return url
+    separator = '&' if '?' in url else '?'
+    return f"{url}{separator}page={page}"
+
+
+class SiteAdapter:
+    """One store: its URLs, card markup and price format"""
+    name = None
+    label = None
+    base_url = None
+    markup = COSTCO_MARKUP
+    grid_selector = '[data-testid*="product"], .product, [class*="product"], a[href*="/p/"]'
+    no_results_selector = '.no-results'
+    min_interval = None  # seconds between requests to this store, None to use HOST_MIN_INTERVAL
+
+    def search_url(self, query, page=0):
+        raise NotImplementedError
+
+    def category_url(self, path, page=0):
+        url = path if path.startswith('http') else self.base_url + path
+        return _with_page(url, page)
+
+    def api_request(self, query, page=0):
+        """(url, params) for a JSON search endpoint, or None if the store has none"""
+        return None
+
+    def parse_api_products(self, data, found_at, watchlist=DEFAULT_WATCHLIST):
+        """Convert a JSON search response into product dicts"""
+        return []
+
+    def state_file(self, path):
+        """Per-site variant of a state file name; the default site keeps the plain name"""
+        if self.name == DEFAULT_SITE:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.name}{ext}"
+
+    def is_product_url(self, url):
+        return bool(url) and self.markup.product_link.search(url) is not None
+
+
+class CostcoSite(SiteAdapter):
+    """Costco's SAP Commerce storefronts, which share page markup and a JSON search API"""
+    STOCK_LABELS = {
+        'inStock': 'In Stock',
+        'lowStock': 'Low Stock',
+        'outOfStock': 'Out of Stock'
+    }
+
+    def __init__(self, name, label, base_url, api_site, lang, currency, markup=COSTCO_MARKUP):
+        self.name = name
+        self.label = label
+        self.base_url = base_url
+        self.api_url = f"{base_url}/rest/v2/{api_site}/products/search"
+        self.lang = lang
+        self.currency = currency
+        self.markup = markup
+
+    def search_url(self, query, page=0):
+        return _with_page(f"{self.base_url}/search?text={urllib.parse.quote_plus(query)}", page)
+
+    def api_request(self, query, page=0):
+        return self.api_url, {
+            'query': query,
+            'fields': 'FULL',
+            'currentPage': page,
+            'pageSize': 100,
+            'lang': self.lang,
+            'curr': self.currency
+        }
+
+    def parse_api_products(self, data, found_at, watchlist=DEFAULT_WATCHLIST):
+        products = []
+        for item in data.get('products', []):
+            title = re.sub(r'<[^>]+>', '', item.get('name') or '').strip()
+            if not title or not watchlist.is_relevant(title):
+                continue
+
+            url = item.get('url') or ''
+            if url and not url.startswith('http'):
+                url = self.base_url + url
+
+            price = (item.get('price') or {}).get('formattedValue') or "Price not found"
+            stock_status = (item.get('stock') or {}).get('stockLevelStatus')
+            availability = self.STOCK_LABELS.get(stock_status, stock_status or "Unknown")
+
+            products.append({
+                'title': title,
+                'url': url,
+                'price': price,
+                'availability': availability,
+                'found_at': found_at
+            })
+        return products
+
+
+POUND_PRICE_RE = re.compile(r'£\s?[\d,]+(?:\.\d{2})?|GBP\s?[\d,]+(?:\.\d{2})?', re.IGNORECASE)
+NZ_PRICE_RE = re.compile(r'\$\s?[\d,]+(?:\.\d{2})?|NZD\s?[\d,]+(?:\.\d{2})?', re.IGNORECASE)
+
+SITES = {
+    'costco-au': lambda: CostcoSite('costco-au', 'Costco AU', 'https://www.costco.com.au', 'australia', 'en_AU', 'AUD'),
+    'costco-nz': lambda: CostcoSite('costco-nz', 'Costco NZ', 'https://www.costco.co.nz', 'newzealand', 'en_NZ', 'NZD',
+                                    markup=Markup(price_text=NZ_PRICE_RE)),
+    'costco-uk': lambda: CostcoSite('costco-uk', 'Costco UK', 'https://www.costco.co.uk', 'uk', 'en_GB', 'GBP',
+                                    markup=Markup(price_text=POUND_PRICE_RE)),
+}
+
+
+def register_site(name, factory):
+    """Make a new adapter available to SITES / --sites"""
+    SITES[name] = factory
+
+
+def get_site(name):
+    try:
+        return SITES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown site '{name}', expected one of: {', '.join(sorted(SITES))}")
+
+
+def load_sites(names):
+    """Adapters for a comma-separated list of site names"""
+    return [get_site(name.strip()) for name in names.split(',') if name.strip()]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the adaptive polling schedule learned from drop history
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+sys.path.append('.')
+
+from github_pokemon_monitor import run_check
+from product_store import ProductStore
+from replay import Recording, replay_monitor
+from scheduler import AdaptivePoller, DropHistory, hour_of_week
+
+# A Thursday morning, when the made-up store below restocks every week
+THURSDAY_9AM = datetime(2026, 10, 15, 9, 30)
+
+def weekly_drops(weeks=8):
+    history = DropHistory(os.path.join(tempfile.gettempdir(), 'unused.jsonl'))
+    for week in range(1, weeks + 1):
+        history.times.append(THURSDAY_9AM - timedelta(weeks=week))
+    return history
+
+def test_hot_window_polls_faster_and_fits_the_budget():
+    poller = AdaptivePoller(weekly_drops(), min_interval=60, max_interval=3600, daily_budget=500, requests_per_poll=2)
+    intervals = poller.plan(THURSDAY_9AM)
+    hot = intervals[hour_of_week(THURSDAY_9AM)]
+    quiet = intervals[hour_of_week(THURSDAY_9AM + timedelta(hours=12))]
+    assert hot < quiet, (hot, quiet)
+    assert hot == 60
+    requests_per_week = sum(3600 / interval for interval in intervals) * 2
+    assert requests_per_week <= 500 * 7
+    assert poller.report(THURSDAY_9AM)['hot_windows'][0] == 'Thu 09:00'
+
+def test_latency_is_lower_than_polling_evenly_on_the_same_budget():
+    poller = AdaptivePoller(weekly_drops(), min_interval=60, max_interval=86400, daily_budget=240, reserve=0)
+    latency = poller.expected_latency(THURSDAY_9AM)
+    even_latency = 86400 / 240 / 2
+    assert latency < even_latency, (latency, even_latency)
+
+def test_polls_fast_after_a_drop_then_backs_off():
+    poller = AdaptivePoller(DropHistory('unused.jsonl'), min_interval=60, max_interval=3600, daily_budget=100)
+    quiet = poller.next_interval(THURSDAY_9AM)
+    poller.observe_poll(THURSDAY_9AM, drops=1)
+    assert poller.next_interval(THURSDAY_9AM) == 60
+    later = THURSDAY_9AM
+    for expected in (120, 240, 480):
+        later += timedelta(minutes=2)
+        poller.observe_poll(later, drops=0)
+        assert poller.next_interval(later) == min(expected, quiet)
+    assert poller.next_interval(THURSDAY_9AM + timedelta(hours=1)) == quiet
+
+def test_spent_budget_falls_back_to_the_longest_interval():
+    poller = AdaptivePoller(weekly_drops(), min_interval=60, max_interval=3600, daily_budget=10, requests_per_poll=5)
+    poller.observe_poll(THURSDAY_9AM, drops=1)
+    poller.observe_poll(THURSDAY_9AM + timedelta(minutes=1), drops=1)
+    assert poller.next_interval(THURSDAY_9AM + timedelta(minutes=2)) == 3600
+
+def test_checks_record_drops_for_the_next_schedule():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Recording.load('fixtures/recordings/costco_search_selenium.json')
+        monitor = replay_monitor(recording, state_dir=tmp)
+        record = run_check(monitor, [])
+        assert record['counters']['drops'] == 11
+        with open(os.path.join(tmp, 'drop_history.jsonl'), 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 11 and lines[0]['type'] == 'new_listing' and lines[0]['site'] == 'costco-au'
+
+        # A later process learns from the file
+        assert len(DropHistory.load(os.path.join(tmp, 'drop_history.jsonl')).times) == 11
+
+def test_empty_history_is_seeded_from_first_seen_times():
+    store = ProductStore()
+    store.add({'title': 'Pokemon Tin', 'url': 'https://www.costco.com.au/Pokemon-Tin/p/1', 'price': '$10.00',
+               'availability': 'In stock', 'found_at': ''})
+    history = DropHistory.load(os.path.join(tempfile.gettempdir(), 'missing-drop-history.jsonl'), store=store)
+    assert len(history.times) == 1
+
+if __name__ == "__main__":
+    test_hot_window_polls_faster_and_fits_the_budget()
+    test_latency_is_lower_than_polling_evenly_on_the_same_budget()
+    test_polls_fast_after_a_drop_then_backs_off()
+    test_spent_budget_falls_back_to_the_longest_interval()
+    test_checks_record_drops_for_the_next_schedule()
+    test_empty_history_is_seeded_from_first_seen_times()
+    print("✅ All adaptive polling tests passed!")
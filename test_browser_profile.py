@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the lean Chrome profile's switches and request blocking
+"""
+
+import os
+import sys
+sys.path.append('.')
+
+from browser_profile import BrowserProfile, blocked_url_patterns
+
+class CdpDriver:
+    """Records DevTools commands instead of talking to Chrome"""
+    def __init__(self, fail=False):
+        self.commands = []
+        self.fail = fail
+
+    def execute_cdp_cmd(self, cmd, params):
+        if self.fail:
+            raise RuntimeError("no DevTools")
+        self.commands.append((cmd, params))
+        return {}
+
+def test_lean_profile_uses_real_switches_and_caps():
+    options = BrowserProfile(js_heap_mb=192, renderer_limit=1).chrome_options()
+    assert '--disable-images' not in options.arguments
+    assert '--renderer-process-limit=1' in options.arguments
+    assert '--js-flags=--max-old-space-size=192' in options.arguments
+    assert '--disable-background-networking' in options.arguments
+    assert options.experimental_options['prefs']['profile.managed_default_content_settings.images'] == 2
+
+def test_full_profile_keeps_the_plain_switches_only():
+    options = BrowserProfile(lean=False).chrome_options()
+    assert '--headless' in options.arguments
+    assert not any(argument.startswith('--renderer-process-limit') for argument in options.arguments)
+    assert 'prefs' not in options.experimental_options
+
+def test_blocks_resource_types_and_trackers_but_not_the_store():
+    patterns = blocked_url_patterns(['image', 'font'], ['google-analytics.com'])
+    assert '*.png' in patterns and '*.png?*' in patterns and '*.woff2' in patterns
+    assert '*://*.google-analytics.com/*' in patterns
+    assert not any('costco' in pattern or pattern.endswith('.js') for pattern in patterns)
+
+    driver = CdpDriver()
+    assert BrowserProfile(block_types=['stylesheet'], block_domains=[]).apply(driver)
+    assert driver.commands == [('Network.enable', {}), ('Network.setBlockedURLs', {'urls': ['*.css', '*.css?*']})]
+
+def test_blocking_is_skipped_when_devtools_is_unavailable():
+    assert not BrowserProfile().apply(CdpDriver(fail=True))
+    assert not BrowserProfile(lean=False).apply(CdpDriver())
+
+def test_env_configures_the_profile():
+    os.environ['BLOCK_RESOURCES'] = 'image,media'
+    os.environ['BLOCK_DOMAINS'] = 'tracker.example'
+    try:
+        profile = BrowserProfile.from_env()
+        assert profile.block_types == ['image', 'media']
+        assert 'tracker.example' in profile.block_domains
+    finally:
+        del os.environ['BLOCK_RESOURCES']
+        del os.environ['BLOCK_DOMAINS']
+    try:
+        BrowserProfile(block_types=['scripts'])
+        assert False, "unknown resource type should raise"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_lean_profile_uses_real_switches_and_caps()
+    test_full_profile_keeps_the_plain_switches_only()
+    test_blocks_resource_types_and_trackers_but_not_the_store()
+    test_blocking_is_skipped_when_devtools_is_unavailable()
+    test_env_configures_the_profile()
+    print("✅ All browser profile tests passed!")
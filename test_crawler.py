@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script to verify concurrent multi-query crawling
+"""
+
+import sys
+import time
+sys.path.append('.')
+
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor
+from crawler import HostRateLimiter, crawl, merge_products, plan_targets
+
+def make_monitor():
+    monitor = GitHubCostcoPokemonMonitor()
+    monitor.fetch_mode = 'http'
+    return monitor
+
+def test_plan_covers_queries_categories_and_pages():
+    monitor = make_monitor()
+    targets = plan_targets(monitor, ['pokemon', 'pokemon tcg'], ['/c/trading-cards'], 2)
+    assert [t['url'] for t in targets] == [
+        'https://www.costco.com.au/search?text=pokemon',
+        'https://www.costco.com.au/search?text=pokemon&page=1',
+        'https://www.costco.com.au/search?text=pokemon+tcg',
+        'https://www.costco.com.au/search?text=pokemon+tcg&page=1',
+        'https://www.costco.com.au/c/trading-cards',
+        'https://www.costco.com.au/c/trading-cards?page=1',
+    ]
+    assert targets[0] == monitor.default_target()
+
+def test_merge_keeps_one_entry_per_url():
+    merged = merge_products([
+        [{'title': 'Pokemon A', 'url': 'u1', 'price': 'Price not found', 'availability': 'Unknown'}],
+        [{'title': 'Pokemon A', 'url': 'u1', 'price': '$10', 'availability': 'In Stock'},
+         {'title': 'Pokemon B', 'url': 'u2', 'price': '$20', 'availability': 'Unknown'}],
+    ])
+    assert merged == [
+        {'title': 'Pokemon A', 'url': 'u1', 'price': '$10', 'availability': 'In Stock'},
+        {'title': 'Pokemon B', 'url': 'u2', 'price': '$20', 'availability': 'Unknown'},
+    ]
+
+def test_wall_time_tracks_slowest_page():
+    monitor = make_monitor()
+    targets = plan_targets(monitor, ['pokemon', 'pokemon tcg', 'trading cards'], [], 2)
+
+    def slow_fetch(target):
+        time.sleep(0.2)
+        product = {'title': f"Pokemon {target['query']}", 'url': f"{target['query']}-{target['page']}",
+                   'price': '$1', 'availability': 'Unknown'}
+        return [product], {'url': target['url'], 'path': 'http', 'seconds': 0.2, 'products': 1, 'attempts': []}
+
+    monitor.fetch_target = slow_fetch
+    start = time.perf_counter()
+    products = crawl(monitor, targets, workers=6)
+    elapsed = time.perf_counter() - start
+    assert len(products) == 6
+    assert elapsed < 0.6, f"crawl took {elapsed:.2f}s for 6 pages of 0.2s"
+    assert monitor.last_fetch['path'] == 'crawl'
+    assert len(monitor.last_fetch['pages']) == 6
+
+def test_pages_stop_at_the_reported_count_and_after_an_empty_first_page():
+    monitor = make_monitor()
+    targets = plan_targets(monitor, ['pokemon', 'pokemon tcg', 'charizard'], ['/c/trading-cards'], 3)
+    fetched = []
+
+    def fetch(target):
+        fetched.append((target['source'], target['page']))
+        if target['query'] == 'pokemon' and target['page'] == 0:
+            monitor.page_counts['pokemon'] = 1
+        empty = target['query'] == 'charizard'
+        products = [] if empty else [{'title': f"Pokemon {target['source']}", 'url': f"{target['url']}/p/1",
+                                      'price': '$1', 'availability': 'Unknown'}]
+        return products, {'url': target['url'], 'path': 'http', 'seconds': 0.0, 'products': len(products),
+                          'attempts': []}
+
+    monitor.fetch_target = fetch
+    crawl(monitor, targets, workers=4)
+    # The API said one page; charizard has no results; nothing is known about the others
+    assert sorted(fetched) == [('/c/trading-cards', 0), ('/c/trading-cards', 1), ('/c/trading-cards', 2),
+                               ('charizard', 0), ('pokemon', 0),
+                               ('pokemon tcg', 0), ('pokemon tcg', 1), ('pokemon tcg', 2)]
+    assert len(monitor.last_fetch['pages']) == 8
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(0.05)
+    start = time.perf_counter()
+    for _ in range(3):
+        limiter.wait('https://www.costco.com.au/a')
+    limiter.wait('https://other.example/a')
+    assert 0.09 <= time.perf_counter() - start < 0.3
+
+if __name__ == "__main__":
+    test_plan_covers_queries_categories_and_pages()
+    test_merge_keeps_one_entry_per_url()
+    test_wall_time_tracks_slowest_page()
+    test_pages_stop_at_the_reported_count_and_after_an_empty_first_page()
+    test_rate_limiter_spaces_requests_per_host()
+    print("✅ Crawler tests passed")
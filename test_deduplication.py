@@ -6,23 +6,12 @@ Test script to verify the deduplication system works correctly
 import os
 import json
 import sys
+import tempfile
 sys.path.append('.')
 
 from github_pokemon_monitor import GitHubCostcoPokemonMonitor
 
 def test_deduplication():
-    print("🧪 Testing Product Deduplication System")
-    print("=" * 50)
-    
-    # Clean slate for testing
-    if os.path.exists('known_products.json'):
-        os.remove('known_products.json')
-        print("🗑️  Removed existing known_products.json for clean test")
-    
-    # Create monitor instance
-    monitor = GitHubCostcoPokemonMonitor()
-    
-    # Simulate some products
     test_products = [
         {
             'title': 'Pokemon Charizard ex Super-Premium Collection',
@@ -32,63 +21,46 @@ def test_deduplication():
         },
         {
             'title': 'Pokemon Pikachu Trading Card Set',
-            'price': '$59.99', 
+            'price': '$59.99',
             'availability': 'In Stock',
             'url': 'https://www.costco.com.au/test2'
         }
     ]
-    
-    print(f"📦 Testing with {len(test_products)} sample products")
-    
-    # First run - should detect all as new
-    print("\n🔍 First run (should find all products as new):")
-    new_products_1 = monitor.check_for_new_products(test_products)
-    print(f"   Found {len(new_products_1)} new products")
-    for product in new_products_1:
-        print(f"   ✅ NEW: {product['title']}")
-    
-    # Save the products
-    monitor.save_known_products_to_github()
-    print(f"💾 Saved {len(monitor.known_products)} products to file")
-    
-    # Second run - should detect none as new (same products)
-    print("\n🔍 Second run (should find no new products):")
-    monitor_2 = GitHubCostcoPokemonMonitor()  # Fresh instance to test loading
-    new_products_2 = monitor_2.check_for_new_products(test_products)
-    print(f"   Found {len(new_products_2)} new products")
-    if new_products_2:
-        print("   ❌ ERROR: Should have found 0 new products!")
-        for product in new_products_2:
-            print(f"   ❌ DUPLICATE: {product['title']}")
-    else:
-        print("   ✅ SUCCESS: No duplicates detected!")
-    
-    # Third run - add one new product
-    print("\n🔍 Third run (adding one new product):")
-    test_products.append({
-        'title': 'Pokemon Mew ex Collection Box',
-        'price': '$79.99',
-        'availability': 'In Stock', 
-        'url': 'https://www.costco.com.au/test3'
-    })
-    
-    new_products_3 = monitor_2.check_for_new_products(test_products)
-    print(f"   Found {len(new_products_3)} new products")
-    if len(new_products_3) == 1:
-        print(f"   ✅ SUCCESS: Found only the new product: {new_products_3[0]['title']}")
-    else:
-        print(f"   ❌ ERROR: Expected 1 new product, found {len(new_products_3)}")
-    
-    # Check the saved file
-    print("\n📄 Checking saved file contents:")
-    if os.path.exists('known_products.json'):
-        with open('known_products.json', 'r') as f:
-            data = json.load(f)
-            print(f"   File contains {len(data['products'])} products")
-            print(f"   Last updated: {data['last_updated']}")
-    
-    print("\n✅ Deduplication test complete!")
-    print("💡 If you saw 'SUCCESS' messages above, the system is working correctly")
-    
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'known_products.jsonl')
+        os.environ['STATE_FILE'] = state_path
+        try:
+            # First run - every product is new
+            monitor = GitHubCostcoPokemonMonitor()
+            assert monitor.state_path == state_path and len(monitor.known_products) == 0
+            new_products_1 = monitor.check_for_new_products(test_products)
+            assert [p['title'] for p in new_products_1] == [p['title'] for p in test_products]
+            assert monitor.save_known_products_to_github()
+
+            # Second run - a fresh instance loads the saved products and finds nothing new
+            monitor_2 = GitHubCostcoPokemonMonitor()
+            assert len(monitor_2.known_products) == 2
+            assert monitor_2.check_for_new_products(test_products) == []
+
+            # Third run - only the added product is new
+            test_products.append({
+                'title': 'Pokemon Mew ex Collection Box',
+                'price': '$79.99',
+                'availability': 'In Stock',
+                'url': 'https://www.costco.com.au/test3'
+            })
+            new_products_3 = monitor_2.check_for_new_products(test_products)
+            assert [p['title'] for p in new_products_3] == ['Pokemon Mew ex Collection Box']
+            assert monitor_2.save_known_products_to_github()
+
+            with open(state_path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            assert len({record['id'] for record in records}) == 3
+            assert all(record['first_seen'] for record in records)
+        finally:
+            os.environ.pop('STATE_FILE', None)
+
 if __name__ == "__main__":
     test_deduplication()
+    print("✅ Deduplication test passed!")
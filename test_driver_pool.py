@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script to verify warm drivers are reused and recycled correctly
+"""
+
+import sys
+import threading
+import time
+sys.path.append('.')
+
+import driver_pool
+from driver_pool import DriverPool
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.crashed = False
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise RuntimeError("browser crashed")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory():
+        driver = FakeDriver()
+        created.append(driver)
+        return driver
+
+    return DriverPool(factory, **kwargs), created
+
+def test_driver_is_reused_between_polls():
+    pool, created = make_pool(size=1)
+    with pool.driver() as first:
+        pass
+    with pool.driver() as second:
+        pass
+    assert first is second
+    assert len(created) == 1
+
+def test_crashed_driver_is_replaced():
+    pool, created = make_pool(size=1)
+    pool.warm()
+    created[0].crashed = True
+    with pool.driver() as driver:
+        assert driver is created[1]
+    assert created[0].quit_called
+
+def test_driver_recycled_after_error_and_max_uses():
+    pool, created = make_pool(size=1, max_uses=2)
+    try:
+        with pool.driver():
+            raise ValueError("page blew up")
+    except ValueError:
+        pass
+    assert created[0].quit_called
+
+    with pool.driver():
+        pass
+    with pool.driver():
+        pass
+    assert created[1].quit_called
+    assert len(pool.uses) == 0
+
+def test_driver_recycled_over_memory_ceiling():
+    pool, created = make_pool(size=1, max_memory_mb=100)
+    original = driver_pool.driver_rss_mb
+    driver_pool.driver_rss_mb = lambda driver: 512.0
+    try:
+        with pool.driver():
+            pass
+    finally:
+        driver_pool.driver_rss_mb = original
+    assert created[0].quit_called
+
+def test_close_quits_borrowed_drivers():
+    pool, created = make_pool(size=2)
+    pool.warm()
+    with pool.driver():
+        pool.close()
+    assert all(driver.quit_called for driver in created)
+
+def test_waiting_borrower_gets_a_new_driver_when_one_is_retired():
+    pool, created = make_pool(size=1)
+    borrowed = threading.Event()
+    got = []
+
+    def waiter():
+        borrowed.wait()
+        began = time.perf_counter()
+        with pool.driver(timeout=5) as driver:
+            got.append((driver, time.perf_counter() - began))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    try:
+        with pool.driver():
+            borrowed.set()
+            time.sleep(0.1)
+            raise ValueError("page blew up")
+    except ValueError:
+        pass
+    thread.join()
+    driver, waited = got[0]
+    assert driver is created[1] and created[0].quit_called
+    assert waited < 1, waited
+
+def test_borrower_times_out_when_the_pool_stays_full():
+    pool, created = make_pool(size=1)
+    with pool.driver():
+        try:
+            with pool.driver(timeout=0.05):
+                pass
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("borrowed from a full pool")
+
+if __name__ == "__main__":
+    test_driver_is_reused_between_polls()
+    test_crashed_driver_is_replaced()
+    test_driver_recycled_after_error_and_max_uses()
+    test_driver_recycled_over_memory_ceiling()
+    test_close_quits_borrowed_drivers()
+    test_waiting_borrower_gets_a_new_driver_when_one_is_retired()
+    test_borrower_times_out_when_the_pool_stays_full()
+    print("✅ Driver pool tests passed")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script to verify detail page enrichment only reads new or changed products
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+sys.path.append('.')
+
+from enrichment import DetailCache, DetailEnricher, parse_detail_page
+from github_pokemon_monitor import run_check
+from product_store import ProductStore
+from test_outbox import make_monitor
+
+JSON_LD_PAGE = """<html><head>
+<script type="application/ld+json">{"@context": "https://schema.org", "@graph": [
+  {"@type": "BreadcrumbList"},
+  {"@type": "Product", "name": "Pokemon Charizard ex Super Premium Collection", "sku": "1712345",
+   "offers": {"@type": "Offer", "price": "119.99", "priceCurrency": "AUD",
+              "availability": "https://schema.org/InStock"}}]}
+</script></head><body>Item 1712345</body></html>"""
+
+MICRODATA_PAGE = """<div itemscope itemtype="https://schema.org/Product">
+<meta itemprop="price" content="1299.00"><meta itemprop="priceCurrency" content="GBP">
+<link itemprop="availability" href="https://schema.org/OutOfStock">
+<p>Item # 204455</p></div>"""
+
+def product(code, price='Price not found', availability='Unknown'):
+    return {'title': f'Pokemon Box {code}', 'url': f'https://www.costco.com.au/Pokemon-Box-{code}/p/{code}',
+            'price': price, 'availability': availability, 'found_at': ''}
+
+def detail_page(code):
+    return JSON_LD_PAGE.replace('1712345', str(code))
+
+class FakeStore:
+    """Counts detail page reads and the most that were in flight at once"""
+    def __init__(self, delay=0.0, fail=()):
+        self.urls = []
+        self.delay = delay
+        self.fail = fail
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, url):
+        with self.lock:
+            self.urls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            code = url.rsplit('/', 1)[-1]
+            if code in self.fail:
+                raise IOError("HTTP 503")
+            return detail_page(code)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def test_structured_data_gives_price_stock_and_item_number():
+    assert parse_detail_page(JSON_LD_PAGE) == {'price': '$119.99', 'availability': 'In Stock', 'item_number': '1712345'}
+    assert parse_detail_page(MICRODATA_PAGE) == {'price': '£1,299.00', 'availability': 'Out of Stock',
+                                                 'item_number': '204455'}
+    assert parse_detail_page('<html>Loading...</html>') == {'price': None, 'availability': None, 'item_number': None}
+
+def test_only_new_or_changed_products_are_fetched():
+    store = ProductStore()
+    unchanged, repriced = product(1, '$10.00'), product(2, '$20.00')
+    store.diff([dict(unchanged), dict(repriced)])
+    site = FakeStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        enricher = DetailEnricher(site.fetch, DetailCache.load(os.path.join(tmp, 'detail_cache.json')))
+        products = [dict(unchanged), product(2, '$25.00'), product(3)]
+        stats = enricher.enrich(products, store)
+        assert stats == {'cached': 0, 'fetched': 2, 'failed': 0}
+        assert sorted(url.rsplit('/', 1)[-1] for url in site.urls) == ['2', '3']
+        assert products[2]['availability'] == 'In Stock' and products[2]['price'] == '$119.99'
+        assert products[2]['item_number'] == '3'
+        assert products[0]['availability'] == 'Unknown'
+
+        # The same grid next run is answered from the cache, here after a restart
+        enricher = DetailEnricher(site.fetch, DetailCache.load(os.path.join(tmp, 'detail_cache.json')))
+        products = [dict(unchanged), product(2, '$25.00'), product(3)]
+        assert enricher.enrich(products, store) == {'cached': 2, 'fetched': 0, 'failed': 0}
+        assert len(site.urls) == 2 and products[2]['availability'] == 'In Stock'
+
+def test_fetches_run_in_parallel_up_to_the_worker_cap():
+    site = FakeStore(delay=0.05, fail=('4',))
+    enricher = DetailEnricher(site.fetch, DetailCache(None), workers=3)
+    products = [product(code) for code in range(12)]
+    began = time.perf_counter()
+    stats = enricher.enrich(products, ProductStore())
+    assert time.perf_counter() - began < 12 * 0.05
+    assert site.peak == 3
+    assert stats == {'cached': 0, 'fetched': 11, 'failed': 1}
+    assert products[4]['availability'] == 'Unknown' and len(enricher.cache) == 11
+
+def test_cache_is_bounded_and_entries_expire_after_their_read():
+    cache = DetailCache(None, max_entries=2, ttl_hours=24, sold_out_ttl_hours=1)
+    now = datetime(2026, 10, 17, 12, 0)
+    for key in ('a', 'b'):
+        cache.put(key, 'grid', {'price': '$1.00', 'availability': 'In Stock'}, now=now)
+    assert cache.get('a')['grid'] == 'grid'
+    cache.put('c', 'grid', {'price': '$3.00', 'availability': 'Out of Stock'}, now=now)
+    assert list(cache.entries) == ['a', 'c']
+
+    # Using an entry does not keep it fresh; sold-out results go stale first
+    assert cache.is_fresh(cache.get('c'), now=now + timedelta(minutes=50))
+    assert not cache.is_fresh(cache.get('c'), now=now + timedelta(minutes=90))
+    assert cache.is_fresh(cache.get('a'), now=now + timedelta(hours=23))
+    assert not cache.is_fresh(cache.get('a'), now=now + timedelta(hours=25))
+
+def test_sold_out_product_is_read_again_and_restock_is_seen():
+    store = ProductStore()
+    urls = []
+    page = [MICRODATA_PAGE.replace('204455', '7')]
+
+    def fetch(url):
+        urls.append(url)
+        return page[0]
+
+    enricher = DetailEnricher(fetch, DetailCache(None, sold_out_ttl_hours=1))
+    products = [product(7, '$1,299.00')]
+    enricher.enrich(products, store)
+    assert products[0]['availability'] == 'Out of Stock'
+    store.diff(products)
+
+    # The grid never shows stock, so only the detail page can report the restock
+    page[0] = page[0].replace('OutOfStock', 'InStock')
+    for run in range(3):
+        products = [product(7, '$1,299.00')]
+        enricher.enrich(products, store)
+        assert store.diff(products) == []
+    assert len(urls) == 1
+    enricher.cache.entries['7']['fetched_at'] = '2020-01-01T00:00:00'
+    products = [product(7, '$1,299.00')]
+    assert enricher.enrich(products, store)['fetched'] == 1
+    assert [event['type'] for event in store.diff(products)] == ['back_in_stock']
+
+def test_detail_price_different_from_the_grid_is_not_refetched():
+    store = ProductStore()
+    site = FakeStore()
+    enricher = DetailEnricher(site.fetch, DetailCache(None, ttl_hours=1))
+    events = []
+    for run in range(3):
+        products = [product(7, '$109.99')]
+        enricher.enrich(products, store)
+        assert products[0]['price'] == '$119.99'
+        events.extend(event['type'] for event in store.diff(products))
+    assert events == ['new_listing'] and len(site.urls) == 1
+
+def test_failed_read_keeps_the_stored_price_and_retries():
+    store = ProductStore()
+    site = FakeStore()
+    enricher = DetailEnricher(site.fetch, DetailCache(None))
+    products = [product(7, '$109.99')]
+    enricher.enrich(products, store)
+    store.diff(products)
+    assert store.products['7']['price'] == '$119.99'
+
+    # The grid changes and the detail page is refused: no price change from the grid's number
+    site.fail = ('7',)
+    products = [product(7, '$99.99', 'In Stock')]
+    assert enricher.enrich(products, store)['failed'] == 1
+    assert products[0]['price'] == '$119.99' and products[0]['item_number'] == '7'
+    assert store.diff(products) == []
+
+    # It is read again once the page loads
+    site.fail = ()
+    products = [product(7, '$99.99', 'In Stock')]
+    assert enricher.enrich(products, store)['fetched'] == 1
+    assert len(site.urls) == 3
+
+def test_run_alerts_with_the_detail_page_values():
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = make_monitor(tmp, [product(1712345)])
+        site = FakeStore()
+        monitor.enricher = DetailEnricher(site.fetch, DetailCache.load(os.path.join(tmp, 'detail_cache.json')))
+        record = run_check(monitor, [])
+        assert record['counters']['details_fetched'] == 1
+        alert = monitor.alert_products(monitor.last_events)[0]
+        assert (alert['price'], alert['availability'], alert['item_number']) == ('$119.99', 'In Stock', '1712345')
+
+        record = run_check(monitor, [])
+        assert record['counters']['details_cached'] == 1 and record['counters'].get('details_fetched', 0) == 0
+        assert record['counters']['events'] == 0 and len(site.urls) == 1
+
+if __name__ == "__main__":
+    test_structured_data_gives_price_stock_and_item_number()
+    test_only_new_or_changed_products_are_fetched()
+    test_fetches_run_in_parallel_up_to_the_worker_cap()
+    test_cache_is_bounded_and_entries_expire_after_their_read()
+    test_sold_out_product_is_read_again_and_restock_is_seen()
+    test_detail_price_different_from_the_grid_is_not_refetched()
+    test_failed_read_keeps_the_stored_price_and_retries()
+    test_run_alerts_with_the_detail_page_values()
+    print("✅ All enrichment tests passed!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script to verify unchanged result pages skip extraction, dedup and the state write
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from fetch_cache import FetchCache, Unchanged, grid_fingerprint
+from github_pokemon_monitor import run_check
+from replay import Recording, replay_monitor
+
+SELENIUM_RECORDING = 'fixtures/recordings/costco_search_selenium.json'
+API_RECORDING = 'fixtures/recordings/costco_search_api.json'
+
+def card(code, price, stock='In stock', banner=''):
+    return f'<div>{banner}<a href="/Pokemon-Tin/p/{code}">Pokemon Tin</a><span>{price}</span><span>{stock}</span></div>'
+
+def test_fingerprint_tracks_codes_prices_and_stock_only():
+    base = grid_fingerprint(card(1, '$10.00'))
+    assert base == grid_fingerprint(card(1, '$10.00', banner='Sale ends 12:04pm'))
+    assert base != grid_fingerprint(card(1, '$12.00'))
+    assert base != grid_fingerprint(card(1, '$10.00', stock='Out of stock'))
+    assert base != grid_fingerprint(card(2, '$10.00'))
+    assert grid_fingerprint('<html><body>Loading...</body></html>') is None
+
+def test_second_identical_run_is_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Recording.load(SELENIUM_RECORDING)
+        first = run_check(replay_monitor(recording, state_dir=tmp), [])
+        assert first['status'] == 'changed'
+        assert first['counters']['new_products'] == 11
+        state_path = os.path.join(tmp, 'known_products.jsonl')
+        before = os.stat(state_path)
+
+        # A fresh process, as on the next scheduled run
+        monitor = replay_monitor(recording, state_dir=tmp)
+        second = run_check(monitor, [])
+        assert second['status'] == 'unchanged'
+        assert second['fetch']['unchanged'] and second['fetch']['path'] == 'selenium'
+        assert 'parse' not in second['phases'] and 'dedup' not in second['phases'] and 'save_state' not in second['phases']
+        assert os.stat(state_path).st_mtime_ns == before.st_mtime_ns
+        assert len(monitor.known_products) == 11
+
+def test_fingerprint_is_not_kept_when_state_save_fails():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Recording.load(SELENIUM_RECORDING)
+        monitor = replay_monitor(recording, state_dir=tmp)
+        monitor.save_known_products_to_github = lambda: False
+        run_check(monitor, [])
+        assert not os.path.exists(os.path.join(tmp, 'fetch_cache.json'))
+
+        assert run_check(replay_monitor(recording, state_dir=tmp), [])['status'] == 'changed'
+
+def test_etag_not_modified_skips_the_body():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Recording.load(API_RECORDING)
+        recording.entries[0]['headers']['ETag'] = '"results-v1"'
+        assert run_check(replay_monitor(recording, state_dir=tmp), [])['status'] == 'changed'
+
+        monitor = replay_monitor(recording, state_dir=tmp)
+        products = monitor.fetch_products_from_api(monitor.search_query)
+        assert isinstance(products, Unchanged)
+        assert run_check(monitor, [])['status'] == 'unchanged'
+
+def test_entries_expire_for_a_periodic_full_refresh():
+    cache = FetchCache(os.path.join(tempfile.gettempdir(), 'unused.json'), max_age_hours=0)
+    cache.entries['page:x'] = {'fingerprint': 'abc', 'etag': '"e"', 'last_modified': None,
+                               'checked_at': '2025-08-01T00:00:00'}
+    assert not cache.is_unchanged('page:x', 'abc')
+    assert cache.conditional_headers('page:x') == {}
+
+if __name__ == "__main__":
+    test_fingerprint_tracks_codes_prices_and_stock_only()
+    test_second_identical_run_is_unchanged()
+    test_fingerprint_is_not_kept_when_state_save_fails()
+    test_etag_not_modified_skips_the_body()
+    test_entries_expire_for_a_periodic_full_refresh()
+    print("✅ All fetch cache tests passed!")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the HTTP fast path and the Selenium fallback
+"""
+
+import sys
+sys.path.append('.')
+
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor
+
+API_RESPONSE = {
+    'products': [
+        {
+            'name': 'Pokemon <em>Charizard</em> ex Super-Premium Collection',
+            'url': '/Pokemon-Charizard-ex-Super-Premium-Collection/p/171234',
+            'price': {'formattedValue': '$119.99'},
+            'stock': {'stockLevelStatus': 'inStock'}
+        },
+        {
+            'name': 'Garden Hose 30m',
+            'url': '/Garden-Hose/p/100001',
+            'price': {'formattedValue': '$39.99'},
+            'stock': {'stockLevelStatus': 'inStock'}
+        }
+    ]
+}
+
+def make_monitor():
+    monitor = GitHubCostcoPokemonMonitor()
+    monitor.fetch_products_selenium = lambda target: [{
+        'title': 'Pokemon Selenium Result',
+        'url': 'https://www.costco.com.au/Pokemon-Selenium-Result/p/999',
+        'price': '$1.00',
+        'availability': 'Unknown',
+        'found_at': ''
+    }]
+    return monitor
+
+def test_api_products_are_parsed():
+    monitor = make_monitor()
+    products = monitor.parse_api_products(API_RESPONSE)
+    assert len(products) == 1
+    assert products[0]['title'] == 'Pokemon Charizard ex Super-Premium Collection'
+    assert products[0]['url'] == 'https://www.costco.com.au/Pokemon-Charizard-ex-Super-Premium-Collection/p/171234'
+    assert products[0]['price'] == '$119.99'
+    assert products[0]['availability'] == 'In Stock'
+
+def test_http_path_skips_selenium():
+    monitor = make_monitor()
+    monitor.fetch_products_http = lambda target: monitor.parse_api_products(API_RESPONSE)
+    products = monitor.fetch_pokemon_products()
+    assert monitor.last_fetch['path'] == 'http'
+    assert [a['path'] for a in monitor.last_fetch['attempts']] == ['http']
+    assert products[0]['price'] == '$119.99'
+
+def test_unusable_http_result_falls_back_to_selenium():
+    monitor = make_monitor()
+    monitor.fetch_products_http = lambda target: [{
+        'title': 'Pokemon (1)', 'url': '', 'price': 'Price not found',
+        'availability': 'Unknown', 'found_at': ''
+    }]
+    products = monitor.fetch_pokemon_products()
+    assert monitor.last_fetch['path'] == 'selenium'
+    assert [a['path'] for a in monitor.last_fetch['attempts']] == ['http', 'selenium']
+    assert products[0]['title'] == 'Pokemon Selenium Result'
+
+def test_selenium_only_mode():
+    monitor = make_monitor()
+    monitor.fetch_mode = 'selenium'
+    monitor.fetch_products_http = lambda target: (_ for _ in ()).throw(AssertionError("HTTP path should not run"))
+    monitor.fetch_pokemon_products()
+    assert monitor.last_fetch['path'] == 'selenium'
+
+def test_empty_later_page_does_not_start_the_browser():
+    monitor = make_monitor()
+    monitor.fetch_products_http = lambda target: []
+    products, stats = monitor.fetch_target({'url': 'https://www.costco.com.au/search?text=pokemon&page=2',
+                                            'query': 'pokemon', 'page': 2, 'source': 'pokemon'})
+    assert products == [] and [a['path'] for a in stats['attempts']] == ['http']
+    products, stats = monitor.fetch_target(monitor.default_target())
+    assert [a['path'] for a in stats['attempts']] == ['http', 'selenium']
+
+def test_api_page_count_is_recorded():
+    class Response:
+        status_code = 200
+        headers = {}
+
+        def json(self):
+            return dict(API_RESPONSE, pagination={'currentPage': 0, 'totalPages': 2})
+
+    monitor = make_monitor()
+    monitor.session.get = lambda *args, **kwargs: Response()
+    assert len(monitor.fetch_products_from_api('pokemon')) == 1
+    assert monitor.page_counts == {'pokemon': 2}
+
+class FakeDriver:
+    """Driver whose product grid grows for a few polls and then settles"""
+    def __init__(self, counts, no_results=False):
+        self.counts = list(counts)
+        self.no_results = no_results
+        self.page_source = "<html><body></body></html>"
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, *args):
+        count = self.counts.pop(0) if len(self.counts) > 1 else self.counts[0]
+        return [count, 'complete', self.no_results]
+
+def make_fast_monitor():
+    monitor = make_monitor()
+    monitor.ready_settle = 0.05
+    monitor.ready_poll_interval = 0.01
+    monitor.ready_timeout = 2
+    return monitor
+
+def test_grid_ready_once_count_settles():
+    monitor = make_fast_monitor()
+    ready, count = monitor.wait_for_grid_ready(FakeDriver([0, 4, 12, 24]))
+    assert ready and count == 24
+
+def test_grid_ready_on_no_results_page():
+    monitor = make_fast_monitor()
+    ready, count = monitor.wait_for_grid_ready(FakeDriver([0], no_results=True))
+    assert ready and count == 0
+
+def test_empty_grid_times_out_and_records_phases():
+    monitor = make_fast_monitor()
+    monitor.ready_timeout = 0.1
+    products = monitor.scrape_with_driver(FakeDriver([0]))
+    assert products == []
+    assert set(monitor.last_scrape_timings) == {'navigate', 'ready'}
+
+def test_scrape_records_all_phases():
+    monitor = make_fast_monitor()
+    monitor.scrape_with_driver(FakeDriver([3, 3]))
+    assert set(monitor.last_scrape_timings) == {'navigate', 'ready', 'parse'}
+    assert monitor.last_scrape_timings['ready'] < 1
+
+if __name__ == "__main__":
+    test_api_products_are_parsed()
+    test_http_path_skips_selenium()
+    test_unusable_http_result_falls_back_to_selenium()
+    test_selenium_only_mode()
+    test_empty_later_page_does_not_start_the_browser()
+    test_api_page_count_is_recorded()
+    test_grid_ready_once_count_settles()
+    test_grid_ready_on_no_results_page()
+    test_empty_grid_times_out_and_records_phases()
+    test_scrape_records_all_phases()
+    print("✅ Fetch path tests passed")
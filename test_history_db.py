@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the product history database and its queries
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+sys.path.append('.')
+
+from github_pokemon_monitor import run_check
+from history_db import HistoryDB, describe, main, price_cents
+from replay import Recording, replay_monitor
+
+START = datetime(2026, 1, 1, 9, 0)
+
+def observe(db, hour, price, stock, key='171234', site='costco-au'):
+    db.record_run(site, [{'key': key, 'title': 'Pokemon Charizard ex Super-Premium Collection',
+                          'url': f'https://www.costco.com.au/Charizard/p/{key}', 'price': price, 'stock': stock}],
+                  seen_at=START + timedelta(hours=hour))
+
+def test_prices_are_stored_as_cents():
+    assert price_cents('$1,119.99') == (111999, '$')
+    assert price_cents('£24.99') == (2499, '£')
+    assert price_cents('Price not found') == (None, None)
+
+def test_answers_last_in_stock_price_history_and_restocks():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = HistoryDB(os.path.join(tmp, 'history.db'))
+        observe(db, 0, '$119.99', 'in_stock')
+        observe(db, 1, '$119.99', 'in_stock')
+        observe(db, 2, '$119.99', 'out_of_stock')
+        observe(db, 3, 'Price not found', 'unknown')
+        observe(db, 30, '$99.99', 'in_stock')
+        observe(db, 35, '$99.99', 'out_of_stock')
+
+        product = db.find('171234')[0]
+        assert db.find('charizard') == [product]
+        info = describe(db, product)
+        assert info['stock'] == 'out_of_stock'
+        assert info['last_in_stock'] == '2026-01-02T15:00'
+        assert [price for at, price in info['price_history']] == ['$119.99', '$99.99']
+        assert info['restocks'] == [('2026-01-01T09:00', '2026-01-01T11:00'), ('2026-01-02T15:00', '2026-01-02T20:00')]
+        assert info['last_restock_seconds'] == 5 * 3600
+
+        count = db.conn.execute('SELECT count(*) FROM observations').fetchone()[0]
+        changes = db.conn.execute('SELECT count(*) FROM changes').fetchone()[0]
+        assert (count, changes) == (6, 4)
+        db.close()
+
+def test_in_stock_product_follows_unchanged_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = HistoryDB(os.path.join(tmp, 'history.db'))
+        observe(db, 0, '$119.99', 'in_stock')
+        db.touch('costco-au', seen_at=START + timedelta(hours=6))
+        info = describe(db, db.find('171234')[0])
+        assert info['last_seen'] == '2026-01-01T09:00'
+        assert info['last_in_stock'] == info['last_checked'] == '2026-01-01T15:00'
+        db.close()
+
+def test_sites_keep_separate_histories():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = HistoryDB(os.path.join(tmp, 'history.db'))
+        observe(db, 0, '$119.99', 'in_stock')
+        observe(db, 0, '$139.99', 'in_stock', site='costco-nz')
+        assert len(db.find('171234')) == 2
+        assert db.find('171234', site='costco-nz')[0]['price_cents'] == 13999
+
+def test_runs_write_observations_and_the_cli_reads_them():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Recording.load('fixtures/recordings/costco_search_selenium.json')
+        monitor = replay_monitor(recording, state_dir=tmp)
+        record = run_check(monitor, [])
+        assert record['counters']['history_changes'] == 11
+        assert 'history' in record['phases']
+        monitor.history.close()
+
+        path = os.path.join(tmp, 'product_history.db')
+        assert main(['--db', path, 'prices', 'Charizard']) == 0
+        assert main(['--db', path, 'last-in-stock', 'no such product']) == 1
+        assert main(['--db', os.path.join(tmp, 'missing.db'), 'products']) == 1
+
+if __name__ == "__main__":
+    test_prices_are_stored_as_cents()
+    test_answers_last_in_stock_price_history_and_restocks()
+    test_in_stock_product_follows_unchanged_runs()
+    test_sites_keep_separate_histories()
+    test_runs_write_observations_and_the_cli_reads_them()
+    print("✅ All history database tests passed!")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the notification dispatcher against a local stub server
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append('.')
+
+from notifications import DiscordChannel, NotificationDispatcher, NtfyChannel, TelegramChannel
+
+class StubServer:
+    """Records every POST and answers with scripted responses per path"""
+    def __init__(self, responses=None, delay=0.0):
+        self.requests = []
+        self.responses = responses or {}
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests.append((self.path, dict(self.headers), body, time.perf_counter()))
+                time.sleep(stub.delay)
+                scripted = stub.responses.get(self.path, [])
+                status, headers = scripted.pop(0) if scripted else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def make_products(count):
+    return [{
+        'title': f'Pokemon Product {i}',
+        'url': f'https://www.costco.com.au/Pokemon-Product-{i}/p/{i}',
+        'price': '$10.00',
+        'availability': 'In stock',
+        'found_at': '2025-08-01T00:00:00',
+        'event': 'back_in_stock' if i % 2 else 'new_listing'
+    } for i in range(count)]
+
+def test_discord_batches_ten_embeds_per_message():
+    stub = StubServer({'/discord': [(204, {})] * 2})
+    try:
+        stats = NotificationDispatcher([DiscordChannel(f"{stub.url}/discord")]).dispatch(make_products(20))
+        assert (stats['discord']['sent'], stats['discord']['failed']) == (2, 0)
+        assert len(stats['discord']['message_seconds']) == 2
+        embeds = [len(json.loads(body)['embeds']) for _, _, body, _ in stub.requests]
+        assert embeds == [10, 10]
+        assert json.loads(stub.requests[0][2])['embeds'][1]['title'] == "🔄 POKEMON PRODUCT BACK IN STOCK!"
+    finally:
+        stub.close()
+
+def test_rate_limit_is_retried_after_header():
+    stub = StubServer({'/discord': [(429, {'Retry-After': '0.2'}), (204, {})]})
+    try:
+        dispatcher = NotificationDispatcher([DiscordChannel(f"{stub.url}/discord")], base_delay=5)
+        stats = dispatcher.dispatch(make_products(1))
+        assert stats['discord']['sent'] == 1
+        assert len(stub.requests) == 2
+        gap = stub.requests[1][3] - stub.requests[0][3]
+        assert 0.2 <= gap < 2, f"retried after {gap:.2f}s"
+    finally:
+        stub.close()
+
+def test_client_errors_are_not_retried():
+    stub = StubServer({'/ntfy': [(400, {})]})
+    try:
+        stats = NotificationDispatcher([NtfyChannel(f"{stub.url}/ntfy")], base_delay=0.01).dispatch(make_products(1))
+        assert (stats['ntfy']['sent'], stats['ntfy']['failed']) == (0, 1)
+        assert len(stub.requests) == 1
+    finally:
+        stub.close()
+
+def test_server_errors_back_off_and_give_up():
+    stub = StubServer({'/ntfy': [(503, {})] * 3})
+    try:
+        dispatcher = NotificationDispatcher([NtfyChannel(f"{stub.url}/ntfy")], max_retries=2, base_delay=0.01)
+        assert dispatcher.dispatch(make_products(1))['ntfy']['failed'] == 1
+        assert len(stub.requests) == 3
+    finally:
+        stub.close()
+
+def test_channels_are_sent_concurrently():
+    stub = StubServer(delay=0.3)
+    try:
+        channels = [
+            DiscordChannel(f"{stub.url}/discord"),
+            TelegramChannel('TOKEN', '42', api_base=stub.url),
+            NtfyChannel(f"{stub.url}/ntfy"),
+        ]
+        start = time.perf_counter()
+        stats = NotificationDispatcher(channels).dispatch(make_products(3))
+        elapsed = time.perf_counter() - start
+        assert {name: s['sent'] for name, s in stats.items()} == {'discord': 1, 'telegram': 1, 'ntfy': 1}
+        assert elapsed < 0.8, f"three 0.3s channels took {elapsed:.2f}s"
+        paths = sorted(path for path, _, _, _ in stub.requests)
+        assert paths == ['/botTOKEN/sendMessage', '/discord', '/ntfy']
+        ntfy_body = next(body for path, _, body, _ in stub.requests if path == '/ntfy').decode('utf-8')
+        assert 'Pokemon Product 2' in ntfy_body and '\\n' not in ntfy_body
+    finally:
+        stub.close()
+
+if __name__ == "__main__":
+    test_discord_batches_ten_embeds_per_message()
+    test_rate_limit_is_retried_after_header()
+    test_client_errors_are_not_retried()
+    test_server_errors_back_off_and_give_up()
+    test_channels_are_sent_concurrently()
+    print("✅ Notification tests passed")
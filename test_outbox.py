@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script to verify queued notifications survive crashes and are delivered once
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor, run_check
+from history_db import HistoryDB
+from notifications import NotificationDispatcher, NtfyChannel
+from outbox import Outbox
+from product_store import ProductStore
+from scheduler import DropHistory
+from test_notifications import StubServer, make_products
+
+def keyed(products):
+    for i, product in enumerate(products):
+        product['key'] = f"{i}:1:new_listing"
+    return products
+
+def test_pending_alerts_survive_a_restart():
+    stub = StubServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'outbox.jsonl')
+            outbox = Outbox.load(path)
+            assert outbox.enqueue(keyed(make_products(3)), ['ntfy']) == 3
+
+            # Process dies before delivering anything
+            outbox = Outbox.load(path)
+            assert outbox.stats()['depth'] == 3
+
+            outbox.drain([NtfyChannel(f"{stub.url}/ntfy")])
+            assert len(stub.requests) == 1
+            stats = outbox.stats()
+            assert stats['depth'] == 0 and stats['delivered'] == 3
+            assert Outbox.load(path).pending == {}
+    finally:
+        stub.close()
+
+def test_idempotency_keys_prevent_duplicates():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'outbox.jsonl')
+        outbox = Outbox.load(path)
+        products = keyed(make_products(2))
+        assert outbox.enqueue(products, ['discord', 'ntfy']) == 4
+        assert outbox.enqueue(products, ['discord', 'ntfy']) == 0
+        outbox.ack('discord', [products[0]['key']])
+
+        outbox = Outbox.load(path)
+        assert outbox.enqueue(products, ['discord', 'ntfy']) == 0
+        assert outbox.stats()['depth_by_channel'] == {'discord': 1, 'ntfy': 2}
+
+def test_failed_delivery_stays_queued_and_removed_channel_is_dropped():
+    stub = StubServer({'/ntfy': [(503, {})]})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            outbox = Outbox.load(os.path.join(tmp, 'outbox.jsonl'))
+            outbox.enqueue(keyed(make_products(1)), ['ntfy', 'telegram'])
+            channels = [NtfyChannel(f"{stub.url}/ntfy")]
+            outbox.drain(channels, NotificationDispatcher(channels, max_retries=0))
+            assert outbox.stats()['depth_by_channel'] == {'ntfy': 1}
+            assert Outbox.load(os.path.join(tmp, 'outbox.jsonl')).pending[('0:1:new_listing', 'ntfy')]['attempts'] == 1
+    finally:
+        stub.close()
+
+def test_rejected_alert_is_dead_lettered_without_its_batch():
+    # The second product's message is refused outright; the batch is split to find it
+    stub = StubServer({'/ntfy': [(400, {}), (200, {}), (400, {}), (200, {})]})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'outbox.jsonl')
+            outbox = Outbox.load(path)
+            outbox.enqueue(keyed(make_products(3)), ['ntfy'])
+            results = outbox.drain([NtfyChannel(f"{stub.url}/ntfy")])
+            assert results['ntfy']['sent'] == 2 and results['ntfy']['rejected'] == 1
+            stats = outbox.stats()
+            assert stats['depth'] == 0 and stats['delivered'] == 2 and stats['failed'] == 1
+            assert len(stub.requests) == 4
+
+            # Not posted again by later drains or after a restart
+            outbox = Outbox.load(path)
+            assert outbox.pending == {} and outbox.stats()['failed'] == 1
+    finally:
+        stub.close()
+
+def test_alert_is_dead_lettered_after_max_attempts():
+    stub = StubServer({'/ntfy': [(503, {})] * 3})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            outbox = Outbox.load(os.path.join(tmp, 'outbox.jsonl'), max_attempts=3)
+            outbox.enqueue(keyed(make_products(1)), ['ntfy'])
+            channels = [NtfyChannel(f"{stub.url}/ntfy")]
+            for _ in range(4):
+                outbox.drain(channels, NotificationDispatcher(channels, max_retries=0))
+            assert len(stub.requests) == 3
+            assert outbox.stats()['depth'] == 0 and outbox.stats()['failed'] == 1
+    finally:
+        stub.close()
+
+def test_compaction_keeps_pending_entries():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'outbox.jsonl')
+        outbox = Outbox.load(path)
+        products = keyed(make_products(300))
+        outbox.enqueue(products, ['ntfy'])
+        outbox.ack('ntfy', [product['key'] for product in products[:250]])
+        outbox.compact_if_needed()
+        assert outbox.log_lines == 550
+        # Retries of the pending alerts push the log past twice the live entries
+        for product in products[250:]:
+            outbox.record_attempts([('ntfy', [product])] * 3)
+        outbox.compact_if_needed()
+        assert outbox.log_lines == 300
+        reloaded = Outbox.load(path)
+        assert len(reloaded.pending) == 50 and len(reloaded.delivered) == 250
+        assert reloaded.pending[(products[299]['key'], 'ntfy')]['attempts'] == 3
+
+def make_monitor(tmp, products):
+    monitor = GitHubCostcoPokemonMonitor()
+    monitor.state_path = os.path.join(tmp, 'known_products.jsonl')
+    monitor.known_products = ProductStore.load(monitor.state_path)
+    monitor.outbox = Outbox.load(os.path.join(tmp, 'outbox.jsonl'))
+    monitor.run_log_path = os.path.join(tmp, 'runs.jsonl')
+    monitor.drop_history = DropHistory(os.path.join(tmp, 'drop_history.jsonl'))
+    monitor.history = HistoryDB(os.path.join(tmp, 'history.db'))
+    monitor.fetch_all_products = lambda: [dict(p) for p in products]
+    return monitor
+
+def test_alert_is_delivered_by_the_next_run_after_a_failed_post():
+    products = [{'title': 'Pokemon Mew Box', 'url': 'https://www.costco.com.au/Pokemon-Mew-Box/p/5',
+                 'price': '$79.99', 'availability': 'In stock', 'found_at': '2025-08-01T00:00:00'}]
+    stub = StubServer({'/ntfy': [(503, {})] * 5})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            monitor = make_monitor(tmp, products)
+            channel = NtfyChannel(f"{stub.url}/ntfy")
+            monitor.outbox.drain = lambda channels: None  # webhook unreachable this run
+            run_check(monitor, [channel])
+            assert len(monitor.known_products) == 1
+
+            # Next run: nothing is new any more, but the queued alert still goes out
+            monitor = make_monitor(tmp, products)
+            stub.responses['/ntfy'] = []
+            run_check(monitor, [channel])
+            assert len(stub.requests) == 1
+            assert 'Pokemon Mew Box' in stub.requests[0][2].decode('utf-8')
+            assert monitor.outbox.stats()['depth'] == 0
+    finally:
+        stub.close()
+
+if __name__ == "__main__":
+    test_pending_alerts_survive_a_restart()
+    test_idempotency_keys_prevent_duplicates()
+    test_failed_delivery_stays_queued_and_removed_channel_is_dropped()
+    test_rejected_alert_is_dead_lettered_without_its_batch()
+    test_alert_is_dead_lettered_after_max_attempts()
+    test_compaction_keeps_pending_entries()
+    test_alert_is_delivered_by_the_next_run_after_a_failed_post()
+    print("✅ Outbox tests passed")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the single-pass product extractor
+"""
+
+import json
+import sys
+sys.path.append('.')
+
+from product_extractor import extract_products
+
+BASE_URL = 'https://www.costco.com.au'
+
+def load(name):
+    with open(f'fixtures/{name}', 'r', encoding='utf-8') as f:
+        return f.read()
+
+def strip_found_at(products):
+    return [{k: v for k, v in p.items() if k != 'found_at'} for p in products]
+
+def test_fixture_extracts_every_product_once():
+    with open('fixtures/costco_search_pokemon.expected.json', 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    for parser in ['html.parser', 'lxml']:
+        products = extract_products(load('costco_search_pokemon.html'), BASE_URL, '', parser=parser)
+        assert strip_found_at(products) == expected
+
+def test_no_results_page():
+    assert extract_products(load('costco_search_no_results.html'), BASE_URL, '') == []
+
+def test_nested_cards_are_not_duplicated():
+    html = '''
+    <div class="product-list">
+      <article class="product-card">
+        <div class="product-item">
+          <a href="/Pokemon-Box/p/1"><img></a>
+          <h3><a href="/Pokemon-Box/p/1">Pokemon Box</a></h3>
+        </div>
+        <div class="price">$10.00</div>
+      </article>
+      <article class="product-card">
+        <a href="/Pokemon-Tin/p/2">Pokemon Tin</a>
+        <span class="stock">Out of Stock</span>
+      </article>
+    </div>'''
+    products = strip_found_at(extract_products(html, BASE_URL, ''))
+    assert products == [
+        {'title': 'Pokemon Box', 'url': f'{BASE_URL}/Pokemon-Box/p/1', 'price': '$10.00', 'availability': 'Unknown'},
+        {'title': 'Pokemon Tin', 'url': f'{BASE_URL}/Pokemon-Tin/p/2', 'price': 'Price not found', 'availability': 'Out of Stock'},
+    ]
+
+def test_single_product_page_and_irrelevant_links():
+    html = '<a href="/search?q=pokemon">Pokemon (1)</a><div><a href="/Hose/p/3">Garden Hose</a></div>'
+    assert extract_products(html, BASE_URL, '') == []
+    html = '<div><h1>Pokemon Single</h1><a href="/Pokemon-Single/p/4">View</a><p class="price">AUD 5</p></div>'
+    products = strip_found_at(extract_products(html, BASE_URL, ''))
+    assert products == [{'title': 'Pokemon Single', 'url': f'{BASE_URL}/Pokemon-Single/p/4', 'price': 'AUD5', 'availability': 'Unknown'}]
+
+def test_single_result_is_not_named_by_the_page_header():
+    html = '''<html><body>
+    <h1>Search results for pokemon</h1>
+    <div class="price-banner">Delivery from $5.00</div>
+    <div class="product-list">
+      <div class="product-tile">
+        <a href="/Pokemon-Tin-Collection/p/7">Pokemon Tin Collection</a>
+        <span class="price">$29.99</span>
+      </div>
+    </div>
+    </body></html>'''
+    for parser in ['html.parser', 'lxml']:
+        products = strip_found_at(extract_products(html, BASE_URL, '', parser=parser))
+        assert products == [{'title': 'Pokemon Tin Collection', 'url': f'{BASE_URL}/Pokemon-Tin-Collection/p/7',
+                             'price': '$29.99', 'availability': 'Unknown'}]
+
+if __name__ == "__main__":
+    test_fixture_extracts_every_product_once()
+    test_no_results_page()
+    test_nested_cards_are_not_duplicated()
+    test_single_product_page_and_irrelevant_links()
+    test_single_result_is_not_named_by_the_page_header()
+    print("✅ Extractor tests passed")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script to verify stable product identity and the legacy file migration
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from product_store import ProductStore, normalize_title, product_id, stock_state
+
+CHARIZARD_KEYS = [
+    "$119.99Price includes deliveryPokemon Charizard ex Super-Premium Collection★★★★★★★★★★5.0 (12)AddCompare Product|$119.99Price includes delivery",
+    "$119.99Price includes deliveryPokemon Charizard ex Super-Premium Collection★★★★★★★★★★4.8 (21)AddCompare Product|$119.99Price includes delivery",
+]
+PLUSH_KEY = "More Options Available $49.98Price includes deliveryPokemon Sleeping Plush 45.7cm★★★★★★★★★★Compare Product|$49.98Price includes delivery"
+
+def test_identity_prefers_item_code():
+    product = {'title': 'Pokemon Tin', 'url': 'https://www.costco.com.au/Pokemon-Tin/p/171234'}
+    assert product_id(product) == '171234'
+    assert product_id({'title': 'Pokémon Tin ★★★★★ 5.0 (3)', 'url': ''}) == 'title:pokemon tin'
+
+def test_rating_noise_is_ignored():
+    assert normalize_title(CHARIZARD_KEYS[0]) == normalize_title(CHARIZARD_KEYS[1].split('|')[0])
+    assert normalize_title(PLUSH_KEY.split('|')[0]) == 'pokemon sleeping plush 45 7cm'
+
+def test_legacy_file_is_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'known_products.json')
+        path = os.path.join(tmp, 'known_products.jsonl')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump({'products': CHARIZARD_KEYS + [PLUSH_KEY, 'Pokemon (1)|Price not found'],
+                       'last_updated': '2025-08-01T00:00:00'}, f)
+
+        store = ProductStore.load(path, legacy_path=legacy_path)
+        assert len(store) == 2
+        charizard = store.lookup({'title': 'Pokemon Charizard ex Super-Premium Collection', 'url': ''})
+        assert charizard['title'] == 'Pokemon Charizard ex Super-Premium Collection'
+        assert charizard['price'] == '$119.99'
+
+        store.save(path)
+        assert not os.path.exists(legacy_path)
+        reloaded = ProductStore.load(path, legacy_path=legacy_path)
+        assert reloaded.products == store.products
+
+def count_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+def test_save_appends_only_new_and_changed_records():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'known_products.jsonl')
+        store = ProductStore.from_legacy_keys(CHARIZARD_KEYS + [PLUSH_KEY], '2025-08-01T00:00:00')
+        assert store.save(path) == 2
+
+        store = ProductStore.load(path)
+        store.add({'title': 'Pokemon Mew Box', 'url': '/Pokemon-Mew-Box/p/5', 'price': '$79.99'})
+        store.add({'title': 'Pokemon Sleeping Plush 45.7cm', 'url': '/Pokemon-Sleeping-Plush/p/6', 'price': '$49.98'})
+        assert store.save(path) == 3
+        assert store.save(path) == 0
+        assert count_lines(path) == 5
+
+        reloaded = ProductStore.load(path)
+        assert sorted(reloaded.products) == ['5', '6', 'title:pokemon charizard ex super premium collection']
+
+def test_partial_last_line_is_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'known_products.jsonl')
+        store = ProductStore()
+        store.add({'title': 'Pokemon Box', 'url': '/Pokemon-Box/p/9', 'price': '$10'})
+        store.save(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"id":"10","tit')
+        store = ProductStore.load(path)
+        assert list(store.products) == ['9']
+
+        store.add({'title': 'Pokemon Tin', 'url': '/Pokemon-Tin/p/11', 'price': '$5'})
+        store.save(path)
+        assert sorted(ProductStore.load(path).products) == ['11', '9']
+
+def test_log_is_compacted_when_mostly_superseded():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'known_products.jsonl')
+        store = ProductStore()
+        store.add({'title': 'Pokemon Box', 'url': '/Pokemon-Box/p/9', 'price': '$10'})
+        store.save(path)
+        store.log_lines = 5000
+        store.dirty.add('9')
+        store.save(path)
+        assert count_lines(path) == 1
+        assert store.log_lines == 1
+
+def test_migrated_record_upgrades_to_item_code():
+    store = ProductStore.from_legacy_keys(CHARIZARD_KEYS, '2025-08-01T00:00:00')
+    scraped = {'title': 'Pokemon Charizard ex Super-Premium Collection',
+               'url': 'https://www.costco.com.au/Pokemon-Charizard/p/171234', 'price': '$119.99'}
+    assert scraped in store
+    store.add(scraped)
+    assert list(store.products) == ['171234']
+    assert store.products['171234']['first_seen'] == '2025-08-01T00:00:00'
+
+def test_same_code_with_new_title_is_not_new():
+    store = ProductStore()
+    store.add({'title': 'Pokemon Box', 'url': '/Pokemon-Box/p/9', 'price': '$10'})
+    assert {'title': 'Pokemon Box (Limited)', 'url': '/Pokemon-Box-Limited/p/9', 'price': '$12'} in store
+    assert {'title': 'Pokemon Box', 'url': '/Pokemon-Box/p/10', 'price': '$10'} not in store
+
+def snapshot(price, availability):
+    return {'title': 'Pokemon Mew Box', 'url': '/Pokemon-Mew-Box/p/5', 'price': price, 'availability': availability}
+
+def test_stock_state_mapping():
+    assert stock_state('Out of Stock') == 'out_of_stock'
+    assert stock_state('Sold out') == 'out_of_stock'
+    assert stock_state('In stock') == 'in_stock'
+    assert stock_state('Unknown') == 'unknown'
+    assert stock_state('Available') == 'in_stock'
+    for text in ['Not available', 'Temporarily not available', 'Temporarily unavailable', 'Not Available Online',
+                 'Available soon', 'Coming soon', 'Not in stock', 'No longer available']:
+        assert stock_state(text) == 'out_of_stock', text
+
+def test_negated_availability_is_not_a_restock():
+    store = ProductStore()
+    store.diff([snapshot('$69.99', 'Out of Stock')])
+    for text in ['Not available', 'Temporarily not available', 'Not Available Online', 'Available soon']:
+        assert store.diff([snapshot('$69.99', text)]) == [], text
+    assert [e['type'] for e in store.diff([snapshot('$69.99', 'Available')])] == ['back_in_stock']
+
+def test_change_events_follow_the_snapshot():
+    store = ProductStore()
+    assert [e['type'] for e in store.diff([snapshot('$79.99Price includes delivery', 'In stock')])] == ['new_listing']
+    assert store.diff([snapshot('$79.99', 'In stock')]) == []
+
+    events = store.diff([snapshot('$69.99', 'Out of Stock')])
+    assert [e['type'] for e in events] == ['price_change', 'out_of_stock']
+    assert events[0]['previous_price'] == '$79.99'
+    assert [e['rev'] for e in events] == [2, 2]
+
+    # Unknown stock and missing prices never flip the state
+    assert store.diff([snapshot('Price not found', 'Unknown')]) == []
+    assert store.products['5']['stock'] == 'out_of_stock'
+
+    assert [e['type'] for e in store.diff([snapshot('$69.99', 'In stock')])] == ['back_in_stock']
+
+def test_only_changed_products_are_written():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'known_products.jsonl')
+        store = ProductStore()
+        store.diff([snapshot('$79.99', 'In stock'),
+                    {'title': 'Pokemon Tin', 'url': '/Pokemon-Tin/p/6', 'price': '$5', 'availability': 'In stock'}])
+        store.save(path)
+        store.diff([snapshot('$79.99', 'Out of stock'),
+                    {'title': 'Pokemon Tin', 'url': '/Pokemon-Tin/p/6', 'price': '$5', 'availability': 'In stock'}])
+        assert store.save(path) == 1
+        assert ProductStore.load(path).products['5']['stock'] == 'out_of_stock'
+
+if __name__ == "__main__":
+    test_identity_prefers_item_code()
+    test_rating_noise_is_ignored()
+    test_legacy_file_is_migrated()
+    test_save_appends_only_new_and_changed_records()
+    test_partial_last_line_is_skipped()
+    test_log_is_compacted_when_mostly_superseded()
+    test_migrated_record_upgrades_to_item_code()
+    test_same_code_with_new_title_is_not_new()
+    test_stock_state_mapping()
+    test_negated_availability_is_not_a_restock()
+    test_change_events_follow_the_snapshot()
+    test_only_changed_products_are_written()
+    print("✅ Product store tests passed")
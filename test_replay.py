@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script to verify recorded fetches replay offline through the monitor
+"""
+
+import glob
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from product_store import stock_state
+from replay import Recording, RecordingDriver, RecordingSession, ReplayDriver, ReplaySession, replay_monitor, request_key
+from test_notifications import StubServer
+
+RECORDINGS = 'fixtures/recordings'
+
+def product_keys(products):
+    return {(p['title'], p['url'], p['price'], stock_state(p['availability'])) for p in products}
+
+def test_recordings_replay_to_expected_products():
+    paths = sorted(glob.glob(os.path.join(RECORDINGS, '*.json')))
+    assert len(paths) >= 3
+    for path in paths:
+        recording = Recording.load(path)
+        monitor = replay_monitor(recording)
+        products = monitor.fetch_pokemon_products()
+        assert product_keys(products) == product_keys(recording.meta['expected']), path
+
+def test_selenium_fallback_is_replayed_with_the_stub_browser():
+    monitor = replay_monitor(Recording.load(os.path.join(RECORDINGS, 'costco_search_selenium.json')))
+    products = monitor.fetch_pokemon_products()
+    assert monitor.last_fetch['path'] == 'selenium'
+    assert [a['path'] for a in monitor.last_fetch['attempts']] == ['http', 'selenium']
+    assert len(products) == 11
+    assert monitor.last_scrape_timings['parse'] >= 0
+
+    monitor = replay_monitor(Recording.load(os.path.join(RECORDINGS, 'costco_search_api.json')))
+    monitor.fetch_pokemon_products()
+    assert monitor.last_fetch['path'] == 'http'
+
+def test_unrecorded_requests_get_404_without_network():
+    session = ReplaySession(Recording())
+    response = session.get('https://www.costco.com.au/search', params={'text': 'pokemon'})
+    assert response.status_code == 404
+    assert session.calls == ['GET https://www.costco.com.au/search?text=pokemon']
+
+def test_record_then_replay_round_trip():
+    stub = StubServer()
+    try:
+        recording = Recording()
+        session = RecordingSession(recording)
+        response = session.post(f"{stub.url}/api", params={'q': 'pokemon'}, data=b'{}')
+        assert response.status_code == 200
+    finally:
+        stub.close()
+
+    class FakeDriver:
+        current_url = 'https://www.costco.com.au/search?text=pokemon'
+        page_source = '<html><body><a href="/Pokemon-Tin/p/1">Pokemon Tin</a></body></html>'
+
+    driver = RecordingDriver(FakeDriver(), recording)
+    assert driver.page_source == FakeDriver.page_source
+    assert driver.current_url == FakeDriver.current_url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'run.json')
+        recording.save(path)
+        loaded = Recording.load(path)
+
+    assert request_key('POST', f"{stub.url}/api", {'q': 'pokemon'}) in loaded.http_responses()
+    replayed = ReplaySession(loaded).post(f"{stub.url}/api", params={'q': 'pokemon'})
+    assert replayed.status_code == 200
+
+    browser = ReplayDriver(loaded)
+    browser.get(FakeDriver.current_url)
+    assert browser.page_source == FakeDriver.page_source
+    assert browser.execute_script('probe', 'a[href*="/p/"]', '.no-results') == [1, 'complete', False]
+
+if __name__ == "__main__":
+    test_recordings_replay_to_expected_products()
+    test_selenium_fallback_is_replayed_with_the_stub_browser()
+    test_unrecorded_requests_get_404_without_network()
+    test_record_then_replay_round_trip()
+    print("✅ All replay tests passed!")
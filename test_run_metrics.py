@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-run metrics, the run log and the metrics endpoint
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import requests
+
+from github_pokemon_monitor import run_check
+from replay import Recording, replay_monitor
+from run_metrics import MetricsRegistry, MetricsServer, RunMetrics, append_run_record
+
+def test_phases_counters_and_gauges_are_recorded():
+    metrics = RunMetrics()
+    with metrics.phase('parse'):
+        pass
+    metrics.add_time('parse', 0.5)
+    metrics.count('candidates', 12)
+    metrics.count('candidates', 3)
+    metrics.gauge_max('driver_rss_mb', 300)
+    metrics.gauge_max('driver_rss_mb', 200)
+    metrics.add_delivery({'discord': {'sent': 2, 'failed': 1, 'seconds': 0.3, 'message_seconds': [0.1, 0.2, 0.0]}})
+
+    record = metrics.record(fetch={'path': 'http'})
+    assert record['phases']['parse']['count'] == 2
+    assert record['phases']['parse']['max_seconds'] == 0.5
+    assert record['phases']['notify_discord']['count'] == 3
+    assert record['counters'] == {'candidates': 15, 'notifications_sent': 2, 'notifications_failed': 1}
+    assert record['gauges'] == {'driver_rss_mb': 300}
+    assert record['fetch'] == {'path': 'http'}
+
+def test_run_log_appends_and_rotates():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'runs.jsonl')
+        append_run_record(path, {'run_id': 'a'})
+        append_run_record(path, {'run_id': 'b'})
+        with open(path) as f:
+            assert [json.loads(line)['run_id'] for line in f] == ['a', 'b']
+
+        append_run_record(path, {'run_id': 'c'}, max_bytes=10)
+        with open(path) as f:
+            assert [json.loads(line)['run_id'] for line in f] == ['c']
+        assert os.path.exists(f"{path}.1")
+
+def test_run_check_writes_a_run_record():
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = replay_monitor(Recording.load('fixtures/recordings/costco_search_selenium.json'), state_dir=tmp)
+        registry = MetricsRegistry()
+        record = run_check(monitor, [], registry=registry)
+
+        with open(monitor.run_log_path) as f:
+            assert json.loads(f.readline()) == json.loads(json.dumps(record))
+
+    for phase in ['api_request', 'page_request', 'fetch_http', 'fetch_selenium', 'navigate', 'ready_wait', 'parse', 'dedup', 'save_state']:
+        assert phase in record['phases'], phase
+    assert record['counters']['pages'] == 1
+    assert record['counters']['products'] == 11
+    assert record['counters']['new_products'] == 11
+    assert record['counters']['candidates'] >= record['counters']['products']
+    assert record['fetch']['path'] == 'selenium'
+    assert registry.runs == 1
+
+def test_metrics_endpoint_serves_prometheus_text():
+    registry = MetricsRegistry()
+    registry.add_gauge('outbox_depth', "Notifications waiting to be delivered", lambda: 4)
+    metrics = RunMetrics('daemon')
+    metrics.add_time('navigate', 1.25)
+    metrics.count('new_products', 2)
+    metrics.gauge('driver_pool_memory_mb', 512.0)
+    registry.observe_run(metrics.record())
+    registry.observe_run(metrics.record())
+    registry.observe_delivery({'ntfy': {'sent': 1, 'failed': 0, 'seconds': 0.1, 'message_seconds': [0.1]}})
+
+    server = MetricsServer(registry, 0)
+    try:
+        response = requests.get(server.url, timeout=5)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        lines = response.text.splitlines()
+        assert 'pokemon_monitor_runs_total 2' in lines
+        assert 'pokemon_monitor_phase_seconds_total{phase="navigate"} 2.5' in lines
+        assert 'pokemon_monitor_phase_calls_total{phase="notify_ntfy"} 1' in lines
+        assert 'pokemon_monitor_new_products_total 4' in lines
+        assert 'pokemon_monitor_notifications_sent_total 1' in lines
+        assert 'pokemon_monitor_driver_pool_memory_mb 512.0' in lines
+        assert 'pokemon_monitor_outbox_depth 4' in lines
+        assert '# TYPE pokemon_monitor_runs_total counter' in lines
+        assert requests.get(server.url.replace('/metrics', '/'), timeout=5).status_code == 404
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    test_phases_counters_and_gauges_are_recorded()
+    test_run_log_appends_and_rotates()
+    test_run_check_writes_a_run_record()
+    test_metrics_endpoint_serves_prometheus_text()
+    print("✅ All run metrics tests passed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script to verify site adapters and the shared multi-site scheduler
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append('.')
+
+from github_pokemon_monitor import GitHubCostcoPokemonMonitor, run_sites_check
+from history_db import HistoryDB, price_cents
+from outbox import Outbox
+from product_extractor import extract_products
+from product_store import ProductStore, has_price, normalize_price
+from scheduler import DropHistory, SiteScheduler
+from sites import get_site, load_sites
+
+def test_costco_regions_build_their_own_urls_and_files():
+    nz = get_site('costco-nz')
+    assert nz.search_url('pokemon tcg', 1) == 'https://www.costco.co.nz/search?text=pokemon+tcg&page=1'
+    url, params = nz.api_request('pokemon')
+    assert url == 'https://www.costco.co.nz/rest/v2/newzealand/products/search'
+    assert (params['lang'], params['curr']) == ('en_NZ', 'NZD')
+    assert nz.state_file('known_products.jsonl') == 'known_products.costco-nz.jsonl'
+    assert get_site('costco-au').state_file('known_products.jsonl') == 'known_products.jsonl'
+    assert [site.name for site in load_sites('costco-au, costco-uk')] == ['costco-au', 'costco-uk']
+    try:
+        get_site('costco-mars')
+        assert False, "unknown site should raise"
+    except ValueError:
+        pass
+
+def test_uk_markup_reads_pound_prices():
+    uk = get_site('costco-uk')
+    page = ('<div class="product"><a href="/Pokemon-Tin/p/123"><h3>Pokemon Tin</h3></a>'
+            '<div class="price">£24.99</div><div class="stock">In stock</div></div>')
+    products = extract_products(page, uk.base_url, '', markup=uk.markup)
+    assert products[0]['url'] == 'https://www.costco.co.uk/Pokemon-Tin/p/123'
+    assert products[0]['price'] == '£24.99'
+    assert normalize_price(products[0]['price']) == '£24.99'
+
+def test_every_site_reads_prices_written_with_a_currency_code():
+    for name, text, price in [('costco-au', 'AUD 49.99', '$49.99'), ('costco-nz', 'NZD 12.00', '$12.00'),
+                              ('costco-uk', 'GBP 24.99', '£24.99')]:
+        site = get_site(name)
+        page = ('<div class="product"><a href="/Pokemon-Tin/p/123"><h3>Pokemon Tin</h3></a>'
+                f'<div class="price">{text}</div><div class="stock">In stock</div></div>')
+        products = extract_products(page, site.base_url, '', markup=site.markup)
+        assert normalize_price(products[0]['price']) == price, name
+        assert has_price(normalize_price(products[0]['price'])) and price_cents(products[0]['price'])[1] == price[0]
+        store = ProductStore()
+        store.diff(products)
+        assert store.lookup(products[0])['price'] == price
+
+def make_monitors(tmp, names):
+    monitors = []
+    for site in load_sites(names):
+        monitor = GitHubCostcoPokemonMonitor(site)
+        monitor.state_path = os.path.join(tmp, site.state_file('known_products.jsonl'))
+        monitor.run_log_path = os.path.join(tmp, 'runs.jsonl')
+        monitor.known_products = ProductStore()
+        monitor.outbox = Outbox(os.path.join(tmp, 'outbox.jsonl'))
+        monitor.drop_history = DropHistory(os.path.join(tmp, 'drop_history.jsonl'))
+        monitor.history = HistoryDB(os.path.join(tmp, 'history.db'))
+        monitor.search_queries = ['pokemon', 'pokemon tcg']
+        monitor.fetch_mode = 'http'
+        monitors.append(monitor)
+    return monitors
+
+def test_scheduler_shares_one_pool_across_sites():
+    with tempfile.TemporaryDirectory() as tmp:
+        monitors = make_monitors(tmp, 'costco-au,costco-nz')
+        scheduler = SiteScheduler(monitors, workers=4)
+        order = []
+
+        def fake_fetch(monitor):
+            def fetch_target(target):
+                order.append(monitor.site.name)
+                time.sleep(0.2)
+                code = len(target['query'])
+                product = {'title': f"Pokemon Tin {code}", 'url': f"{monitor.base_url}/Pokemon-Tin/p/{code}",
+                           'price': '$10.00', 'availability': 'In stock', 'found_at': ''}
+                return [product], {'url': target['url'], 'path': 'http', 'seconds': 0.2, 'products': 1, 'attempts': []}
+            return fetch_target
+
+        for monitor in monitors:
+            monitor.fetch_target = fake_fetch(monitor)
+
+        assert monitors[0].rate_limiter is monitors[1].rate_limiter
+        assert monitors[0].outbox is monitors[1].outbox
+        assert [monitor.site_label for monitor in monitors] == ['Costco AU', 'Costco NZ']
+
+        start = time.perf_counter()
+        records = run_sites_check(scheduler, [])
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.6, f"4 pages of 0.2s took {elapsed:.2f}s"
+        assert sorted(order[:2]) == ['costco-au', 'costco-nz']
+        assert [record['site'] for record in records] == ['costco-au', 'costco-nz']
+        assert [record['counters']['new_products'] for record in records] == [2, 2]
+        assert os.path.exists(os.path.join(tmp, 'known_products.jsonl'))
+        assert os.path.exists(os.path.join(tmp, 'known_products.costco-nz.jsonl'))
+
+        alerts = monitors[1].alert_products(monitors[1].last_events)
+        assert alerts[0]['site'] == 'Costco NZ'
+        assert alerts[0]['key'].startswith('costco-nz:')
+
+def test_selenium_sites_borrow_from_one_driver_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        monitors = make_monitors(tmp, 'costco-au,costco-uk')
+        pools = set()
+        for monitor in monitors:
+            monitor.fetch_mode = 'auto'
+            monitor.fetch_target = lambda target, monitor=monitor: (
+                pools.add(id(monitor.driver_pool)) or [],
+                {'url': target['url'], 'path': 'selenium', 'seconds': 0.0, 'products': 0, 'attempts': []})
+        scheduler = SiteScheduler(monitors)
+        scheduler.fetch_all()
+        assert len(pools) == 1
+        assert all(monitor.driver_pool is None for monitor in monitors)
+
+if __name__ == "__main__":
+    test_costco_regions_build_their_own_urls_and_files()
+    test_uk_markup_reads_pound_prices()
+    test_every_site_reads_prices_written_with_a_currency_code()
+    test_scheduler_shares_one_pool_across_sites()
+    test_selenium_sites_borrow_from_one_driver_pool()
+    print("✅ All site tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script to verify title normalization and fuzzy variant matching
+"""
+
+import sys
+import time
+sys.path.append('.')
+
+from product_store import ProductStore
+from title_match import FuzzyIndex, clean_title, group_variants, normalize_title, similarity
+
+CHARIZARD = "Pokemon Charizard ex Super-Premium Collection★★★★★★★★★★5.0 (12)AddCompare Product"
+
+def test_card_text_is_stripped_from_titles():
+    assert clean_title(CHARIZARD) == 'Pokemon Charizard ex Super-Premium Collection'
+    assert clean_title("$119.99Price includes deliveryPokemon Mew Tin Add to Cart Members Only") == 'Pokemon Mew Tin'
+    assert clean_title("Pokemon Squad Box") == 'Pokemon Squad Box'
+    assert normalize_title("Pokémon Surging Sparks (4 reviews)") == 'pokemon surging sparks'
+
+def test_stripping_leaves_no_dangling_separators_or_partial_names():
+    assert clean_title("Pokemon Mega Evolution Elite Trainer Box - Limit of 2 units per membership") == \
+        'Pokemon Mega Evolution Elite Trainer Box'
+    assert clean_title("Pokemon Mew Tin | $49.99 | Add to Cart") == 'Pokemon Mew Tin'
+    assert clean_title("Pokemon Booster Box - Limit of 2 units per membership - Members Only") == 'Pokemon Booster Box'
+    assert clean_title("Members Only Item Pokemon Mew Tin") == 'Pokemon Mew Tin'
+    assert clean_title("Pokemon Tin (Members Only) - Limit of 1 unit per membership.") == 'Pokemon Tin'
+    assert clean_title("Pokemon Members Only Collection Box") == 'Pokemon Members Only Collection Box'
+    assert clean_title("Pokemon Trading Card Game Online Only Bundle") == 'Pokemon Trading Card Game Online Only Bundle'
+    assert normalize_title("Pokemon In-Warehouse Only Exclusive Tin") == 'pokemon in warehouse only exclusive tin'
+    assert clean_title("Pokemon Tin Online Only") == 'Pokemon Tin'
+    assert clean_title("In-Warehouse Only | Pokemon Tin | Online Only | $20.00") == 'Pokemon Tin'
+    assert normalize_title("Pokemon Members Only Collection Box Add to Cart") == 'pokemon members only collection box'
+    assert clean_title("Pokemon Scarlet & Violet - Paldea Evolved Booster Box") == \
+        'Pokemon Scarlet & Violet - Paldea Evolved Booster Box'
+
+def test_similarity_ignores_order_noise_and_common_words():
+    assert similarity(CHARIZARD, "Charizard ex Super Premium Collection - Pokemon TCG") == 1.0
+    assert similarity("Pokemon Prismatic Evolutions Booster Bundle",
+                      "Pokemon Prismatic Evolutions Booster Box") < 0.75
+
+def test_index_finds_variants_and_skips_the_rest():
+    index = FuzzyIndex(0.75)
+    index.add('1', "Pokemon Charizard ex Super-Premium Collection")
+    index.add('2', "Pokemon Prismatic Evolutions Booster Bundle")
+    index.add('3', "Pokemon Pikachu Lunch Box")
+    assert index.best("Charizard ex Super Premium Collection (Pokemon TCG)")[0] == '1'
+    assert index.best("Pokemon Prismatic Evolutions Elite Trainer Box") is None
+    assert index.best("Pokemon Charizard ex Super-Premium Collection", exclude='1') is None
+    index.remove('1')
+    assert index.best(CHARIZARD) is None and len(index) == 2
+
+def test_group_variants_handles_thousands_quickly():
+    products = []
+    for i in range(2000):
+        products.append({'title': f"Pokemon TCG Series{i} Booster{i % 7} Bundle{i} Elite{i}★★★★★4.{i % 10} ({i})AddCompare Product"})
+        products.append({'title': f"Pokemon Series{i} Booster{i % 7} Bundle{i} Elite{i} - Pokemon"})
+    start = time.perf_counter()
+    groups = group_variants(products)
+    elapsed = time.perf_counter() - start
+    assert len(groups) == 2000 and all(len(group) == 2 for group in groups)
+    assert elapsed < 1.0, f"grouping 4000 titles took {elapsed:.2f}s"
+
+def test_store_flags_new_listings_that_are_variants():
+    store = ProductStore()
+    store.diff([{'title': 'Pokemon Charizard ex Super-Premium Collection', 'url': '/Charizard/p/1',
+                 'price': '$119.99', 'availability': 'In stock'}])
+    events = store.diff([{'title': 'Charizard ex Super Premium Collection Pokemon', 'url': '/Charizard-Online/p/2',
+                          'price': '$119.99', 'availability': 'In stock'},
+                         {'title': 'Pokemon Pikachu Lunch Box', 'url': '/Lunch/p/3',
+                          'price': '$9.99', 'availability': 'In stock'}])
+    assert events[0]['variant_of'] == {'id': '1', 'title': 'Pokemon Charizard ex Super-Premium Collection'}
+    assert events[1]['variant_of'] is None
+
+def test_codeless_records_match_reworded_titles():
+    store = ProductStore.from_legacy_keys(["Pokemon Sleeping Plush 45.7cm Large|$49.98"], '2025-08-01T00:00:00')
+    record = store.lookup({'title': 'Pokemon Large Sleeping Plush 45.7cm', 'url': ''})
+    assert record is not None and record['id'].startswith('title:')
+
+if __name__ == "__main__":
+    test_card_text_is_stripped_from_titles()
+    test_stripping_leaves_no_dangling_separators_or_partial_names()
+    test_similarity_ignores_order_noise_and_common_words()
+    test_index_finds_variants_and_skips_the_rest()
+    test_group_variants_handles_thousands_quickly()
+    test_store_flags_new_listings_that_are_variants()
+    test_codeless_records_match_reworded_titles()
+    print("✅ All title match tests passed!")
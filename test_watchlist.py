@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script to verify watchlist matching, exclusions, priorities and per-term channels
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from github_pokemon_monitor import run_check
+from notifications import NtfyChannel, build_named_channels
+from product_extractor import extract_products
+from test_notifications import StubServer
+from test_outbox import make_monitor
+from watchlist import Watchlist, compile_terms
+
+WATCHLIST = {
+    'exclude': ['plush', 'card sleeves'],
+    'alerts': {
+        'Charizard': {'priority': 'urgent', 'channels': ['priority']},
+        'Pokémon 151': {'priority': 'low'}
+    },
+    'channels': {'priority': {'type': 'ntfy', 'topic': '$TEST_PRIORITY_TOPIC'}}
+}
+
+def test_default_watchlist_keeps_the_old_pokemon_filter():
+    watchlist = Watchlist()
+    assert watchlist.is_relevant('POKÉMON TCG Scarlet & Violet Booster Box')
+    assert watchlist.is_relevant('Trading Cards Collector Tin')
+    assert not watchlist.is_relevant('LEGO Star Wars Set')
+
+def test_terms_match_whole_words_including_overlapping_ones():
+    watchlist = Watchlist(include=['pokemon'], alerts={'charizard': {}, 'charizard ex': {}, 'ex': {}})
+    assert watchlist.terms('Pokemon Charizard ex Super Premium Collection') == [
+        ('pokemon', 'include'), ('charizard', 'alert'), ('charizard ex', 'alert'), ('ex', 'alert')]
+    assert watchlist.terms('Pokemon Exclusive Tin') == [('pokemon', 'include')]
+    assert watchlist.terms('Pokemon Charizards') == [('pokemon', 'include'), ('charizard', 'alert')]
+
+def test_exclude_wins_and_alert_terms_set_priority_and_channels():
+    watchlist = Watchlist(WATCHLIST.get('include'), WATCHLIST['exclude'], WATCHLIST['alerts'], WATCHLIST['channels'])
+    assert not watchlist.is_relevant('Pokemon Charizard Plush 30cm')
+    assert not watchlist.is_relevant('Pokemon TCG Card Sleeves 100 Pack')
+
+    charizard = watchlist.match('Pokemon Charizard ex Premium Collection')
+    assert charizard['relevant'] and charizard['priority'] == 'urgent' and charizard['channels'] == ['priority']
+    assert watchlist.match('Pokemon 151 Mini Tin')['priority'] == 'low'
+    plain = watchlist.match('Pokemon Booster Bundle')
+    assert plain['relevant'] and plain['priority'] == 'high' and plain['watching'] == []
+
+def test_bad_config_is_rejected():
+    for kwargs in ({'alerts': {'mew': {'priority': 'loud'}}}, {'channels': {'x': {'type': 'email'}}},
+                   {'exclude': ['!!!']}):
+        try:
+            Watchlist(**kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"{kwargs} was accepted")
+
+def test_hundreds_of_terms_compile_to_one_pattern():
+    terms = [f"pokemon set {i}" for i in range(500)] + [f"promo {i}" for i in range(500)]
+    pattern = compile_terms(terms)
+    assert [m.group(1) for m in pattern.finditer('pokemon set 250 and promo 7 bundle')] == ['pokemon set 250', 'promo 7']
+    watchlist = Watchlist(include=terms)
+    assert watchlist.is_relevant('Pokemon Set 499 Booster') and not watchlist.is_relevant('Pokemon Set 500 Booster')
+
+def test_extractor_filters_through_the_watchlist():
+    html = ''.join(f'<div class="product"><a href="/p/{i}">{title}</a></div>'
+                   for i, title in enumerate(['Pokemon Pikachu Plush', 'Pokemon Elite Trainer Box']))
+    watchlist = Watchlist(exclude=['plush'])
+    products = extract_products(html, 'https://www.costco.com.au', '', watchlist=watchlist)
+    assert [p['title'] for p in products] == ['Pokemon Elite Trainer Box']
+
+def test_watched_alerts_go_to_their_extra_channel_with_their_priority():
+    products = [
+        {'title': 'Pokemon Charizard ex Premium Collection', 'url': 'https://www.costco.com.au/Charizard/p/1',
+         'price': '$99.99', 'availability': 'In Stock', 'found_at': ''},
+        {'title': 'Pokemon Elite Trainer Box', 'url': 'https://www.costco.com.au/ETB/p/2',
+         'price': '$79.99', 'availability': 'In Stock', 'found_at': ''},
+    ]
+    stub = StubServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'watchlist.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(WATCHLIST, f)
+            os.environ['TEST_PRIORITY_TOPIC'] = f"{stub.url}/priority"
+            watchlist = Watchlist.load(path)
+            channels = [NtfyChannel(f"{stub.url}/ntfy")] + build_named_channels(watchlist.channel_specs())
+            assert [channel.name for channel in channels] == ['ntfy', 'priority']
+
+            monitor = make_monitor(tmp, products)
+            monitor.watchlist = watchlist
+            record = run_check(monitor, channels)
+
+            assert record['counters']['notifications_queued'] == 3
+            by_path = {}
+            for request_path, headers, body, at in stub.requests:
+                by_path.setdefault(request_path, []).append((headers, body.decode('utf-8')))
+            assert len(by_path['/priority']) == 1
+            headers, body = by_path['/priority'][0]
+            assert headers['Priority'] == 'urgent' and 'Watching Charizard' in body and 'Elite' not in body
+            assert sum(body.count('📦') for headers, body in by_path['/ntfy']) == 2
+    finally:
+        os.environ.pop('TEST_PRIORITY_TOPIC', None)
+        stub.close()
+
+if __name__ == "__main__":
+    test_default_watchlist_keeps_the_old_pokemon_filter()
+    test_terms_match_whole_words_including_overlapping_ones()
+    test_exclude_wins_and_alert_terms_set_priority_and_channels()
+    test_bad_config_is_rejected()
+    test_hundreds_of_terms_compile_to_one_pattern()
+    test_extractor_filters_through_the_watchlist()
+    test_watched_alerts_go_to_their_extra_channel_with_their_priority()
+    print("✅ All watchlist tests passed!")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Product title normalization and fuzzy matching
+Scraped card text often runs the price, star rating, review count and button
+labels into the product name. Titles are cleaned with one precompiled
+pattern, normalized, split into tokens and cached, because the same titles
+come back on every run.
+
+FuzzyIndex groups variants of one product, such as the same box listed under
+a second item code or a slightly reworded title. It uses token-set (Jaccard)
+similarity over an inverted index. A stored title that reaches the threshold
+must contain at least one of the query's k rarest words, where k is the query's
+word count minus the overlap the threshold requires, plus one. Each lookup
+therefore only reads the postings of those few words, and only scores
+titles that can still match.
+"""
+
+import math
+import re
+import unicodedata
+from functools import lru_cache
+
+# Badges that are only noise on their own: "Online Only" inside a name is part of the name
+BADGE = r'(?:Members? Only(?: Item)?|(?:Online|In-?Warehouse) Only)'
+
+# Scraped card text that is not part of the product name; the lookahead lets
+# the scan skip positions where none of the alternatives can start
+TITLE_NOISE_RE = re.compile(
+    r'(?=[MmPpLlTtAaCcOoIi$£€★☆\d(])(?:'
+    r'More Options Available'
+    r'|[$£€]\s?[\d,]+(?:\.\d{2})?'
+    r'|Price includes delivery'
+    r'|[★☆]+'
+    r'|\d\.\d\s*\(\d+\)'
+    r'|\(\d+ reviews?\)'
+    r'|Limit of \d+ units? per membership\.?'
+    r'|The maximum purchase allowed is \d+'
+    r'|(?:Add)?Compare Product'
+    r'|Add to Cart'
+    r'|' + BADGE + r'(?=\s*[|•·)\]])'
+    r'|\bAdd$)',
+    re.IGNORECASE
+)
+# Separators left at either end once the noise is gone, and badges standing there
+EDGE_RE = re.compile(
+    r'^(?:[\s\-–—|:,;/•·]|' + BADGE + r')+'
+    r'|(?:[\s\-–—|:,;/•·.]|' + BADGE + r')+$',
+    re.IGNORECASE
+)
+# Brackets emptied by the noise strip, and separators doubled by it
+LEFTOVER_RE = re.compile(r'\(\s*\)|\[\s*\]|([\-–—|•·])(?:\s*[\-–—|•·](?=\s))+')
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Words every watched title shares, which say nothing about which product it is
+STOPWORDS = frozenset(['pokemon', 'tcg', 'trading', 'card', 'cards', 'game', 'the', 'and', 'of', 'with', 'for', 'a'])
+
+DEFAULT_THRESHOLD = 0.75
+
+
+@lru_cache(maxsize=65536)
+def clean_title(title):
+    """Product name with rating, price and button text removed"""
+    title = LEFTOVER_RE.sub(r'\1', TITLE_NOISE_RE.sub(' ', title or ''))
+    return WHITESPACE_RE.sub(' ', EDGE_RE.sub('', title))
+
+
+@lru_cache(maxsize=65536)
+def normalize_title(title):
+    """Lowercase, accent-free product name with rating, price and button text removed"""
+    # NON_WORD_RE also collapses whitespace, so the noise is removed without clean_title's extra pass
+    title = EDGE_RE.sub('', TITLE_NOISE_RE.sub(' ', title or ''))
+    if not title.isascii():
+        title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+    return NON_WORD_RE.sub(' ', title.lower()).strip()
+
+
+@lru_cache(maxsize=65536)
+def title_tokens(title):
+    """Distinctive words of a title as a frozenset"""
+    return frozenset(normalize_title(title).split()) - STOPWORDS
+
+
+def similarity(a, b):
+    """Jaccard similarity of two titles' token sets"""
+    a, b = title_tokens(a), title_tokens(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class FuzzyIndex:
+    """Finds stored titles whose token sets are at least threshold similar to a query"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.tokens = {}
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def add(self, key, title):
+        self.remove(key)
+        tokens = title_tokens(title)
+        if not tokens:
+            return
+        self.tokens[key] = tokens
+        for token in tokens:
+            self.postings.setdefault(token, set()).add(key)
+
+    def remove(self, key):
+        for token in self.tokens.pop(key, ()):
+            keys = self.postings.get(token)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[token]
+
+    def matches(self, title, exclude=None):
+        """[(key, score)] for every stored title at or above the threshold, best first"""
+        query = title_tokens(title)
+        if not query:
+            return []
+        low, high = self.threshold * len(query), len(query) / self.threshold
+
+        # Any match shares at least ceil(threshold * |query|) words, so it contains one of these
+        probes = len(query) - math.ceil(self.threshold * len(query)) + 1
+        rarest = sorted(query, key=lambda token: len(self.postings.get(token, ())))[:probes]
+        candidates = set()
+        for token in rarest:
+            candidates.update(self.postings.get(token, ()))
+        candidates.discard(exclude)
+
+        found = []
+        for key in candidates:
+            stored = self.tokens[key]
+            if not low <= len(stored) <= high:
+                continue
+            shared = len(query & stored)
+            score = shared / (len(query) + len(stored) - shared)
+            if score >= self.threshold:
+                found.append((key, score))
+        found.sort(key=lambda match: (-match[1], str(match[0])))
+        return found
+
+    def best(self, title, exclude=None):
+        """(key, score) of the closest stored title, or None"""
+        found = self.matches(title, exclude)
+        return found[0] if found else None
+
+
+def group_variants(products, threshold=DEFAULT_THRESHOLD):
+    """Group products whose titles are variants of each other; returns lists of products"""
+    index = FuzzyIndex(threshold)
+    parent = list(range(len(products)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, product in enumerate(products):
+        for j, score in index.matches(product['title']):
+            parent[root(i)] = root(j)
+        index.add(i, product['title'])
+
+    groups = {}
+    for i, product in enumerate(products):
+        groups.setdefault(root(i), []).append(product)
+    return list(groups.values())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Watchlist of include and exclude terms, alert priorities and per-term channels
+Every term is compiled once into a single regular expression. The terms are
+merged into a character trie, so titles sharing a prefix share one branch of
+the pattern, and a title is scanned in one pass however many terms there are.
+Terms match whole words of the normalized title (case and accents ignored),
+with an optional plural "s".
+
+A product is relevant if its title matches an include or alert term and no
+exclude term. Alert terms can raise a product's priority and send it to extra
+channels, such as Charizard to a high-priority Discord webhook.
+"""
+
+import json
+import logging
+import os
+import re
+
+from title_match import normalize_title
+
+POKEMON_TERMS = ['pokemon', 'pokémon', 'tcg', 'trading card']
+
+# ntfy's priority names, lowest first
+PRIORITIES = ['min', 'low', 'default', 'high', 'urgent']
+DEFAULT_PRIORITY = 'high'
+
+CHANNEL_TYPES = ['discord', 'telegram', 'ntfy']
+
+
+def _trie_pattern(node):
+    """Regex for a trie node; '' marks the end of a term"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A longer term is tried first and the shorter one is found from its prefix
+        return f"{body}?" if len(branches) > 1 or len(body) == 1 else f"(?:{body})?"
+    return body
+
+
+def compile_terms(terms):
+    """One pattern that finds every term, including overlapping ones, in a normalized title"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    if not trie:
+        return None
+    # The lookahead reports a match at every word start instead of consuming the text
+    return re.compile(r'(?=\b(' + _trie_pattern(trie) + r')s?\b)')
+
+
+def _terms(values, name):
+    if isinstance(values, str):
+        values = values.split(',')
+    if not isinstance(values, list):
+        raise ValueError(f"Watchlist '{name}' must be a list of terms")
+    return [value.strip() for value in values if value.strip()]
+
+
+class Watchlist:
+    def __init__(self, include=None, exclude=None, alerts=None, channels=None):
+        self.include = _terms(include if include is not None else POKEMON_TERMS, 'include')
+        self.exclude = _terms(exclude or [], 'exclude')
+        self.alerts = alerts or {}
+        self.channels = channels or {}
+
+        # Normalized term -> (original term, role); exclude wins over alert, alert over include
+        self.roles = {}
+        for role, terms in (('include', self.include), ('alert', list(self.alerts)), ('exclude', self.exclude)):
+            for term in terms:
+                key = normalize_title(term)
+                if not key:
+                    raise ValueError(f"Watchlist term '{term}' has no letters or digits")
+                self.roles[key] = (term, role)
+
+        self.rules = {}
+        for term, rule in self.alerts.items():
+            rule = rule or {}
+            priority = rule.get('priority', DEFAULT_PRIORITY)
+            if priority not in PRIORITIES:
+                raise ValueError(f"Unknown priority '{priority}' for '{term}', expected one of: {', '.join(PRIORITIES)}")
+            self.rules[term] = {'priority': priority, 'channels': _terms(rule.get('channels', []), 'channels')}
+
+        for name, spec in self.channels.items():
+            if (spec or {}).get('type') not in CHANNEL_TYPES:
+                raise ValueError(f"Channel '{name}' needs a type, one of: {', '.join(CHANNEL_TYPES)}")
+
+        self.pattern = compile_terms(self.roles)
+
+    @classmethod
+    def load(cls, path):
+        """Watchlist from a JSON file; the default Pokemon terms if the file does not exist"""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('include'), config.get('exclude'), config.get('alerts'), config.get('channels'))
+
+    @classmethod
+    def from_env(cls):
+        watchlist = cls.load(os.environ.get('WATCHLIST_FILE', 'watchlist.json'))
+        extra_exclude = _terms(os.environ.get('WATCH_EXCLUDE', ''), 'exclude')
+        if not extra_exclude:
+            return watchlist
+        return cls(watchlist.include, watchlist.exclude + extra_exclude, watchlist.alerts, watchlist.channels)
+
+    def __len__(self):
+        return len(self.roles)
+
+    def terms(self, title):
+        """Watched terms found in a title, as (original term, role) in title order"""
+        if self.pattern is None:
+            return []
+        text = normalize_title(title)
+        found = []
+        for match in self.pattern.finditer(text):
+            matched = match.group(1)
+            # Shorter terms that are a prefix of the longest match at this position
+            for end in [i for i, char in enumerate(matched) if char == ' '] + [len(matched)]:
+                entry = self.roles.get(matched[:end])
+                if entry and entry not in found:
+                    found.append(entry)
+        return found
+
+    def match(self, title):
+        """Whether a title is wanted, and the alert priority and extra channels it earns"""
+        found = self.terms(title)
+        excluded = [term for term, role in found if role == 'exclude']
+        watched = [term for term, role in found if role == 'alert']
+        relevant = not excluded and any(role != 'exclude' for term, role in found)
+        priority = DEFAULT_PRIORITY
+        channels = []
+        if relevant and watched:
+            priority = max((self.rules[term]['priority'] for term in watched), key=PRIORITIES.index)
+            for term in watched:
+                channels.extend(name for name in self.rules[term]['channels'] if name not in channels)
+        return {
+            'relevant': relevant,
+            'excluded': excluded,
+            'watching': watched,
+            'priority': priority,
+            'channels': channels
+        }
+
+    def is_relevant(self, title):
+        found = self.terms(title)
+        return bool(found) and all(role != 'exclude' for term, role in found)
+
+    def channel_specs(self):
+        """Extra channel definitions with $VARIABLES expanded from the environment"""
+        return {name: {key: os.path.expandvars(value) if isinstance(value, str) else value
+                       for key, value in spec.items()}
+                for name, spec in self.channels.items()}
+
+    def route(self, alerts, channel_names):
+        """[(channel names, alerts)]: every alert goes to the default channels plus its terms' channels"""
+        available = set(channel_names)
+        defaults = [name for name in channel_names if name not in self.channels]
+        missing = set()
+        groups = {}
+        for alert in alerts:
+            extra = []
+            for name in alert.get('channels', []):
+                if name in available:
+                    extra.append(name)
+                else:
+                    missing.add(name)
+            names = tuple(defaults + [name for name in extra if name not in defaults])
+            groups.setdefault(names, []).append(alert)
+        for name in sorted(missing):
+            logging.warning(f"Watchlist channel '{name}' is not configured, its alerts only go to the default channels")
+        return [(list(names), group) for names, group in groups.items() if names]
+
+
+DEFAULT_WATCHLIST = Watchlist()